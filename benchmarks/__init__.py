@@ -0,0 +1,8 @@
+"""Замеры производительности движка и бота.
+
+Каждый замер запускается как отдельный модуль из корня проекта:
+
+```sh
+py -m benchmarks.deck_memory
+```
+"""
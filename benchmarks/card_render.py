@@ -0,0 +1,145 @@
+"""Задержка локального генератора карт.
+
+Собирает изображения всех возможных карт и считает сколько
+времени занимает первая сборка, получение изображения с диска после
+перезапуска и повторное получение изображения из памяти.
+
+Если директория асетов не указана, генерирует простые асеты
+нужного размера во временной директории.
+
+```sh
+py -m benchmarks.card_render --assets ../mau-cards/assets --asset next
+```
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from pathlib import Path
+
+from loguru import logger
+from PIL import Image
+
+from mau.deck.card import CARDS
+from maubot.card_server import CARD_FILTERS, CARD_SIZE, CardRenderer
+
+_SYMBOLS = (
+    *(str(i) for i in range(10)),
+    "block",
+    "color",
+    "delta",
+    "minus",
+    "plus",
+    "reverse",
+)
+_GLYPHS = (
+    *(str(i) for i in range(10)),
+    "block",
+    "color",
+    "delta",
+    "reverse",
+    "take_1",
+    "take_2",
+    "take_4",
+)
+
+
+def _make_assets(root: Path) -> None:
+    root.mkdir(parents=True)
+    Image.new("RGBA", CARD_SIZE, (255, 255, 255, 255)).save(root / "base.png")
+    for folder, names, size in (
+        ("color", [str(i) for i in range(8)], CARD_SIZE),
+        ("sym", _SYMBOLS, (48, 64)),
+        ("sym_reverse", _SYMBOLS, (48, 64)),
+        ("glyph", _GLYPHS, (160, 160)),
+    ):
+        (root / folder).mkdir()
+        for i, name in enumerate(names):
+            color = (i * 30 % 256, i * 70 % 256, i * 110 % 256, 160)
+            Image.new("RGBA", size, color).save(root / folder / f"{name}.png")
+
+
+Request = tuple[str, str, str]
+Timings = list[float]
+
+
+async def _measure(
+    requests: list[Request],
+    get: Callable[[str, str, str], Awaitable[object]],
+) -> Timings:
+    timings = []
+    for request in requests:
+        start = time.perf_counter()
+        await get(*request)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _run(
+    assets: Path, cache: Path, requests: list[Request], workers: int | None
+) -> dict[str, Timings]:
+    renderer = CardRenderer(assets, cache, len(requests), workers=workers)
+    # Запуск процессов не должен попадать в замер первой сборки
+    await renderer.get(*requests[0])
+    cold = await _measure(requests[1:], renderer.get)
+    warm = await _measure(requests, renderer.get)
+    renderer.close()
+
+    renderer = CardRenderer(assets, cache, len(requests), workers=workers)
+    disk = await _measure(requests, renderer.get)
+    renderer.close()
+
+    renderer = CardRenderer(assets, None, len(requests), workers=workers)
+    await renderer.get(*requests[0])
+    start = time.perf_counter()
+    await asyncio.gather(*(renderer.get(*r) for r in requests[1:]))
+    parallel = [(time.perf_counter() - start) / (len(requests) - 1)]
+    renderer.close()
+    return {
+        "cold render": cold,
+        "cold render (gather)": parallel,
+        "disk hit": disk,
+        "memory hit": warm,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит задержку сборки и получения изображений карт."""
+    parser = argparse.ArgumentParser(prog="benchmarks.card_render")
+    parser.add_argument("--assets", type=Path)
+    parser.add_argument("--asset", default="next")
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    logger.disable("maubot")
+    requests = [
+        (args.asset, card.pack(), card_filter)
+        for card in CARDS
+        for card_filter in CARD_FILTERS
+    ][: args.cards]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assets = args.assets
+        if assets is None:
+            assets = Path(tmp) / "assets"
+            _make_assets(assets / args.asset)
+        results = asyncio.run(
+            _run(assets, Path(tmp) / "cache", requests, args.workers)
+        )
+
+    print(f"{'case':<22} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for name, timings in results.items():
+        print(
+            f"{name:<22} {statistics.fmean(timings) * 1000:9.3f} "
+            f"{statistics.median(timings) * 1000:9.3f} "
+            f"{max(timings) * 1000:9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
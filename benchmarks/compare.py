@@ -0,0 +1,85 @@
+"""Сравнивает два файла результатов замеров.
+
+Для каждого замера показывает во сколько раз изменилось лучшее время.
+Замедление больше порога `--threshold` считается регрессией, и тогда
+команда завершается с кодом 1.
+
+```sh
+py -m benchmarks.hot_paths --json before.json
+py -m benchmarks.hot_paths --json after.json
+py -m benchmarks.compare before.json after.json --threshold 0.1
+```
+"""
+
+import argparse
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from benchmarks.report import Result, format_time, load
+
+
+def compare(
+    old: Sequence[Result], new: Sequence[Result], threshold: float
+) -> list[tuple[str, float | None, float | None, str]]:
+    """Сопоставляет замеры двух файлов по имени и параметрам.
+
+    Возвращает имя, старое и новое время и итог сравнения:
+    `slower`, `faster`, `same`, `added` или `removed`.
+    """
+    before = {r.key: r for r in old}
+    after = {r.key: r for r in new}
+    rows: list[tuple[str, float | None, float | None, str]] = []
+    for key, result in after.items():
+        prev = before.get(key)
+        if prev is None:
+            rows.append((key, None, result.best, "added"))
+            continue
+        ratio = result.best / prev.best if prev.best else 1
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append((key, prev.best, result.best, verdict))
+
+    for key, result in before.items():
+        if key not in after:
+            rows.append((key, result.best, None, "removed"))
+    return rows
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит таблицу сравнения и завершается с ошибкой при регрессии."""
+    parser = argparse.ArgumentParser(prog="benchmarks.compare")
+    parser.add_argument("old", type=Path, help="baseline results")
+    parser.add_argument("new", type=Path, help="new results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown considered a regression",
+    )
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.old), load(args.new), args.threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'benchmark':<{width}} {'old':>10} {'new':>10} {'ratio':>7}")
+    for key, old, new, verdict in rows:
+        ratio = f"{new / old:.2f}x" if old and new else "-"
+        print(
+            f"{key:<{width}} "
+            f"{format_time(old) if old is not None else '-':>10} "
+            f"{format_time(new) if new is not None else '-':>10} "
+            f"{ratio:>7} {verdict}"
+        )
+
+    regressions = sum(verdict == "slower" for *_, verdict in rows)
+    if regressions:
+        print(f"{regressions} regressions over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
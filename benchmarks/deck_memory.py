@@ -0,0 +1,90 @@
+"""Сколько памяти занимает одна активная игра.
+
+Сравнивает обычную колоду из списков карт с компактной колодой из
+массивов ID карт.
+Для каждого режима создаётся множество игр, в каждой из которых
+сыграно несколько ходов.
+Память считается через `tracemalloc`.
+
+```sh
+py -m benchmarks.deck_memory --games 2000
+```
+"""
+
+import argparse
+import random
+import sys
+import tracemalloc
+from collections.abc import Sequence
+
+from loguru import logger
+
+from mau.deck.presets import CARD_PRESETS, DeckGenerator
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler, RandomPolicy, play_turn
+
+
+def _deck_size(game: MauGame) -> int:
+    deck = game.deck
+    return (
+        sys.getsizeof(deck.cards)
+        + sys.getsizeof(deck.used_cards)
+        + sys.getsizeof(getattr(deck, "_draw", ()))
+        + sys.getsizeof(getattr(deck, "_discard", ()))
+    )
+
+
+def measure(
+    preset: str, compact: bool, games: int, players: int, turns: int
+) -> tuple[float, float]:
+    """Возвращает сколько байт занимает одна игра и одна её колода."""
+    random.seed(0)
+    policy = RandomPolicy(random.Random(0))
+    sm = SessionManager(event_handler=CounterEventHandler())
+    rooms: list[MauGame] = []
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(games):
+        game = sm.create(f"room_{i}", BaseUser(f"{i}_0", "Player", "@player"))
+        game.deck_generator = DeckGenerator.from_preset(preset, compact)
+        for j in range(1, players):
+            game.join_player(BaseUser(f"{i}_{j}", "Player", "@player"))
+        game.start()
+        for _ in range(turns):
+            if not game.started:
+                break
+            play_turn(game, policy)
+        rooms.append(game)
+
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    deck = sum(_deck_size(game) for game in rooms)
+    return used / games, deck / games
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит таблицу памяти на одну игру для каждой колоды."""
+    parser = argparse.ArgumentParser(prog="benchmarks.deck_memory")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logger.disable("mau")
+    print(f"{'preset':<8} {'layout':<8} {'game, B':>9} {'deck, B':>9}")
+    for preset in CARD_PRESETS:
+        for compact in (False, True):
+            game_size, deck_size = measure(
+                preset, compact, args.games, args.players, args.turns
+            )
+            layout = "compact" if compact else "list"
+            print(
+                f"{preset:<8} {layout:<8} {game_size:>9.0f} {deck_size:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+"""Накладные расходы на обработку одного события.
+
+Пропускает через диспетчер бота нажатия на кнопки и команды, которые
+проходят через все middleware и фильтры, но сами обработчики ничего
+не делают.
+Так видна цена, которую платит каждое нажатие на кнопку ещё до
+игровой логики.
+
+Запросы к Telegram уходят на фейковый Bot API.
+
+```sh
+py -m benchmarks.dispatch --updates 2000
+```
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections.abc import Callable, Sequence
+from itertools import count
+from typing import Any
+
+from aiogram import Bot, F, Router
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+from loguru import logger
+
+from benchmarks.fake_api import FakeBotAPI, use_bot_env
+
+# Настройки бота нужны ещё при импорте модулей бота
+use_bot_env()
+
+from mau.game.player import BaseUser  # noqa: E402
+from maubot import filters  # noqa: E402
+from maubot.bot import dp, sm  # noqa: E402
+from maubot.events.journal import MessageJournal  # noqa: E402
+from maubot.events.router import er  # noqa: E402
+
+_CHAT_ID = -100
+_OWNER = 1
+_PLAYER = 2
+
+
+def _router() -> Router:
+    router = Router(name="Bench")
+
+    @router.callback_query(F.data == "bench_play", filters.NowPlaying())
+    async def play(query: CallbackQuery) -> None:
+        pass
+
+    @router.callback_query(F.data == "bench_owner", filters.GameOwner())
+    async def owner(query: CallbackQuery) -> None:
+        pass
+
+    @router.message(Command("bench"), filters.ActivePlayer())
+    async def player(message: Message) -> None:
+        pass
+
+    return router
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+
+def _chat() -> dict[str, Any]:
+    return {"id": _CHAT_ID, "type": "supergroup", "title": "Mau"}
+
+
+def _callback(user_id: int, data: str) -> Callable[[int], dict[str, Any]]:
+    def make(update_id: int) -> dict[str, Any]:
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": _user(user_id),
+                "chat_instance": "1",
+                "data": data,
+                "message": {
+                    "message_id": 1,
+                    "date": 0,
+                    "chat": _chat(),
+                    "text": "Mau",
+                },
+            },
+        }
+
+    return make
+
+
+def _command(update_id: int) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": _chat(),
+            "from": _user(_PLAYER),
+            "text": "/bench",
+        },
+    }
+
+
+async def _main(updates: int) -> None:
+    async with FakeBotAPI(latency=0) as api:
+        bot: Bot = api.bot()
+        api.admins.add(_PLAYER)
+        dp.include_router(_router())
+        journal = MessageJournal(bot, er)
+        sm.set_handler(journal)
+        dp.workflow_data["journal"] = journal
+        game = sm.create(str(_CHAT_ID), BaseUser(str(_OWNER), "Owner", "O"))
+        game.join_player(BaseUser(str(_PLAYER), "Player", "P"))
+        game.start()
+        await asyncio.sleep(0.1)
+
+        cases = {
+            "now playing button": _callback(
+                int(game.player.user_id), "bench_play"
+            ),
+            "owner button": _callback(_OWNER, "bench_owner"),
+            "admin button": _callback(_PLAYER, "bench_owner"),
+            "active player command": _command,
+        }
+
+        update_ids = count(1)
+        print(f"{'case':<22} {'mean us':>9} {'p50 us':>9} {'api calls':>10}")
+        for name, make in cases.items():
+            api.calls.clear()
+            timings = []
+            for _ in range(updates):
+                update = make(next(update_ids))
+                start = time.perf_counter()
+                await dp.feed_raw_update(bot, update)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{name:<22} {statistics.fmean(timings) * 1e6:9.1f} "
+                f"{statistics.median(timings) * 1e6:9.1f} "
+                f"{sum(api.calls.values()):10}"
+            )
+        await bot.session.close()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит время обработки одного события диспетчером."""
+    parser = argparse.ArgumentParser(prog="benchmarks.dispatch")
+    parser.add_argument("--updates", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    asyncio.run(_main(args.updates))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,316 @@
+"""Локальный сервер, притворяющийся Telegram Bot API.
+
+Принимает любые методы бота, выжидает заданную задержку, как будто
+запрос ушёл до серверов Telegram и обратно, и возвращает правдоподобный
+ответ.
+Отправленные и изменённые сообщения возвращаются вместе с текстом,
+клавиатурой и фотографией, как их вернул бы Telegram.
+Считает сколько раз был вызван каждый метод.
+
+Если указать `chat_rate`, сервер ограничивает частоту сообщений в
+каждый чат и отвечает ошибкой 429 с `retry_after`, как Telegram.
+
+Используется в замерах, чтобы бот отправлял настоящие HTTP запросы,
+но не зависел от сети и ограничений Telegram.
+
+```py
+async with FakeBotAPI(latency=0.05) as api:
+    async with api.bot() as bot:
+        await bot.send_message(1, "Hello")
+    print(api.calls)
+```
+
+Чтобы сервер не отнимал время у бота в нагрузочных тестах, его можно
+запустить отдельным процессом.
+Счётчики вызовов тогда доступны по адресу `/stats`.
+
+```sh
+py -m benchmarks.fake_api --port 8081 --latency 0.05 --chat-rate 1
+```
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from collections.abc import Sequence
+from itertools import count
+from types import TracebackType
+from typing import Any, Self
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientSession, web
+
+# Токен бота для фейкового сервера
+FAKE_TOKEN = "42:fake-token-for-local-bot-api"
+
+_BOT_USER = {"id": 42, "is_bot": True, "first_name": "Mau", "username": "mau"}
+
+# Настройки бота для замеров
+BOT_ENV = {
+    "TELEGRAM_TOKEN": FAKE_TOKEN,
+    "USE_HOOK": "false",
+    "SERVER_HOST": "127.0.0.1",
+    "SERVER_PORT": "0",
+    "HOOK_URL": "http://127.0.0.1/",
+    "HOOK_ROOT": "/hook/",
+    "HOOK_SECRET": "bench",
+    "FILE_IDS_PATH": "",
+}
+
+
+def fake_bot(url: str, **kwargs: Any) -> Bot:  # noqa: ANN401
+    """Создаёт бота, который отправляет запросы на фейковый сервер."""
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(url, is_local=True)
+    )
+    return Bot(FAKE_TOKEN, session=session, **kwargs)
+
+
+async def fetch_stats(
+    session: ClientSession, url: str, reset: bool = False
+) -> tuple[Counter[str], Counter[str]]:
+    """Счётчики сервера, запущенного отдельным процессом.
+
+    Возвращает сколько раз был вызван каждый метод и сколько из этих
+    вызовов получили ошибку 429.
+    Если указан `reset`, сервер после этого обнуляет счётчики.
+    """
+    params = {"reset": "1"} if reset else {}
+    async with session.get(f"{url}/stats", params=params) as resp:
+        resp.raise_for_status()
+        stats = await resp.json()
+    return Counter(stats["calls"]), Counter(stats["limited"])
+
+
+def use_bot_env() -> None:
+    """Подставляет настройки бота, если они не заданы.
+
+    Настройки нужны ещё при импорте модулей бота, потому вызывается
+    до импорта `maubot`.
+    """
+    for key, value in BOT_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+class FakeBotAPI:
+    """Фейковый сервер Telegram Bot API.
+
+    Args:
+        latency: Задержка ответа на каждый запрос в секундах.
+        jitter: Случайная добавка к задержке, от 0 до `jitter` секунд.
+        chat_rate: Сколько сообщений в секунду можно отправить в чат,
+            0 - без ограничений.
+        host: На каком адресе запустить сервер.
+        port: На каком порту запустить сервер, 0 - любой свободный.
+
+    """
+
+    # Сколько сообщений в чат можно отправить подряд
+    chat_burst = 3
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0,
+        chat_rate: float = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.chat_rate = chat_rate
+        self.host = host
+        self.port = port
+        self.calls: Counter[str] = Counter()
+        # Сколько запросов каждого метода получили ошибку 429
+        self.limited: Counter[str] = Counter()
+        self.admins: set[int] = set()
+
+        self._message_ids = count(1)
+        self._file_ids = count(1)
+        # Оставшиеся сообщения и время последнего пополнения для чата
+        self._chats: dict[str, tuple[float, float]] = {}
+        self._rng = random.Random(0)
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        """Адрес запущенного сервера."""
+        return f"http://{self.host}:{self.port}"
+
+    def bot(self, **kwargs: Any) -> Bot:  # noqa: ANN401
+        """Создаёт бота, который отправляет запросы на этот сервер."""
+        return fake_bot(self.url, **kwargs)
+
+    def _member(self, user_id: int, status: str) -> dict[str, Any]:
+        user = {"id": user_id, "is_bot": False, "first_name": "User"}
+        # Владелец чата описывается проще всего, им и притворяемся
+        return {"status": status, "user": user, "is_anonymous": False}
+
+    def _message(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        chat_id = int(params.get("chat_id", 0))
+        message: dict[str, Any] = {
+            "message_id": params.get("message_id") or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "Mau"},
+            "from": _BOT_USER,
+        }
+        if method.startswith("edit"):
+            message["edit_date"] = message["date"]
+        if method == "sendPhoto":
+            file_id = f"photo-{next(self._file_ids)}"
+            message["photo"] = [
+                {
+                    "file_id": f"{file_id}-{size}",
+                    "file_unique_id": f"{file_id}-{size}",
+                    "width": size,
+                    "height": size * 2,
+                }
+                for size in (32, 64)
+            ]
+        else:
+            message["text"] = params.get("text", "")
+
+        markup = params.get("reply_markup")
+        if isinstance(markup, str):
+            markup = json.loads(markup)
+        if markup:
+            message["reply_markup"] = markup
+        return message
+
+    def _flood(self, params: dict[str, Any]) -> int:
+        """Сколько секунд нужно подождать до следующего сообщения в чат."""
+        chat_id = params.get("chat_id")
+        if not self.chat_rate or chat_id is None:
+            return 0
+
+        now = time.monotonic()
+        tokens, updated = self._chats.get(str(chat_id), (self.chat_burst, now))
+        tokens = min(self.chat_burst, tokens + (now - updated) * self.chat_rate)
+        if tokens < 1:
+            self._chats[str(chat_id)] = (tokens, now)
+            return max(1, round((1 - tokens) / self.chat_rate))
+        self._chats[str(chat_id)] = (tokens - 1, now)
+        return 0
+
+    def result(self, method: str, params: dict[str, Any]) -> Any:  # noqa: ANN401
+        """Ответ на метод Telegram."""
+        if method == "getMe":
+            return _BOT_USER
+        if method == "getChatMember":
+            user_id = int(params["user_id"])
+            status = "creator" if user_id in self.admins else "member"
+            return self._member(user_id, status)
+        if method == "getChatAdministrators":
+            return [
+                self._member(user_id, "creator")
+                for user_id in sorted(self.admins)
+            ]
+        if method.startswith(("send", "edit")):
+            return self._message(method, params)
+        return True
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+
+        self.calls[method] += 1
+        delay = self.latency + self._rng.random() * self.jitter
+        if delay:
+            await asyncio.sleep(delay)
+
+        if method.startswith(("send", "edit")):
+            retry_after = self._flood(params)
+            if retry_after:
+                self.limited[method] += 1
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": (
+                            f"Too Many Requests: retry after {retry_after}"
+                        ),
+                        "parameters": {"retry_after": retry_after},
+                    },
+                    status=429,
+                )
+        return web.json_response(
+            {"ok": True, "result": self.result(method, params)}
+        )
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        stats = {"calls": dict(self.calls), "limited": dict(self.limited)}
+        if request.query.get("reset"):
+            self.calls.clear()
+            self.limited.clear()
+        return web.json_response(stats)
+
+    async def start(self) -> None:
+        """Запускает сервер."""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        app.router.add_get("/stats", self._stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0 and site._server is not None:
+            self.port = site._server.sockets[0].getsockname()[1]  # type: ignore
+
+    async def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> Self:
+        """Запускает сервер."""
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Останавливает сервер."""
+        await self.stop()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    async with FakeBotAPI(
+        args.latency, args.jitter, args.chat_rate, args.host, args.port
+    ) as api:
+        # Первая строка вывода - адрес сервера для запустившего процесса
+        print(api.url, flush=True)
+        await asyncio.Event().wait()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Запускает фейковый Bot API до прерывания процесса."""
+    parser = argparse.ArgumentParser(prog="benchmarks.fake_api")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument("--chat-rate", type=float, default=0)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,222 @@
+"""Горячие пути движка и бота.
+
+Замеряет функции, которые вызываются на каждом ходе или каждом
+нажатии на кнопку:
+
+- `Player.cover_cards` для разных размеров руки.
+- Ход игры через `MauGame.process_turn` с каждым игровым правилом.
+- `Deck.take` и перемешивание использованных карт.
+- `MauCard.pack` и `MauCard.unpack`.
+- `markups.hand_query` и `messages.game_status`.
+- `PlayerManager.rotate_cards` для разного числа игроков.
+
+Результаты можно сохранить в JSON и сравнить через
+`benchmarks.compare`.
+
+```sh
+py -m benchmarks.hot_paths --json results.json
+py -m benchmarks.hot_paths --filter deck
+```
+"""
+
+import argparse
+import random
+import sys
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks.fake_api import use_bot_env
+from benchmarks.report import Result, Timer, print_table, save
+from mau.deck.card import MauCard
+from mau.deck.deck import Deck
+from mau.deck.hand import Hand
+from mau.deck.presets import DeckGenerator
+from mau.exceptions import NotEnoughCardsError
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.game.rules import GameRules
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler, RandomPolicy, play_turn
+
+# Настройки бота нужны ещё при импорте модулей бота
+use_bot_env()
+
+from maubot.markups import hand_query  # noqa: E402
+from maubot.messages import game_status  # noqa: E402
+
+_HAND_SIZES = (7, 20, 50)
+_PLAYERS = (2, 4, 6)
+# Сколько карт берётся из колоды за раз
+_TAKE = 4
+
+
+def _new_game(
+    players: int = 4, rule_flags: int = 0, preset: str = "classic"
+) -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    game = sm.create("bench", BaseUser("0", "Player 0", "@player_0"))
+    game.rules.rule_flags = rule_flags
+    game.deck_generator = DeckGenerator.from_preset(preset)
+    for i in range(1, players):
+        game.join_player(BaseUser(str(i), f"Player {i}", f"@player_{i}"))
+    game.start()
+    return game
+
+
+def _random_hand(game: MauGame, size: int) -> Hand:
+    cards = list(game.deck.cards)
+    return Hand(random.choices(cards, k=size))
+
+
+class _Turns:
+    """Бесконечная череда ходов, закончившаяся игра начинается заново."""
+
+    def __init__(self, rule_flags: int) -> None:
+        self.rule_flags = rule_flags
+        self.policy = RandomPolicy(random.Random(0))
+        self.game = _new_game(rule_flags=rule_flags)
+        self.restarts = 0
+
+    def step(self) -> None:
+        if not self.game.started:
+            self.game = _new_game(rule_flags=self.rule_flags)
+            self.restarts += 1
+        try:
+            play_turn(self.game, self.policy)
+        except (NotEnoughCardsError, KeyError, ValueError):
+            # Редкие сочетания правил ломают игру, как и в симуляторе
+            self.game.started = False
+
+
+def bench_cover_cards(timer: Timer) -> Iterator[Result]:
+    """Разбиение руки на покрывающие и прочие карты."""
+    game = _new_game()
+    for size in _HAND_SIZES:
+        game.player.hand = _random_hand(game, size)
+        yield timer.measure(
+            "player.cover_cards", game.player.cover_cards, {"hand": size}
+        )
+
+
+def bench_turns(timer: Timer) -> Iterator[Result]:
+    """Один ход игры с каждым игровым правилом по отдельности."""
+    rules = GameRules()
+    yield timer.measure("game.turn", _Turns(0).step, {"rule": "none"})
+    for i, rule in enumerate(rules.rules):
+        # Имя правила начинается с эмодзи, в ключе используем атрибут
+        name = next(k for k, v in vars(rules).items() if v is rule)
+        yield timer.measure("game.turn", _Turns(1 << i).step, {"rule": name})
+
+
+def _take(deck: Deck) -> Callable[[], None]:
+    # Взятые карты сразу возвращаются в стопку использованных, потому
+    # время от времени колода перемешивается, как во время игры
+    def take() -> None:
+        for card in list(deck.take(_TAKE)):
+            deck.put(card)
+
+    return take
+
+
+def _reshuffle(deck: Deck) -> Callable[[], None]:
+    # Вся колода уходит в стопку использованных и возвращается обратно
+    def reshuffle() -> None:
+        for card in list(deck.take(deck.count)):
+            deck.put(card)
+        deck.put(next(deck.take(1)))
+
+    return reshuffle
+
+
+def bench_deck(timer: Timer) -> Iterator[Result]:
+    """Взятие карт из колоды и перемешивание использованных карт."""
+    for compact in (False, True):
+        layout = "compact" if compact else "list"
+        deck = DeckGenerator.from_preset("classic", compact).deck
+        yield timer.measure(
+            "deck.take", _take(deck), {"deck": layout}, ops=_TAKE
+        )
+        yield timer.measure(
+            "deck.reshuffle", _reshuffle(deck), {"deck": layout}
+        )
+
+
+def bench_cards(timer: Timer) -> Iterator[Result]:
+    """Упаковка карт в строки и обратно."""
+    cards = list(DeckGenerator.from_preset("classic").deck.cards)
+    packed = [card.pack() for card in cards]
+
+    def pack() -> None:
+        for card in cards:
+            card.pack()
+
+    def unpack() -> None:
+        for card_str in packed:
+            MauCard.unpack(card_str)
+
+    yield timer.measure("card.pack", pack, ops=len(cards))
+    yield timer.measure("card.unpack", unpack, ops=len(packed))
+
+
+def bench_views(timer: Timer) -> Iterator[Result]:
+    """Клавиатура с картами и статус игры."""
+    game = _new_game()
+    for size in _HAND_SIZES:
+        game.player.hand = _random_hand(game, size)
+        yield timer.measure(
+            "markups.hand_query",
+            lambda: list(hand_query(game.player)),
+            {"hand": size},
+        )
+    yield timer.measure(
+        "messages.game_status", lambda: game_status(game), {"players": 4}
+    )
+
+
+def bench_rotate(timer: Timer) -> Iterator[Result]:
+    """Обмен картами между всеми игроками."""
+    for players in _PLAYERS:
+        game = _new_game(players)
+        yield timer.measure(
+            "pm.rotate_cards", game.pm.rotate_cards, {"players": players}
+        )
+
+
+BENCHMARKS: dict[str, Callable[[Timer], Iterator[Result]]] = {
+    "cover_cards": bench_cover_cards,
+    "turn": bench_turns,
+    "deck": bench_deck,
+    "card": bench_cards,
+    "views": bench_views,
+    "rotate": bench_rotate,
+}
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит таблицу замеров и при необходимости сохраняет JSON."""
+    parser = argparse.ArgumentParser(prog="benchmarks.hot_paths")
+    parser.add_argument("--json", type=Path, help="save results to file")
+    parser.add_argument(
+        "--filter", default="", help="run only benchmarks with this name"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    logger.disable("mau")
+    random.seed(0)
+    timer = Timer(args.repeat, args.min_time)
+    results: list[Result] = []
+    for name, bench in BENCHMARKS.items():
+        if args.filter in name:
+            results.extend(bench(timer))
+
+    print_table(results)
+    if args.json is not None:
+        save(args.json, "hot_paths", results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
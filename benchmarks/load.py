@@ -0,0 +1,631 @@
+"""Нагрузочный тест бота.
+
+Синтетические группы игроков проходят весь путь настоящей игры:
+создают комнату через `/game`, заходят в неё через `/join`, запускают
+игру кнопкой, открывают клавиатуру с картами inline запросом, выбирают
+карту и нажимают на кнопки хода.
+Закончившаяся игра в комнате сразу начинается заново.
+
+События подаются прямо в диспетчер, как при long polling
+(`--via feed`), или отправляются по HTTP в webhook приложение бота
+(`--via hook`).
+Запросы бота уходят на фейковый Bot API, запущенный отдельным
+процессом, с задержкой и ограничением частоты сообщений в чат.
+
+Для каждого числа одновременных комнат выводит сколько событий бот
+обработал в секунду, задержку обработки события и сколько запросов к
+Telegram пришлось на один ход.
+
+```sh
+py -m benchmarks.load --rooms 1000 10000 50000 --duration 30
+py -m benchmarks.load --rooms 1000 --via hook --think 1
+```
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import socket
+import statistics
+import sys
+import time
+from array import array
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any
+
+import aiohttp
+import uvicorn
+from aiogram import Bot
+from aiogram.methods import TelegramMethod
+from loguru import logger
+
+from benchmarks.fake_api import fake_bot, fetch_stats, use_bot_env
+
+# Настройки бота нужны ещё при импорте модулей бота
+use_bot_env()
+
+from mau.deck.behavior import WildTakeBehavior  # noqa: E402
+from mau.enums import CardColor, GameState  # noqa: E402
+from mau.game.game import MauGame  # noqa: E402
+from maubot.bot import create_app, dp, router, sm  # noqa: E402
+from maubot.config import config  # noqa: E402
+from maubot.events.journal import MessageJournal  # noqa: E402
+from maubot.events.router import er  # noqa: E402
+from maubot.handlers import ROUTERS  # noqa: E402
+from maubot.limiter import LimitedRequests, RateLimiter  # noqa: E402
+from maubot.metrics import UPDATE_ERRORS  # noqa: E402
+
+# Сколько действий подряд могут не изменить игру, прежде чем комната
+# завершит её и начнёт новую
+_MAX_STALLS = 5
+# Как часто проверять, что бот отправил все запросы
+_POLL = 0.05
+# Сколько ещё ждать ответов на уже отправленные запросы
+_SETTLE = 0.5
+_UPDATE_TYPES = (
+    "message",
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+)
+
+Update = dict[str, Any]
+Sender = Callable[[Update], Awaitable[int]]
+
+
+@dataclass(slots=True)
+class LoadStats:
+    """Статистика одного прогона."""
+
+    updates: int = 0
+    turns: int = 0
+    games: int = 0
+    stalls: int = 0
+    # Методы, отправленные ответом на webhook
+    replies: int = 0
+    # События, ошибку которых не смог обработать сам бот
+    failed: int = 0
+    latencies: array = field(default_factory=lambda: array("d"))
+
+
+class ClosedRooms:
+    """Сообщает комнатам, что их прошлая игра удалена.
+
+    Закончившаяся игра удаляется только после обработки её событий,
+    а до тех пор новую игру в комнате создать нельзя.
+    Подключается к менеджеру сессий как наблюдатель.
+    """
+
+    def __init__(self) -> None:
+        self._closed: dict[str, asyncio.Event] = {}
+
+    def watch(self, game: MauGame) -> None:
+        """Новые игры не интересуют."""
+
+    def forget(self, room_id: str) -> None:
+        """Будит комнату, ждущую удаления игры."""
+        closed = self._closed.pop(room_id, None)
+        if closed is not None:
+            closed.set()
+
+    async def wait(self, room_id: str) -> None:
+        """Ждёт пока игра в комнате будет удалена."""
+        if sm.room(room_id) is None:
+            return
+        await self._closed.setdefault(room_id, asyncio.Event()).wait()
+
+
+CLOSED_ROOMS = ClosedRooms()
+
+
+class Updates:
+    """Собирает события Telegram от имени игроков."""
+
+    def __init__(self) -> None:
+        self._ids = count(1)
+
+    def _user(self, user_id: int) -> dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"User {user_id}",
+            "username": f"user_{user_id}",
+        }
+
+    def _chat(self, chat_id: int) -> dict[str, Any]:
+        return {"id": chat_id, "type": "supergroup", "title": "Mau"}
+
+    def message(self, chat_id: int, user_id: int, text: str) -> Update:
+        """Сообщение с командой в чате."""
+        update_id = next(self._ids)
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": self._chat(chat_id),
+                "from": self._user(user_id),
+                "text": text,
+                "entities": [
+                    {
+                        "type": "bot_command",
+                        "offset": 0,
+                        "length": len(text),
+                    }
+                ],
+            },
+        }
+
+    def callback(self, chat_id: int, user_id: int, data: str) -> Update:
+        """Нажатие на кнопку под сообщением бота."""
+        update_id = next(self._ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": self._chat(chat_id),
+                    "from": self._user(42) | {"is_bot": True},
+                    "text": "Mau",
+                },
+            },
+        }
+
+    def inline_query(self, user_id: int) -> Update:
+        """Игрок открывает клавиатуру с картами."""
+        update_id = next(self._ids)
+        return {
+            "update_id": update_id,
+            "inline_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "query": "",
+                "offset": "",
+                "chat_type": "supergroup",
+            },
+        }
+
+    def chosen(self, user_id: int, result_id: str) -> Update:
+        """Игрок выбирает карту из клавиатуры."""
+        return {
+            "update_id": next(self._ids),
+            "chosen_inline_result": {
+                "result_id": result_id,
+                "from": self._user(user_id),
+                "query": "",
+            },
+        }
+
+
+class Room:
+    """Группа игроков в одном чате.
+
+    Игроки видят состояние своей игры и выбирают случайное допустимое
+    действие, как если бы смотрели на клавиатуру бота.
+
+    Args:
+        index: Номер комнаты, из него получаются ID чата и игроков.
+        players: Сколько игроков в комнате, не больше 9.
+        updates: Откуда брать события.
+        send: Как отправлять события боту.
+        stats: Куда записывать статистику.
+
+    """
+
+    def __init__(
+        self,
+        index: int,
+        players: int,
+        updates: Updates,
+        send: Sender,
+        stats: LoadStats,
+    ) -> None:
+        self.chat_id = -1_000_000 - index
+        self.users = [index * 10 + i + 1 for i in range(players)]
+        self.updates = updates
+        self._send = send
+        self.stats = stats
+        self.rng = random.Random(index)
+
+    @property
+    def game(self) -> MauGame | None:
+        """Текущая игра в комнате."""
+        return sm.room(str(self.chat_id))
+
+    async def send(self, update: Update) -> None:
+        """Отправляет событие и замеряет время его обработки."""
+        start = time.perf_counter()
+        try:
+            self.stats.replies += await self._send(update)
+        except Exception:
+            self.stats.failed += 1
+        self.stats.latencies.append(time.perf_counter() - start)
+        self.stats.updates += 1
+
+    async def setup(self, deadline: float) -> MauGame | None:
+        """Создаёт комнату, собирает игроков и начинает игру.
+
+        Если время вышло раньше, игра так и не начнётся.
+        """
+        await CLOSED_ROOMS.wait(str(self.chat_id))
+        owner, *others = self.users
+        steps = [
+            self.updates.message(self.chat_id, owner, "/game"),
+            *(
+                self.updates.message(self.chat_id, user_id, "/join")
+                for user_id in others
+            ),
+            self.updates.callback(self.chat_id, owner, "start_game"),
+        ]
+        for update in steps:
+            if time.monotonic() >= deadline:
+                return None
+            await self.send(update)
+        self.stats.games += 1
+        return self.game
+
+    def action(self, game: MauGame) -> Update:
+        """Выбирает действие текущего игрока."""
+        player = game.player
+        user_id = int(player.user_id)
+        if game.state == GameState.CHOOSE_COLOR:
+            colors = game.deck.colors or list(CardColor)[:4]
+            color = self.rng.choice(colors)
+            return self.updates.callback(
+                self.chat_id, user_id, f"color:{color.value}"
+            )
+
+        if game.state == GameState.TWIST_HAND:
+            other = self.rng.choice([pl for _, pl in game.pm.iter_others()])
+            return self.updates.callback(
+                self.chat_id, user_id, f"select_player:{other.user_id}"
+            )
+
+        if game.state == GameState.SHOTGUN:
+            data = self.rng.choice(("shot", "shot_take"))
+            return self.updates.callback(self.chat_id, user_id, data)
+
+        if (
+            isinstance(game.deck.top.behavior, WildTakeBehavior)
+            and game.take_counter
+            and self.rng.random() < 0.5  # noqa: PLR2004
+        ):
+            return self.updates.callback(self.chat_id, user_id, "bluff")
+
+        cover = player.cover_cards().cover
+        if cover:
+            card = self.rng.choice(cover)
+            return self.updates.chosen(user_id, f"{card.pack()}:0")
+
+        data = "next" if game.state == GameState.TAKE else "take"
+        return self.updates.callback(self.chat_id, user_id, data)
+
+    async def turn(self, game: MauGame) -> bool:
+        """Проводит один ход текущего игрока.
+
+        Возвращает изменилась ли игра после хода.
+        """
+        player = game.player
+        version = game.version
+        await self.send(self.updates.inline_query(int(player.user_id)))
+        await self.send(self.action(game))
+        self.stats.turns += 1
+        return game.version != version
+
+    async def play(self, deadline: float, think: float) -> None:
+        """Играет в комнате до указанного времени."""
+        while time.monotonic() < deadline:
+            game = await self.setup(deadline)
+            stalls = 0
+            while (
+                game is not None
+                and game.started
+                and stalls < _MAX_STALLS
+                and time.monotonic() < deadline
+            ):
+                if think:
+                    await asyncio.sleep(self.rng.uniform(0, think * 2))
+                stalls = 0 if await self.turn(game) else stalls + 1
+
+            if game is not None and game.started and stalls >= _MAX_STALLS:
+                self.stats.stalls += 1
+                game.end()
+
+
+# Отправка событий
+# ================
+
+
+def _feeder(bot: Bot) -> Sender:
+    async def feed(update: Update) -> int:
+        # Так же, как при long polling
+        result = await dp.feed_raw_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            await dp.silent_call_request(bot, result)
+        return 0
+
+    return feed
+
+
+def _poster(session: aiohttp.ClientSession, url: str) -> Sender:
+    headers = {"x-telegram-bot-api-secret-token": config.hook_secret}
+
+    async def post(update: Update) -> int:
+        async with session.post(url, json=update, headers=headers) as resp:
+            # Ошибка, которую не смог обработать сам бот
+            resp.raise_for_status()
+            body = await resp.json()
+        # Метод в ответе на webhook Telegram выполнит сам
+        return 1 if body.get("method") else 0
+
+    return post
+
+
+@asynccontextmanager
+async def _fake_api(args: argparse.Namespace) -> AsyncIterator[str]:
+    """Запускает фейковый Bot API отдельным процессом.
+
+    Так ответы на запросы бота не отнимают время у самого бота.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.fake_api",
+        "--latency",
+        str(args.latency),
+        "--jitter",
+        str(args.jitter),
+        "--chat-rate",
+        str(args.chat_rate),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        if proc.stdout is None:
+            raise RuntimeError("Fake Bot API has no stdout")
+        url = (await proc.stdout.readline()).decode().strip()
+        if not url:
+            raise RuntimeError("Fake Bot API failed to start")
+        yield url
+    finally:
+        proc.terminate()
+        await proc.wait()
+
+
+@asynccontextmanager
+async def _serve_hook() -> AsyncIterator[str]:
+    """Запускает webhook приложение бота и возвращает его адрес."""
+    # Сокет открываем заранее, чтобы сразу знать порт сервера
+    sock = socket.create_server(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(router), log_level="critical")
+    )
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    try:
+        yield f"http://127.0.0.1:{port}{config.hook_root}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+# Прогон
+# ======
+
+
+def _errors() -> float:
+    return sum(UPDATE_ERRORS.get(t) for t in _UPDATE_TYPES)
+
+
+def _quantiles(latencies: array) -> tuple[float, float, float, float]:
+    if len(latencies) < 2:  # noqa: PLR2004
+        return 0, 0, 0, max(latencies, default=0)
+    q = statistics.quantiles(latencies, n=100)
+    return q[49], q[94], q[98], max(latencies)
+
+
+_HEADER = (
+    f"{'rooms':>7} {'updates':>9} {'upd/s':>9} {'p50 ms':>8} "
+    f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'turns':>8} "
+    f"{'games':>7} {'api/turn':>9} {'429':>6} {'errors':>6} "
+    f"{'failed':>6} {'stalls':>6}"
+)
+
+
+class LoadTest:
+    """Прогоняет нагрузку для разного числа комнат.
+
+    Args:
+        api_url: Адрес фейкового Bot API, куда бот отправляет запросы.
+        journal: Журнал игровых событий бота.
+        limiter: Планировщик запросов журнала.
+        send: Как отправлять события боту.
+        args: Настройки нагрузки из командной строки.
+
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        journal: MessageJournal,
+        limiter: RateLimiter,
+        send: Sender,
+        args: argparse.Namespace,
+    ) -> None:
+        self.api_url = api_url
+        self.journal = journal
+        self.limiter = limiter
+        self.send = send
+        self.args = args
+        # Повторы ID событий бот отбросит, потому ID общие для прогонов
+        self.updates = Updates()
+        # Игры прошлого прогона могут ещё завершаться, потому у каждого
+        # прогона свои комнаты
+        self._rooms = count()
+
+    async def api_stats(self, reset: bool = False) -> tuple[int, int]:
+        """Сколько запросов получил Bot API и сколько из них с 429."""
+        async with aiohttp.ClientSession() as session:
+            calls, limited = await fetch_stats(session, self.api_url, reset)
+        return calls.total(), limited.total()
+
+    async def drain(self, seconds: float) -> None:
+        """Ждёт пока бот отправит все запросы, но не дольше `seconds`.
+
+        Журнал может отложить отправку, а отправленные запросы ещё
+        ждут ответа, потому бот должен немного побыть без дела.
+        """
+        idle = 0.0
+        for _ in range(int(seconds / _POLL)):
+            if self.journal.pending or self.limiter.pending:
+                idle = 0
+            elif idle > self.journal.delay + _SETTLE:
+                return
+            else:
+                idle += _POLL
+            await asyncio.sleep(_POLL)
+
+    async def cleanup(self, rooms: Sequence[Room]) -> None:
+        """Завершает оставшиеся игры перед следующим прогоном."""
+        await self.drain(30)
+        for room in rooms:
+            game = room.game
+            # Комнату вместе с игроками удалит обработчик конца игры
+            if game is not None:
+                game.end()
+        await self.drain(30)
+
+    async def run(self, rooms: int) -> None:
+        """Играет во всех комнатах сразу и выводит строку таблицы."""
+        stats = LoadStats()
+        room_list = [
+            Room(
+                next(self._rooms),
+                self.args.players,
+                self.updates,
+                self.send,
+                stats,
+            )
+            for _ in range(rooms)
+        ]
+        await self.api_stats(reset=True)
+        errors = _errors()
+
+        start = time.monotonic()
+        deadline = start + self.args.duration
+        await asyncio.gather(
+            *(room.play(deadline, self.args.think) for room in room_list)
+        )
+        elapsed = time.monotonic() - start
+        await self.drain(self.args.drain)
+
+        calls, limited = await self.api_stats()
+        p50, p95, p99, worst = _quantiles(stats.latencies)
+        # Запросы на настройку игр тоже делятся на ходы
+        per_turn = (
+            f"{(calls + stats.replies) / stats.turns:.2f}"
+            if stats.turns
+            else "-"
+        )
+        print(
+            f"{rooms:>7} {stats.updates:>9} {stats.updates / elapsed:>9.0f} "
+            f"{p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {p99 * 1000:>8.2f} "
+            f"{worst * 1000:>8.1f} {stats.turns:>8} {stats.games:>7} "
+            f"{per_turn:>9} "
+            f"{limited:>6} "
+            f"{_errors() - errors:>6.0f} {stats.failed:>6} {stats.stalls:>6}"
+        )
+        await self.cleanup(room_list)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    async with _fake_api(args) as api_url:
+        bot = fake_bot(api_url)
+        limiter = RateLimiter(
+            args.global_rate, config.rate_chat, config.rate_chat_burst
+        )
+        bot.session.middleware(LimitedRequests(limiter))
+        journal = MessageJournal(bot, er, config.journal_delay, limiter)
+        sm.set_handler(journal)
+        dp.workflow_data["journal"] = journal
+        sm.add_watcher(CLOSED_ROOMS)
+        for r in ROUTERS:
+            dp.include_router(r)
+
+        async with AsyncExitStack() as stack:
+            if args.via == "hook":
+                dp.workflow_data["bot"] = bot
+                url = await stack.enter_async_context(_serve_hook())
+                session = await stack.enter_async_context(
+                    aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(limit=args.connections)
+                    )
+                )
+                send = _poster(session, url)
+            else:
+                send = _feeder(bot)
+
+            test = LoadTest(api_url, journal, limiter, send, args)
+            print(_HEADER)
+            for rooms in args.rooms:
+                await test.run(rooms)
+
+        await limiter.close()
+        await bot.session.close()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит пропускную способность бота для разного числа комнат."""
+    parser = argparse.ArgumentParser(prog="benchmarks.load")
+    parser.add_argument(
+        "--rooms", type=int, nargs="+", default=[1000, 10000, 50000]
+    )
+    parser.add_argument("--players", type=int, default=4, choices=range(2, 10))
+    parser.add_argument(
+        "--duration", type=float, default=30, help="seconds per run"
+    )
+    parser.add_argument(
+        "--think", type=float, default=0, help="mean pause between turns"
+    )
+    parser.add_argument("--via", choices=("feed", "hook"), default="feed")
+    parser.add_argument(
+        "--connections", type=int, default=40, help="webhook connections"
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument(
+        "--chat-rate",
+        type=float,
+        default=20 / 60,
+        help="messages per second in one chat before 429",
+    )
+    parser.add_argument(
+        "--global-rate",
+        type=float,
+        default=1000,
+        help="bot requests per second",
+    )
+    parser.add_argument(
+        "--drain",
+        type=float,
+        default=10,
+        help="seconds to wait for outgoing requests",
+    )
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    # Ошибки запросов aiogram пишет через logging
+    logging.disable(logging.CRITICAL)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
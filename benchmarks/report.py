@@ -0,0 +1,155 @@
+"""Общий формат результатов замеров.
+
+`Timer` вызывает функцию много раз и запоминает лучшее и среднее
+время одной операции.
+Результаты можно сохранить в JSON файл, а после сравнить два файла
+через `benchmarks.compare`.
+
+```json
+{
+  "version": 1,
+  "suite": "hot_paths",
+  "meta": {"python": "3.12.1", "platform": "Linux-...", "time": 1760000000},
+  "results": [
+    {"name": "deck.take", "params": {"count": 1}, "number": 200000,
+     "best": 2.1e-07, "mean": 2.2e-07, "stdev": 4e-09}
+  ]
+}
+```
+"""
+
+import json
+import platform
+import statistics
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Версия формата файла результатов
+FORMAT_VERSION = 1
+
+
+@dataclass(slots=True)
+class Result:
+    """Результат одного замера.
+
+    Время указано в секундах на одну операцию.
+    """
+
+    name: str
+    params: dict[str, Any] = field(default_factory=dict)
+    number: int = 0
+    best: float = 0
+    mean: float = 0
+    stdev: float = 0
+
+    @property
+    def key(self) -> str:
+        """Имя замера вместе с параметрами, для сравнения файлов."""
+        if not self.params:
+            return self.name
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]"
+
+
+class Timer:
+    """Замеряет время одной операции.
+
+    Сначала подбирает количество вызовов так, чтобы один повтор длился
+    не меньше `min_time` секунд, после замеряет `repeat` повторов.
+
+    Args:
+        repeat: Сколько раз повторить замер.
+        min_time: Сколько секунд должен длиться один повтор.
+
+    """
+
+    def __init__(self, repeat: int = 5, min_time: float = 0.2) -> None:
+        self.repeat = repeat
+        self.min_time = min_time
+
+    def _number(self, func: Callable[[], object]) -> int:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time:
+                return number
+            number *= 2 if elapsed * 10 > self.min_time else 10
+
+    def measure(
+        self,
+        name: str,
+        func: Callable[[], object],
+        params: dict[str, Any] | None = None,
+        ops: int = 1,
+    ) -> Result:
+        """Замеряет функцию.
+
+        Если за один вызов функции выполняется несколько операций,
+        укажите их количество в `ops`.
+        """
+        number = self._number(func)
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / (number * ops))
+
+        return Result(
+            name,
+            params or {},
+            number * ops,
+            min(timings),
+            statistics.fmean(timings),
+            statistics.stdev(timings) if len(timings) > 1 else 0,
+        )
+
+
+def format_time(seconds: float) -> str:
+    """Время с подходящей единицей измерения."""
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def print_table(results: Sequence[Result]) -> None:
+    """Выводит результаты таблицей."""
+    width = max((len(r.key) for r in results), default=10)
+    print(f"{'benchmark':<{width}} {'best':>10} {'mean':>10} {'±':>7}")
+    for r in results:
+        spread = r.stdev / r.mean * 100 if r.mean else 0
+        print(
+            f"{r.key:<{width}} {format_time(r.best):>10} "
+            f"{format_time(r.mean):>10} {spread:>6.1f}%"
+        )
+
+
+def save(path: Path, suite: str, results: Sequence[Result]) -> None:
+    """Сохраняет результаты в JSON файл."""
+    data = {
+        "version": FORMAT_VERSION,
+        "suite": suite,
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": int(time.time()),
+        },
+        "results": [asdict(r) for r in results],
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
+
+
+def load(path: Path) -> list[Result]:
+    """Загружает результаты из JSON файла."""
+    data = json.loads(path.read_text())
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported results version in {path}")
+    return [Result(**r) for r in data["results"]]
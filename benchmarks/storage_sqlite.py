@@ -0,0 +1,93 @@
+"""Скорость записи и восстановления хранилища SQLite.
+
+Сначала заполняет хранилище играми, а после в течение заданного
+времени изменяет случайные игры, как это происходит во время ходов.
+Считает сколько изменений в секунду выдерживает хранилище, сколько
+строк успевает записать поток записи и сколько времени занимает
+загрузка всех игр после перезапуска.
+
+```sh
+py -m benchmarks.storage_sqlite --games 10000
+```
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from loguru import logger
+
+from mau.storage import SqliteStorage
+
+# Примерный размер сохранённого состояния одной игры
+_PAYLOAD_SIZE = 256
+
+
+def _dumps(value: bytearray) -> bytes:
+    return bytes(value)
+
+
+def _loads(key: str, value: bytes) -> bytearray:
+    return bytearray(value)
+
+
+def _open(path: Path, interval: float) -> SqliteStorage[bytearray]:
+    return SqliteStorage(path, _dumps, _loads, "games", interval)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит скорость записи и время восстановления хранилища."""
+    parser = argparse.ArgumentParser(prog="benchmarks.storage_sqlite")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    logger.disable("mau")
+    rnd = random.Random(0)
+    keys = [f"room_{i}" for i in range(args.games)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite"
+
+        storage = _open(path, args.interval)
+        start = time.perf_counter()
+        for key in keys:
+            storage.add(key, bytearray(rnd.randbytes(_PAYLOAD_SIZE)))
+        storage.close()
+        fill = time.perf_counter() - start
+
+        storage = _open(path, args.interval)
+        storage.load()
+        updates = 0
+        worst = 0.0
+        end = time.perf_counter() + args.duration
+        start = time.perf_counter()
+        while (now := time.perf_counter()) < end:
+            value = storage.get(rnd.choice(keys))
+            if value is not None:
+                value[0] = updates & 0xFF
+            worst = max(worst, time.perf_counter() - now)
+            updates += 1
+        hot = time.perf_counter() - start
+        storage.close()
+        total = time.perf_counter() - start
+
+        start = time.perf_counter()
+        storage = _open(path, args.interval)
+        loaded = storage.load()
+        recovery = time.perf_counter() - start
+        storage.close()
+
+    print(f"fill {args.games} games:   {fill:8.3f} s")
+    print(f"updates per second:  {updates / hot:10.0f}")
+    print(f"with final flush:    {updates / total:10.0f}")
+    print(f"worst update:        {worst * 1000:8.3f} ms")
+    print(f"recovery {loaded} games: {recovery * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,145 @@
+"""Ответ методом в webhook против отдельного запроса.
+
+Пропускает через диспетчер inline и callback запросы, обработчики
+которых возвращают метод Telegram.
+В режиме `call` метод отправляется отдельным запросом на фейковый
+Bot API, как это делает webhook без `hook_reply`.
+В режиме `reply` метод превращается в ответ на сам webhook.
+
+Считает задержку до готового ответа на webhook и сколько исходящих
+запросов бот отправил.
+
+```sh
+py -m benchmarks.webhook_reply --updates 200 --latency 0.05
+```
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.default import DefaultBotProperties
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    AnswerInlineQuery,
+    TelegramMethod,
+)
+from aiogram.types import (
+    CallbackQuery,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultUnion,
+    InputTextMessageContent,
+    Update,
+)
+
+from benchmarks.fake_api import FakeBotAPI
+from maubot.webhook import webhook_reply
+
+_USER = {"id": 1, "is_bot": False, "first_name": "Player"}
+
+
+def _router() -> Router:
+    router = Router()
+    results: list[InlineQueryResultUnion] = [
+        InlineQueryResultArticle(
+            id=str(i),
+            title=f"Card {i}",
+            input_message_content=InputTextMessageContent(
+                message_text=f"card {i}"
+            ),
+        )
+        for i in range(20)
+    ]
+
+    @router.inline_query()
+    async def inline(query: InlineQuery) -> AnswerInlineQuery:
+        return query.answer(results, cache_time=0, is_personal=True)
+
+    @router.callback_query()
+    async def callback(query: CallbackQuery) -> AnswerCallbackQuery:
+        return query.answer("🎨 Вы выбрали <b>цвет</b>.")
+
+    return router
+
+
+def _update(bot: Bot, update_id: int) -> Update:
+    data: dict[str, Any] = {"update_id": update_id}
+    if update_id % 2:
+        data["inline_query"] = {
+            "id": str(update_id),
+            "from": _USER,
+            "query": "",
+            "offset": "",
+        }
+    else:
+        data["callback_query"] = {
+            "id": str(update_id),
+            "from": _USER,
+            "chat_instance": "1",
+            "data": "color:1",
+        }
+    return Update.model_validate(data, context={"bot": bot})
+
+
+async def _process(
+    dp: Dispatcher, bot: Bot, update: Update, reply: bool
+) -> bytes:
+    result: TelegramMethod[Any] | None = await dp.feed_webhook_update(
+        bot, update
+    )
+    if result is None:
+        return b"{}"
+    if reply:
+        body = webhook_reply(bot, result)
+        if body is not None:
+            return json.dumps(body).encode()
+    await dp.silent_call_request(bot, result)
+    return b"{}"
+
+
+async def _run(
+    api: FakeBotAPI, updates: int, reply: bool
+) -> tuple[list[float], int]:
+    dp = Dispatcher()
+    dp.include_router(_router())
+    calls = sum(api.calls.values())
+    timings = []
+    async with api.bot(default=DefaultBotProperties(parse_mode="HTML")) as bot:
+        for i in range(updates):
+            update = _update(bot, i)
+            start = time.perf_counter()
+            await _process(dp, bot, update, reply)
+            timings.append(time.perf_counter() - start)
+    return timings, sum(api.calls.values()) - calls
+
+
+async def _main(updates: int, latency: float) -> None:
+    async with FakeBotAPI(latency) as api:
+        print(f"{'mode':<6} {'mean ms':>9} {'p95 ms':>9} {'calls':>7}")
+        for mode in ("call", "reply"):
+            timings, calls = await _run(api, updates, mode == "reply")
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(
+                f"{mode:<6} {statistics.fmean(timings) * 1000:9.3f} "
+                f"{p95 * 1000:9.3f} {calls:7}"
+            )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Сравнивает задержку ответа на webhook в двух режимах."""
+    parser = argparse.ArgumentParser(prog="benchmarks.webhook_reply")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args.updates, args.latency))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
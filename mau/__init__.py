@@ -3,10 +3,13 @@
 Разделён на несколько основных компонентов:
 - deck: Карты, их поведение, колода карт и готовые пресеты.
 - game: Класс игры и игрока.
-- session: Менеджер сессий и хранилище сессий.
+- session: Менеджер сессий, хранилище сессий и сборщик заброшенных игр.
 
 А также:
 - enums: Общие перечисления. Игровые события. состояния, типы и цвета карт.
 - events: Класс обработчика игровых событий.
 - exceptions: Возникающие во время работы исключения.
+- sim: Симулятор игр без Telegram для замеров скорости и баланса.
+- snapshot: Двоичные снимки для сохранения и восстановления игр.
+- timers: Иерархическое колесо таймеров для отложенных действий.
 """
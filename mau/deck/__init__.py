@@ -2,8 +2,9 @@
 
 Предоставляет следующие компоненты:
 - Поведение дяя карт.
-- Класс Уно карты.
+- Класс Уно карты и общая таблица всех карт.
 - Колода карт.
+- Рука игрока с быстрыми проверками карт.
 - Генератор карт, в том числе из строки.
 - Заготовленный шаблоны для генерации колоды карт.
 """
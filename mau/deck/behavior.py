@@ -173,22 +173,20 @@ class TakeBehavior(NumberBehavior):
 class BaseWildBehavior(NumberBehavior):
     """Поведение диких карт.
 
-    После возвращения в колоду их цвет возвращается к чёрному.
+    Сами карты всегда остаются чёрными.
+    Выбранный для дикой карты цвет хранится в колоде конкретной игры.
     """
 
     name = "wild"
     cost = 50
 
-    def prepare_used(self, card: "MauCard", game: "MauGame") -> None:
-        """Возвращает цвет карты в норму."""
-        logger.debug("Prepare card {} in game", card)
-        card.color = game.deck.wild_color
-
     def _auto_select_color(self, card: "MauCard", game: "MauGame") -> None:
         logger.debug("Auto choose color for card")
-        color_index = (game.deck.top.color + (1 if game.reverse else -1)) % 6
-        card.color = CardColor(color_index)
-        game.player.push_event(GameEvents.GAME_SELECT_COLOR, str(card.color))
+        color = CardColor(
+            (game.deck.top.color + (1 if game.reverse else -1)) % 6
+        )
+        game.deck.set_next_color(color)
+        game.player.push_event(GameEvents.GAME_SELECT_COLOR, str(color))
 
 
 class WildColorBehavior(BaseWildBehavior):
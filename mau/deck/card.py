@@ -1,17 +1,27 @@
-"""Игровые карты Mau."""
+"""Игровые карты Mau.
+
+Все возможные карты создаются один раз при загрузке модуля и хранятся
+в общей таблице карт.
+Каждая карта неизменяема и имеет свой небольшой числовой ID.
+Игры, колоды и игроки хранят ссылки на одни и те же экземпляры.
+"""
 
-import re
 from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Self
 
 from mau.deck import behavior
-from mau.deck.behavior import BaseWildBehavior, NumberBehavior
+from mau.deck.behavior import (
+    BaseWildBehavior,
+    NumberBehavior,
+    TakeBehavior,
+    WildTakeBehavior,
+)
 from mau.enums import CardColor
 
 if TYPE_CHECKING:
     from mau.game.game import MauGame
 
-CARD_REGEX = re.compile(r"(\d)_(\d)_(\d+)_([a-z+]+)")
 CARD_BEHAVIOR = {
     "rotate": behavior.RotateBehavior,
     "twist": behavior.TwistBehavior,
@@ -23,49 +33,51 @@ CARD_BEHAVIOR = {
     "wild+take": behavior.WildTakeBehavior,
 }
 
+# Возможные значения карт, в строке карты занимают одну цифру
+CARD_VALUES = range(10)
+
 
+@dataclass(slots=True, frozen=True, eq=False)
 class MauCard:
     """Описание каждой карты Mau.
 
     Предоставляет общий функционал для всех карт.
+    Карты неизменяемы, получить карту можно из таблицы карт `CARDS`.
+    Если карте нужен другой цвет, то берётся другая карта из таблицы.
     """
 
-    __slots__ = ("color", "value", "cost", "behavior")
+    color: CardColor
+    value: int
+    cost: int
+    behavior: NumberBehavior
+    id: int = -1
+    _pack: str = field(init=False, repr=False)
 
-    def __init__(
-        self, color: CardColor, value: int, cost: int, behavior: NumberBehavior
-    ) -> None:
-        self.color: CardColor = color
-        self.value: int = value
-        self.cost: int = cost
-        self.behavior = behavior
+    def __post_init__(self) -> None:
+        """Заранее собирает строку карты."""
+        object.__setattr__(
+            self,
+            "_pack",
+            f"{self.color.value}_{self.value}_{self.cost}_{self.behavior.name}",
+        )
 
     @classmethod
-    def unpack(cls, card_str: str) -> Self | None:
+    def unpack(cls, card_str: str) -> "MauCard | None":
         """Превращает упакованную строку карты в её экземпляр.
 
         Обратное действие для получения экземпляра карты из строки.
         Используется уже при обработке отправленного стикеров.
+        Всё что идёт после `:` в строке игнорируется.
         """
-        card_match = CARD_REGEX.match(card_str)
-        if card_match is None:
-            return None
-
-        color, value, cost, card_behavior = card_match.groups()
-        card_behavior = CARD_BEHAVIOR[card_behavior]
-
-        return cls(
-            color=CardColor(int(color)),
-            value=int(value),
-            cost=card_behavior.cost or int(value),
-            behavior=card_behavior(),
-        )
+        return CARDS.unpack(card_str)
 
     def pack(self) -> str:
         """запаковывает карту в строку."""
-        return (
-            f"{self.color.value}_{self.value}_{self.cost}_{self.behavior.name}"
-        )
+        return self._pack
+
+    def with_color(self, color: CardColor) -> "MauCard":
+        """Возвращает такую же карту, но другого цвета."""
+        return CARDS.get(color, self.value, self.behavior.name)
 
     def can_cover(self, other_card: Self) -> bool:
         """Проверяет что другая карта может покрыть текущую.
@@ -129,11 +141,11 @@ class MauCard:
         if not isinstance(other, MauCard):
             return NotImplemented
 
-        return (
-            self.color == other.color
-            and self.behavior == other.behavior
-            and self.value == other.value
-        )
+        return self.id == other.id
+
+    def __hash__(self) -> int:
+        """Карты одного цвета, значения и поведения имеют один ID."""
+        return self.id
 
     def __lt__(self, other_card: object) -> bool:
         """Проверяет что данная карта меньшей стоимости чем прочая."""
@@ -145,3 +157,105 @@ class MauCard:
             and self.value < other_card.value
             and self.cost < other_card.cost
         )
+
+
+class CardTable:
+    """Таблица всех возможных карт.
+
+    Для каждого сочетания цвета, значения и поведения хранит ровно одну
+    карту.
+    ID карты совпадает с её индексом в таблице.
+    Позволяет за O(1) получить карту по ID, описанию или строке.
+
+    Также заранее считает битовые маски карт.
+    Бит с номером ID карты говорит о том, входит ли карта в маску.
+    Так проверка, чем можно покрыть карту, сводится к паре
+    битовых операций вместо проверки каждой карты в руке.
+    """
+
+    __slots__ = (
+        "_cards",
+        "_color_masks",
+        "_cover_masks",
+        "_index",
+        "_packs",
+        "take_mask",
+    )
+
+    def __init__(self, behaviors: dict[str, type[NumberBehavior]]) -> None:
+        self._cards: list[MauCard] = []
+        self._index: dict[tuple[int, int, str], MauCard] = {}
+        self._packs: dict[str, MauCard] = {}
+
+        for name, behavior_type in behaviors.items():
+            card_behavior = behavior_type()
+            for color in CardColor:
+                for value in CARD_VALUES:
+                    card = MauCard(
+                        color,
+                        value,
+                        card_behavior.cost or value,
+                        card_behavior,
+                        len(self._cards),
+                    )
+                    self._cards.append(card)
+                    self._index[(color, value, name)] = card
+                    self._packs[card.pack()] = card
+
+        self._color_masks = [0] * len(CardColor)
+        kind_masks: dict[tuple[str, int], int] = {}
+        wild_mask = 0
+        # Карты взятия, которыми можно перебить другую карту взятия
+        self.take_mask = 0
+        for card in self._cards:
+            bit = 1 << card.id
+            self._color_masks[card.color] |= bit
+            kind = (card.behavior.name, card.value)
+            kind_masks[kind] = kind_masks.get(kind, 0) | bit
+            if isinstance(card.behavior, BaseWildBehavior):
+                wild_mask |= bit
+            if isinstance(card.behavior, TakeBehavior | WildTakeBehavior):
+                self.take_mask |= bit
+
+        # Повторяет правила из MauCard.can_cover
+        self._cover_masks = [
+            wild_mask
+            | self._color_masks[card.color]
+            | kind_masks[(card.behavior.name, card.value)]
+            for card in self._cards
+        ]
+
+    def get(self, color: CardColor, value: int, behavior: str) -> MauCard:
+        """Возвращает карту по её цвету, значению и названию поведения."""
+        return self._index[(color, value, behavior)]
+
+    def unpack(self, card_str: str) -> MauCard | None:
+        """Возвращает карту по упакованной строке.
+
+        Если такой карты нет, вернёт None.
+        """
+        return self._packs.get(card_str.split(":", 1)[0])
+
+    def cover_mask(self, card: MauCard) -> int:
+        """Маска всех карт, которыми можно покрыть данную карту."""
+        return self._cover_masks[card.id]
+
+    def color_mask(self, color: CardColor) -> int:
+        """Маска всех карт указанного цвета."""
+        return self._color_masks[color]
+
+    def __getitem__(self, card_id: int) -> MauCard:
+        """Возвращает карту по её ID."""
+        return self._cards[card_id]
+
+    def __len__(self) -> int:
+        """Количество всех возможных карт."""
+        return len(self._cards)
+
+    def __iter__(self) -> Iterator[MauCard]:
+        """Проходится по всем картам в порядке их ID."""
+        return iter(self._cards)
+
+
+# Общая таблица всех карт
+CARDS = CardTable(CARD_BEHAVIOR)
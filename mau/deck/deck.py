@@ -4,22 +4,24 @@
 После эти карты могут перемещаться в руку игрока или обратно в колоду.
 """
 
-from collections.abc import Iterator
-from random import choice, randint, shuffle
+from array import array
+from collections.abc import Iterable, Iterator
+from random import randint, shuffle
 from typing import TYPE_CHECKING
 
 from loguru import logger
 
-from mau.deck import behavior
 from mau.deck.behavior import BaseWildBehavior
-from mau.deck.card import MauCard
+from mau.deck.card import CARDS, MauCard
 from mau.enums import CardColor
+from mau.exceptions import NotEnoughCardsError
+from mau.snapshot import SnapshotReader, SnapshotWriter
 
 if TYPE_CHECKING:
     from mau.game.game import MauGame
 
 
-def deck_colors(cards: list[MauCard]) -> list[CardColor]:
+def deck_colors(cards: Iterable[MauCard]) -> list[CardColor]:
     """Возвращает все использованные цвета в колоде, исключая дикие карты."""
     res = []
     for card in cards:
@@ -31,18 +33,6 @@ def deck_colors(cards: list[MauCard]) -> list[CardColor]:
     return sorted(res)
 
 
-# TODO: Плохо выглядит, устранить
-_BEHAVIORS = [
-    behavior.NumberBehavior(),
-    behavior.ReverseBehavior(),
-    behavior.TurnBehavior(),
-    behavior.TakeBehavior(),
-    behavior.WildTakeBehavior(),
-    behavior.WildColorBehavior(),
-    behavior.TwistBehavior(),
-    behavior.RotateBehavior(),
-]
-
 _COLORS = [
     CardColor(0),
     CardColor(1),
@@ -55,13 +45,18 @@ _COLORS = [
 ]
 
 
+# Отсутствующая карта или цвет в снимке колоды
+_NO_CARD = 0xFFFF
+_NO_COLOR = 0xFF
+_NO_COLORS = 0xFFFF
+
+
 def random_card() -> MauCard:
-    """Отдаёт случайную карту."""
-    value = randint(0, 9)
-    behavior = choice(_BEHAVIORS)
-    cost = behavior.cost or value
+    """Отдаёт случайную карту.
 
-    return MauCard(CardColor(randint(0, 7)), value, cost, behavior)
+    Цвет, значение и поведение карты выбираются случайно.
+    """
+    return CARDS[randint(0, len(CARDS) - 1)]
 
 
 class Deck:
@@ -73,12 +68,23 @@ class Deck:
     Предоставляется методы для добавления, удаления и перемещения карт.
     """
 
-    __slots__ = ("cards", "used_cards", "_top", "_colors", "_wild_color")
+    __slots__ = (
+        "cards",
+        "used_cards",
+        "_top",
+        "_face",
+        "_next_color",
+        "_colors",
+        "_wild_color",
+    )
 
     def __init__(self, cards: list[MauCard] | None = None) -> None:
         self.cards: list[MauCard] = cards or []
         self.used_cards: list[MauCard] = []
         self._top: MauCard | None = None
+        # Верхняя карта с учётом выбранного для неё цвета
+        self._face: MauCard | None = None
+        self._next_color: CardColor | None = None
         self._colors: list[CardColor] | None = None
         self._wild_color: CardColor | None = None
 
@@ -98,10 +104,41 @@ class Deck:
 
     @property
     def top(self) -> MauCard:
-        """Возвращает верхнюю карту из колоды."""
-        if self._top is None:
-            self._top = self._get_top_card()
-        return self._top
+        """Возвращает верхнюю карту из колоды.
+
+        Если для верхней карты был выбран цвет, то вернёт эту же карту,
+        но выбранного цвета.
+        """
+        if self._face is None:
+            if self._top is None:
+                self._top = self._get_top_card()
+            self._face = self._top
+        return self._face
+
+    def set_color(self, color: CardColor) -> None:
+        """Выбирает цвет для верхней карты в этой колоде.
+
+        Сама карта при этом не изменяется.
+        При возвращении в колоду карта будет прежнего цвета.
+        """
+        self._face = self.top.with_color(color)
+
+    def set_next_color(self, color: CardColor) -> None:
+        """Выбирает цвет для карты, которая сейчас разыгрывается.
+
+        Цвет будет установлен, когда карта окажется на вершине стопки.
+        """
+        self._next_color = color
+
+    @property
+    def count(self) -> int:
+        """Сколько карт ещё можно взять из колоды."""
+        return len(self.cards)
+
+    @property
+    def used_count(self) -> int:
+        """Сколько карт лежит в стопке использованных."""
+        return len(self.used_cards)
 
     def _get_wild_color(self) -> CardColor:
         """Устанавливает основной цвет для диких карт."""
@@ -121,13 +158,15 @@ class Deck:
         self.cards = []
         self.used_cards = []
         self._top = None
+        self._face = None
+        self._next_color = None
 
     def _get_top_card(self) -> MauCard:
         """Устанавливает подходящую верную карту колоды."""
         for i, card in enumerate(self.cards):
             if not isinstance(card.behavior, BaseWildBehavior):
                 return self.cards.pop(i)
-        raise ValueError("No suitable card for deck top")
+        raise NotEnoughCardsError("No suitable card for deck top")
 
     def take(self, count: int = 1) -> Iterator[MauCard]:
         """Берёт несколько карт из колоды.
@@ -138,7 +177,7 @@ class Deck:
             self._prepared_used_cards()
 
         if len(self.cards) < count:
-            raise ValueError("Not enough cards to take")
+            raise NotEnoughCardsError("Not enough cards to take")
 
         for i in range(count):
             card = self.cards.pop()
@@ -147,8 +186,9 @@ class Deck:
 
     def count_until_cover(self) -> int:
         """Получает количество кард в колоде до покрывающей верную."""
+        cover = CARDS.cover_mask(self.top)
         for i, card in enumerate(reversed(self.cards)):
-            if self.top.can_cover(card):
+            if cover >> card.id & 1:
                 return i + 1
         return 1
 
@@ -164,20 +204,167 @@ class Deck:
         self.used_cards.append(card)
 
     def put_top(self, card: MauCard, game: "MauGame") -> None:
-        """Ложит карту на вершину стопки."""
-        if self._top is None:
-            self._top = card
-            return
+        """Ложит карту на вершину стопки.
+
+        Прошлая верхняя карта возвращается в колоду.
+        """
+        if self._top is not None:
+            self._top.prepare_used(game)
+            self.put(self._top)
 
-        self._top.prepare_used(game)
-        self.put(self._top)
         self._top = card
+        if self._next_color is None:
+            self._face = card
+        else:
+            self._face = card.with_color(self._next_color)
+            self._next_color = None
+
+    def _dump_piles(self, w: SnapshotWriter) -> None:
+        w.ids(card.id for card in self.cards)
+        w.ids(card.id for card in self.used_cards)
+
+    def _load_piles(self, r: SnapshotReader) -> None:
+        self.cards = [CARDS[i] for i in r.ids()]
+        self.used_cards = [CARDS[i] for i in r.ids()]
+
+    def dump(self, w: SnapshotWriter) -> None:
+        """Записывает состояние колоды в снимок игры."""
+        w.u16(_NO_CARD if self._top is None else self._top.id)
+        w.u16(_NO_CARD if self._face is None else self._face.id)
+        w.u8(_NO_COLOR if self._next_color is None else self._next_color)
+        # Цвета колоды запоминаются при первом обращении
+        if self._colors is None:
+            w.u16(_NO_COLORS)
+        else:
+            w.u16(sum(1 << color for color in self._colors))
+        self._dump_piles(w)
+
+    def load(self, r: SnapshotReader) -> None:
+        """Восстанавливает состояние колоды из снимка игры."""
+        top, face, next_color = r.u16(), r.u16(), r.u8()
+        self._top = None if top == _NO_CARD else CARDS[top]
+        self._face = None if face == _NO_CARD else CARDS[face]
+        self._next_color = (
+            None if next_color == _NO_COLOR else CardColor(next_color)
+        )
+        colors = r.u16()
+        self._colors = (
+            None
+            if colors == _NO_COLORS
+            else [color for color in _COLORS if colors >> color & 1]
+        )
+        self._load_piles(r)
+
+
+class CompactDeck(Deck):
+    """Компактная колода карт.
+
+    Вместо списков карт хранит ID карт в массивах `array('H')`.
+    Колода собирается из общего неизменяемого шаблона, так что на каждую
+    карту в колоде приходится всего два байта.
+    Экземпляры карт достаются из общей таблицы только когда карта
+    попадает в руку игрока или на верх стопки.
+
+    Списки `cards` и `used_cards` в этом режиме не используются.
+    """
+
+    __slots__ = ("_draw", "_discard")
+
+    def __init__(self, template: bytes = b"") -> None:
+        super().__init__()
+        self._draw: array[int] = array("H")
+        self._draw.frombytes(template)
+        self._discard: array[int] = array("H")
+
+    @property
+    def colors(self) -> list[CardColor]:
+        """Получает список всех используемых цветов в колоде."""
+        if self._colors is None:
+            self._colors = deck_colors(CARDS[i] for i in set(self._draw))
+        return self._colors
+
+    @property
+    def count(self) -> int:
+        """Сколько карт ещё можно взять из колоды."""
+        return len(self._draw)
+
+    @property
+    def used_count(self) -> int:
+        """Сколько карт лежит в стопке использованных."""
+        return len(self._discard)
+
+    def shuffle(self) -> None:
+        """Перемешивает доступные карты в колоде."""
+        logger.debug("Shuffle deck")
+        shuffle(self._draw)
+
+    def clear(self) -> None:
+        """Очищает колоду карт."""
+        super().clear()
+        self._draw = array("H")
+        self._discard = array("H")
+
+    def _get_top_card(self) -> MauCard:
+        """Устанавливает подходящую верную карту колоды.
+
+        Карта ищется с конца, чтобы не сдвигать весь массив.
+        """
+        for i in range(len(self._draw) - 1, -1, -1):
+            card = CARDS[self._draw[i]]
+            if not isinstance(card.behavior, BaseWildBehavior):
+                del self._draw[i]
+                return card
+        raise NotEnoughCardsError("No suitable card for deck top")
+
+    def take(self, count: int = 1) -> Iterator[MauCard]:
+        """Берёт несколько карт из колоды.
+
+        Используется чтобы дать участнику несколько карт.
+        """
+        if len(self._draw) < count:
+            self._prepared_used_cards()
+
+        if len(self._draw) < count:
+            raise NotEnoughCardsError("Not enough cards to take")
+
+        taken = self._draw[len(self._draw) - count :]
+        del self._draw[len(self._draw) - count :]
+        for i, card_id in enumerate(reversed(taken)):
+            card = CARDS[card_id]
+            logger.debug("Take {} / {} card: {}", i, count, card)
+            yield card
+
+    def count_until_cover(self) -> int:
+        """Получает количество кард в колоде до покрывающей верную."""
+        cover = CARDS.cover_mask(self.top)
+        for i, card_id in enumerate(reversed(self._draw)):
+            if cover >> card_id & 1:
+                return i + 1
+        return 1
+
+    def _prepared_used_cards(self) -> None:
+        """Возвращает использованные карты в колоду."""
+        self._draw.extend(self._discard)
+        self._discard = array("H")
+        self.shuffle()
+
+    def put(self, card: MauCard) -> None:
+        """Возвращает использованную карту в колоду."""
+        self._discard.append(card.id)
+
+    def _dump_piles(self, w: SnapshotWriter) -> None:
+        w.ids(self._draw)
+        w.ids(self._discard)
+
+    def _load_piles(self, r: SnapshotReader) -> None:
+        self._draw = r.ids()
+        self._discard = r.ids()
 
 
 class RandomDeck(Deck):
     """Колода случайных карт."""
 
-    __slots__ = ("cards", "used_cards", "_top", "_colors")
+    __slots__ = ()
 
     def __init__(self) -> None:
         super().__init__([])
@@ -211,7 +398,3 @@ class RandomDeck(Deck):
     def put(self, card: MauCard) -> None:
         """Возвращает использованную карту в колоду."""
         logger.debug("Put {}", card)
-
-    def put_top(self, card: MauCard, game: "MauGame") -> None:
-        """Ложит карту на вершину стопки."""
-        self._top = card
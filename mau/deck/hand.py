@@ -0,0 +1,145 @@
+"""Рука игрока.
+
+Хранит карты игрока в уже отсортированном виде, а также битовую
+маску карт в руке.
+Вместе с масками из таблицы карт позволяет быстро узнать, есть ли
+у игрока подходящие карты, не перебирая всю руку.
+"""
+
+from bisect import insort
+from collections.abc import Iterable, Iterator
+from typing import Self
+
+from mau.deck.card import MauCard
+
+
+def _sort_key(card: MauCard) -> int:
+    # Сначала идут самые дорогие карты
+    return -card.cost
+
+
+class Hand:
+    """Карты в руке игрока.
+
+    Карты всегда отсортированы по убыванию стоимости.
+    Порядок поддерживается при каждом добавлении карты, поэтому руку
+    не нужно сортировать заново при каждом запросе.
+
+    Помимо списка карт хранит количество каждой карты и битовую маску
+    карт в руке, где номер бита совпадает с ID карты.
+    """
+
+    __slots__ = ("_cards", "_cost", "_counts", "_mask")
+
+    def __init__(self, cards: Iterable[MauCard] = ()) -> None:
+        self._cards: list[MauCard] = []
+        self._counts: dict[int, int] = {}
+        self._mask = 0
+        self._cost = 0
+        self.extend(cards)
+
+    @classmethod
+    def from_sorted(cls, cards: Iterable[MauCard]) -> Self:
+        """Собирает руку из уже отсортированных карт.
+
+        Порядок карт не проверяется.
+        Используется при восстановлении руки из снимка игры.
+        """
+        hand = cls()
+        hand._cards = list(cards)
+        for card in hand._cards:
+            hand._counts[card.id] = hand._counts.get(card.id, 0) + 1
+            hand._mask |= 1 << card.id
+            hand._cost += card.cost
+        return hand
+
+    @property
+    def mask(self) -> int:
+        """Битовая маска всех карт в руке."""
+        return self._mask
+
+    @property
+    def cost(self) -> int:
+        """Общая стоимость всех карт в руке."""
+        return self._cost
+
+    def append(self, card: MauCard) -> None:
+        """Добавляет карту в руку, сохраняя порядок."""
+        insort(self._cards, card, key=_sort_key)
+        self._counts[card.id] = self._counts.get(card.id, 0) + 1
+        self._mask |= 1 << card.id
+        self._cost += card.cost
+
+    def extend(self, cards: Iterable[MauCard]) -> None:
+        """Добавляет несколько карт в руку."""
+        for card in cards:
+            self.append(card)
+
+    def remove(self, card: MauCard) -> None:
+        """Убирает одну такую карту из руки.
+
+        Если такой карты в руке нет, вызывает ValueError.
+        """
+        self._cards.remove(card)
+        count = self._counts[card.id] - 1
+        if count:
+            self._counts[card.id] = count
+        else:
+            del self._counts[card.id]
+            self._mask &= ~(1 << card.id)
+        self._cost -= card.cost
+
+    def clear(self) -> None:
+        """Убирает все карты из руки."""
+        self._cards.clear()
+        self._counts.clear()
+        self._mask = 0
+        self._cost = 0
+
+    def copy(self) -> Self:
+        """Возвращает копию руки."""
+        hand = type(self)()
+        hand._cards = self._cards.copy()
+        hand._counts = self._counts.copy()
+        hand._mask = self._mask
+        hand._cost = self._cost
+        return hand
+
+    def count(self, card: MauCard) -> int:
+        """Сколько таких карт в руке."""
+        return self._counts.get(card.id, 0)
+
+    def has_any(self, mask: int) -> bool:
+        """Есть ли в руке хотя бы одна карта из маски."""
+        return self._mask & mask != 0
+
+    def select(self, mask: int) -> list[MauCard]:
+        """Возвращает карты из маски в порядке руки."""
+        return [card for card in self._cards if mask >> card.id & 1]
+
+    def split(self, mask: int) -> tuple[list[MauCard], list[MauCard]]:
+        """Делит руку на карты из маски и все остальные."""
+        selected: list[MauCard] = []
+        other: list[MauCard] = []
+        for card in self._cards:
+            if mask >> card.id & 1:
+                selected.append(card)
+            else:
+                other.append(card)
+        return selected, other
+
+    def __len__(self) -> int:
+        """Количество карт в руке."""
+        return len(self._cards)
+
+    def __iter__(self) -> Iterator[MauCard]:
+        """Проходится по картам от самой дорогой."""
+        return iter(self._cards)
+
+    def __contains__(self, card: object) -> bool:
+        """Есть ли такая карта в руке."""
+        return isinstance(card, MauCard) and self._mask >> card.id & 1 == 1
+
+    def __repr__(self) -> str:
+        """Представление руки для отладки."""
+        return f"Hand<{self._cards}>"
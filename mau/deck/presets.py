@@ -4,14 +4,17 @@
 или по готовым шаблонам.
 """
 
+from array import array
 from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from functools import cache
 from typing import Self
 
 from mau.deck import behavior
-from mau.deck.card import MauCard
-from mau.deck.deck import Deck
+from mau.deck.card import CARD_BEHAVIOR, CARDS, MauCard
+from mau.deck.deck import CompactDeck, Deck
 from mau.enums import CardColor
+from mau.snapshot import SnapshotReader, SnapshotWriter
 
 
 @dataclass(slots=True, frozen=True)
@@ -36,12 +39,7 @@ class CardGroup:
         """
         for count in range(self.count):
             for color in self.colors:
-                yield MauCard(
-                    color,
-                    self.value,
-                    self.behavior.cost or self.value,
-                    self.behavior,
-                )
+                yield CARDS.get(color, self.value, self.behavior.name)
 
 
 @dataclass(slots=True, frozen=True)
@@ -153,32 +151,111 @@ CARD_PRESETS: dict[str, DeckPreset] = {
 }
 
 
+def _pack_template(groups: Iterable[CardGroup]) -> bytes:
+    return array(
+        "H", (card.id for group in groups for card in group.cards())
+    ).tobytes()
+
+
+@cache
+def preset_template(preset_name: str) -> bytes:
+    """Возвращает общий шаблон компактной колоды для пресета.
+
+    Шаблон представляет собой ID всех карт пресета, упакованные в
+    байты массива `array('H')`.
+    Собирается один раз и используется всеми играми.
+    """
+    return _pack_template(CARD_PRESETS[preset_name].groups)
+
+
 class DeckGenerator:
     """Генератор колоды.
 
     Собирает колоду карт, используя группы карт.
     Позволяет редактировать правила сборки колоды.
+
+    Args:
+        groups: Группы карт, из которых собирается колода.
+        preset_name: Название шаблона колоды.
+        compact: Собирать компактную колоду из ID карт.
+
     """
 
     def __init__(
         self,
         groups: list[CardGroup] | None = None,
         preset_name: str = "custom",
+        compact: bool = False,
     ) -> None:
         self.groups: list[CardGroup] = groups or []
         self.preset_name = preset_name
+        self.compact = compact
 
     def _cards(self) -> Iterator[MauCard]:
         """Получает полный список карт для всего шаблона со всех групп."""
         for group in self.groups:
             yield from group.cards()
 
+    def _is_preset(self) -> bool:
+        preset = CARD_PRESETS.get(self.preset_name)
+        return preset is not None and tuple(self.groups) == tuple(preset.groups)
+
+    @property
+    def template(self) -> bytes:
+        """Возвращает шаблон для компактной колоды.
+
+        Для готовых шаблонов колоды используется общий шаблон.
+        """
+        if self._is_preset():
+            return preset_template(self.preset_name)
+        return _pack_template(self.groups)
+
     @property
     def deck(self) -> Deck:
         """Собирает новую колоду из правил."""
+        if self.compact:
+            return CompactDeck(self.template)
         return Deck(list(self._cards()))
 
     @classmethod
-    def from_preset(cls, preset_name: str) -> Self:
+    def from_preset(cls, preset_name: str, compact: bool = False) -> Self:
         """Получает новый генератор колоды по названию шаблона."""
-        return cls(list(CARD_PRESETS[preset_name].groups), preset_name)
+        return cls(list(CARD_PRESETS[preset_name].groups), preset_name, compact)
+
+    def dump(self, w: SnapshotWriter) -> None:
+        """Записывает правила сборки колоды в снимок игры.
+
+        Для готовых шаблонов записывается только название шаблона.
+        """
+        w.text(self.preset_name)
+        w.u8(self.compact)
+        if self._is_preset():
+            w.u8(0)
+            return
+
+        w.u8(len(self.groups))
+        for group in self.groups:
+            w.text(group.behavior.name)
+            w.u8(group.value)
+            w.ids(group.colors)
+            w.u8(group.count)
+
+    @classmethod
+    def load(cls, r: SnapshotReader) -> Self:
+        """Восстанавливает правила сборки колоды из снимка игры."""
+        preset_name = r.text()
+        compact = bool(r.u8())
+        count = r.u8()
+        if count == 0 and preset_name in CARD_PRESETS:
+            return cls.from_preset(preset_name, compact)
+
+        groups = [
+            CardGroup(
+                CARD_BEHAVIOR[r.text()](),
+                r.u8(),
+                [CardColor(c) for c in r.ids()],
+                r.u8(),
+            )
+            for _ in range(count)
+        ]
+        return cls(groups, preset_name, compact)
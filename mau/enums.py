@@ -66,6 +66,7 @@ class GameEvents(IntEnum):
     - `player_take`: Взятие карт из колоды, также вместо револьвера.
     - `player_push`: Игрок использует карту.
     - `player_intervened`: Игрок вмешался в ход другого игрока.
+    - `player_skip`: Ход игрока пропущен за бездействие.
     """
 
     SESSION_START = 10
@@ -86,6 +87,7 @@ class GameEvents(IntEnum):
     PLAYER_TAKE = 32
     PLAYER_PUSH = 33
     PLAYER_INTERVENED = 34
+    PLAYER_SKIP = 35
 
 
 class GameState(IntEnum):
@@ -0,0 +1,378 @@
+"""Журнал игровых событий на диске.
+
+`EventLog` оборачивает обработчик событий и дописывает каждое событие
+в двоичный журнал, прежде чем передать его дальше.
+Журнал пригодится чтобы разобрать сломанную игру, собрать статистику
+или набрать игры для проверки движка, не воспроизводя их вживую.
+
+Журнал состоит из сегментов в одной директории: `000001.events`,
+`000002.events` и так далее.
+Записи только дописываются в конец последнего сегмента.
+Когда сегмент становится больше `segment_size`, начинается следующий.
+Каждый запуск также начинает новый сегмент.
+
+Сегмент начинается с заголовка: `MAUL`, номер версии, время по часам
+и монотонное время в наносекундах на момент создания сегмента.
+По ним монотонное время записи переводится в обычное.
+
+Каждая запись начинается со своей длины и контрольной суммы CRC32,
+после идут монотонное время в наносекундах, код события, длины полей
+и сами поля: комната, игрок, данные события и состояние игры.
+Числа записываются в little-endian, строки в UTF-8.
+
+Движок берёт случайные числа из общего модуля `random`, потому
+у игры нет своего зерна.
+Вместо него событие начала игры хранит снимок игры сразу после
+перемешивания колоды.
+Из снимка игру можно восстановить через `SessionManager.restore_game`
+и повторить записанные ходы.
+
+```sh
+py -m mau.event_log events/ --stats
+py -m mau.event_log events/ --room -100123 --event game_turn
+```
+"""
+
+import argparse
+import mmap
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from io import BufferedWriter
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from struct import Struct
+from threading import Thread
+from zlib import crc32
+
+from loguru import logger
+
+from mau.enums import GameEvents
+from mau.events import BaseEventHandler, Event
+
+# Заголовок сегмента журнала
+LOG_MAGIC = b"MAUL"
+# Текущая версия формата журнала
+LOG_VERSION = 1
+# Расширение файлов сегментов
+SEGMENT_SUFFIX = ".events"
+
+# Заголовок, версия, время по часам и монотонное время
+_SEGMENT = Struct("<4sBdQ")
+# Длина записи без этих полей и её контрольная сумма
+_HEAD = Struct("<II")
+# Время, код события, длины комнаты, игрока, данных и состояния
+_BODY = Struct("<QBHHII")
+# Сколько записей записывать за раз
+_BATCH = 1024
+
+
+def _segment_name(index: int) -> str:
+    return f"{index:06d}{SEGMENT_SUFFIX}"
+
+
+def _segments(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+    return sorted(path.glob(f"*{SEGMENT_SUFFIX}"))
+
+
+class EventLog(BaseEventHandler):
+    """Записывает игровые события в журнал на диске.
+
+    Каждое событие превращается в байты сразу, после чего передаётся
+    в обёрнутый обработчик.
+    Запись на диск происходит пачками в отдельном потоке, потому
+    игровые действия никогда не ждут диска.
+
+    Args:
+        handler: Обработчик, которому передаются события.
+        path: Директория для сегментов журнала.
+        segment_size: После какого размера в байтах начинается
+            новый сегмент.
+
+    """
+
+    __slots__ = (
+        "_file",
+        "_handler",
+        "_index",
+        "_path",
+        "_queue",
+        "_writer",
+        "segment_size",
+    )
+
+    def __init__(
+        self,
+        handler: BaseEventHandler,
+        path: str | Path,
+        segment_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        self._handler = handler
+        self._path = Path(path)
+        self._path.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+
+        segments = _segments(self._path)
+        self._index = int(segments[-1].stem) if segments else 0
+        self._file = self._open_segment()
+
+        self._queue: SimpleQueue[tuple[bytes, bytes] | None] = SimpleQueue()
+        self._writer = Thread(
+            target=self._write_loop, name="event-log", daemon=True
+        )
+        self._writer.start()
+
+    @property
+    def handler(self) -> BaseEventHandler:
+        """Обёрнутый обработчик событий."""
+        return self._handler
+
+    def _open_segment(self) -> BufferedWriter:
+        self._index += 1
+        segment = self._path / _segment_name(self._index)
+        logger.info("Write game events to {}", segment)
+        file = segment.open("ab")
+        file.write(
+            _SEGMENT.pack(
+                LOG_MAGIC, LOG_VERSION, time.time(), time.monotonic_ns()
+            )
+        )
+        return file
+
+    def _write_batch(self, batch: list[tuple[bytes, bytes]]) -> None:
+        self._file.write(
+            b"".join(
+                _HEAD.pack(len(body) + len(tail), crc32(tail, crc32(body)))
+                + body
+                + tail
+                for body, tail in batch
+            )
+        )
+        self._file.flush()
+        if self._file.tell() >= self.segment_size:
+            self._file.close()
+            self._file = self._open_segment()
+
+    def _write_loop(self) -> None:
+        while (item := self._queue.get()) is not None:
+            batch = [item]
+            try:
+                while len(batch) < _BATCH:
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        self._queue.put(None)
+                        break
+                    batch.append(item)
+            except Empty:
+                pass
+
+            try:
+                self._write_batch(batch)
+            except OSError:
+                logger.exception("Failed to write {} game events", len(batch))
+
+    def push(self, event: Event) -> None:
+        """Записывает событие в журнал и передаёт его обработчику."""
+        room = event.game.room_id.encode()
+        player = event.player.user_id.encode()
+        data = event.data.encode()
+        state = (
+            event.game.snapshot()
+            if event.event_type == GameEvents.GAME_START
+            else b""
+        )
+        body = _BODY.pack(
+            time.monotonic_ns(),
+            event.event_type,
+            len(room),
+            len(player),
+            len(data),
+            len(state),
+        )
+        self._queue.put((body, room + player + data + state))
+        self._handler.push(event)
+
+    def close(self) -> None:
+        """Дожидается записи всех событий и закрывает журнал."""
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+
+@dataclass(slots=True, frozen=True)
+class LogRecord:
+    """Запись журнала событий.
+
+    - `time`: Время события по часам, в секундах.
+    - `room_id`: В какой комнате произошло событие.
+    - `player_id`: Какой игрок совершил событие.
+    - `event_type`: Тип события.
+    - `data`: Подробная информация о событии.
+    - `state`: Снимок игры для события начала игры, иначе пусто.
+    """
+
+    time: float
+    room_id: str
+    player_id: str
+    event_type: GameEvents
+    data: str
+    state: bytes
+
+    @property
+    def text(self) -> str:
+        """Запись одной строкой для вывода."""
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        return (
+            f"{stamp} {self.room_id} {self.player_id} "
+            f"{self.event_type.name.lower()} {self.data}"
+        ).rstrip()
+
+
+class EventLogReader:
+    """Читает записи журнала событий.
+
+    Сегменты отображаются в память через `mmap`, а записи проверяются
+    по комнате и типу события ещё до разбора полей.
+    Чтение останавливается на недописанной или повреждённой записи в
+    конце сегмента, к примеру после аварийного завершения бота.
+
+    Args:
+        path: Директория журнала или отдельный сегмент.
+
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def segments(self) -> list[Path]:
+        """Сегменты журнала по порядку."""
+        return _segments(self.path)
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        """Все записи журнала по порядку."""
+        return self.records()
+
+    def records(
+        self, room_id: str | None = None, event_type: GameEvents | None = None
+    ) -> Iterator[LogRecord]:
+        """Записи журнала по порядку.
+
+        Если указаны комната или тип события, возвращает только
+        подходящие записи.
+        """
+        room = room_id.encode() if room_id is not None else None
+        for segment in self.segments():
+            yield from self._read_segment(segment, room, event_type)
+
+    def _read_segment(
+        self,
+        segment: Path,
+        room: bytes | None,
+        event_type: GameEvents | None,
+    ) -> Iterator[LogRecord]:
+        with segment.open("rb") as f:
+            if segment.stat().st_size < _SEGMENT.size:
+                return
+            with (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+                memoryview(mm) as view,
+            ):
+                magic, version, wall, mono = _SEGMENT.unpack_from(view)
+                if magic != LOG_MAGIC or version != LOG_VERSION:
+                    logger.warning("Skip unknown event log {}", segment)
+                    return
+                yield from self._read_records(
+                    view, segment, wall - mono / 1e9, room, event_type
+                )
+
+    def _read_records(  # noqa: PLR0913
+        self,
+        view: memoryview,
+        segment: Path,
+        offset: float,
+        room: bytes | None,
+        event_type: GameEvents | None,
+    ) -> Iterator[LogRecord]:
+        pos = _SEGMENT.size
+        end = len(view)
+        while pos + _HEAD.size <= end:
+            size, checksum = _HEAD.unpack_from(view, pos)
+            start = pos + _HEAD.size
+            pos = start + size
+            if pos > end:
+                break
+            if crc32(view[start:pos]) != checksum:
+                logger.warning("Broken event record in {}", segment)
+                break
+
+            mono, code, room_len, player_len, data_len, state_len = (
+                _BODY.unpack_from(view, start)
+            )
+            if event_type is not None and code != event_type:
+                continue
+            field = start + _BODY.size
+            room_end = field + room_len
+            if room is not None and view[field:room_end] != room:
+                continue
+
+            player_end = room_end + player_len
+            data_end = player_end + data_len
+            yield LogRecord(
+                offset + mono / 1e9,
+                str(view[field:room_end], "utf-8"),
+                str(view[room_end:player_end], "utf-8"),
+                GameEvents(code),
+                str(view[player_end:data_end], "utf-8"),
+                view[data_end : data_end + state_len].tobytes(),
+            )
+
+
+def _print_stats(records: Iterator[LogRecord]) -> None:
+    events: Counter[GameEvents] = Counter()
+    rooms: set[str] = set()
+    first = last = 0.0
+    for record in records:
+        events[record.event_type] += 1
+        rooms.add(record.room_id)
+        first = first or record.time
+        last = record.time
+
+    print(f"records: {events.total()}, rooms: {len(rooms)}")
+    if events:
+        print(f"span: {last - first:.1f} s")
+    for event, count in events.most_common():
+        print(f"{event.name.lower():<20} {count:>10}")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит записи журнала событий или сводку по ним."""
+    parser = argparse.ArgumentParser(prog="mau.event_log")
+    parser.add_argument("path", type=Path, help="log directory or segment")
+    parser.add_argument("--room", help="only events of this room")
+    parser.add_argument(
+        "--event",
+        choices=[e.name.lower() for e in GameEvents],
+        help="only events of this type",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="print event counts"
+    )
+    args = parser.parse_args(argv)
+
+    event_type = GameEvents[args.event.upper()] if args.event else None
+    records = EventLogReader(args.path).records(args.room, event_type)
+    if args.stats:
+        _print_stats(records)
+        return
+    for record in records:
+        print(record.text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,22 @@
+"""Возникающие во время работы исключения.
+
+Все исключения движка наследуются от стандартных исключений Python.
+Потому старый код, перехватывающий `ValueError` продолжит работать.
+"""
+
+
+class NotEnoughCardsError(ValueError):
+    """В колоде не осталось достаточно карт.
+
+    Возникает когда игрок пытается взять больше карт, чем есть в колоде
+    вместе с уже использованными картами, или когда в колоде нет карты,
+    которую можно положить на верх стопки.
+    """
+
+
+class SnapshotError(ValueError):
+    """Не удалось восстановить игру из снимка.
+
+    Возникает если снимок повреждён, обрезан или записан в неизвестной
+    версии формата.
+    """
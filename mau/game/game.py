@@ -1,19 +1,29 @@
 """Игровая сессия."""
 
 from datetime import datetime
-from random import randint
+from itertools import count
+from random import choice
+from typing import Self
 
 from loguru import logger
 
 from mau.deck.card import MauCard
-from mau.deck.deck import Deck, RandomDeck
+from mau.deck.deck import CompactDeck, Deck, RandomDeck
 from mau.deck.presets import DeckGenerator
 from mau.enums import CardColor, GameEvents, GameState
 from mau.events import BaseEventHandler, Event
+from mau.exceptions import SnapshotError
 from mau.game.player import BaseUser, Player
 from mau.game.player_manager import PlayerManager
 from mau.game.rules import GameRules
 from mau.game.shotgun import Shotgun
+from mau.snapshot import SnapshotReader, SnapshotWriter
+
+# Общий счётчик версий для всех игр, потому версии никогда не повторяются
+_VERSIONS = count()
+
+# Типы колод в снимке игры, записывается индекс типа
+_DECK_TYPES: tuple[type[Deck], ...] = (Deck, CompactDeck, RandomDeck)
 
 
 class MauGame:
@@ -51,6 +61,8 @@ class MauGame:
         self.take_counter: int = 0
         self.state: GameState = GameState.NEXT
         self.shotgun = Shotgun()
+        # Изменяется при каждом игровом событии
+        self.version = next(_VERSIONS)
 
         # Таймеры
         self.game_start = datetime.now()
@@ -69,13 +81,25 @@ class MauGame:
 
         return self.player == player or self.rules.intervention.status
 
+    def touch(self) -> None:
+        """Обновляет версию игры.
+
+        Вызывается после изменений игры, которые не сопровождаются
+        событием, к примеру при смене правил или колоды.
+        """
+        self.version = next(_VERSIONS)
+
     def push_event(
         self, from_player: Player, event_type: GameEvents, data: str = ""
     ) -> None:
         """Обёртка над методом journal.push.
 
         Автоматически подставляет текущую игру.
+        Все изменения игры сопровождаются событием, потому заодно
+        обновляет версию игры.
+        По версии можно понять, что состояние игры не изменилось.
         """
+        self.touch()
         self.event_handler.push(Event(self, from_player, event_type, data))
 
     def start(self) -> None:
@@ -92,6 +116,7 @@ class MauGame:
             self.shotgun.reset()
 
         self.started = True
+        self.turn_start = datetime.now()
         self.push_event(self.owner, GameEvents.GAME_START)
         self.deck.top(self)
 
@@ -103,7 +128,7 @@ class MauGame:
 
     def choose_color(self, color: CardColor) -> None:
         """Устанавливаем цвет для последней карты."""
-        self.deck.top.color = color
+        self.deck.set_color(color)
         self.push_event(self.player, GameEvents.GAME_SELECT_COLOR, str(color))
         self.next_turn()
 
@@ -116,6 +141,25 @@ class MauGame:
         logger.warning(self.pm._cp)
         self.push_event(self.player, GameEvents.GAME_TURN)
 
+    def skip_turn(self) -> None:
+        """Пропускает ход текущего игрока за долгое бездействие.
+
+        В наказание игрок берёт карты.
+        Если пропускается чёрная карта, ей выбирается случайный цвет.
+        """
+        player = self.player
+        self.take_counter += 1
+        player.take_cards()
+        self.push_event(player, GameEvents.PLAYER_SKIP)
+        # С правилом auto_skip игрок мог уже передать ход
+        if self.state != GameState.TAKE:
+            return
+
+        if self.deck.top.color == self.deck.wild_color:
+            self.choose_color(choice(self.deck.colors))
+        else:
+            self.next_turn()
+
     def join_player(self, user: BaseUser) -> Player | None:
         """Добавляет игрока в игру."""
         logger.info("Joining {} in game with id {}", user, self.room_id)
@@ -136,10 +180,9 @@ class MauGame:
     def leave_player(self, player: Player) -> None:
         """Удаляет пользователя из игры."""
         logger.info("Leaving {} game with id {}", player, self.room_id)
-        if len(player.hand) == 0:
+        won = len(player.hand) == 0
+        if won:
             self.push_event(player, GameEvents.GAME_LEAVE, "win")
-            if self.rules.one_winner.status:
-                self.end()
         else:
             self.push_event(player, GameEvents.GAME_LEAVE, "lose")
             if player == self.player:
@@ -147,10 +190,14 @@ class MauGame:
 
         # Если игрок решил закончить чёрной картой
         if self.state == GameState.CHOOSE_COLOR:
-            self.choose_color(CardColor(randint(0, 3)))
+            self.choose_color(choice(self.deck.colors))
 
+        # Победитель покидает игру раньше её завершения, чтобы попасть
+        # только в список победителей
         self.pm.remove(player)
-        if self.started and len(self.pm) <= 1:
+        if self.started and (
+            len(self.pm) <= 1 or (won and self.rules.one_winner.status)
+        ):
             self.end()
 
     # TODO: Может удалим?
@@ -195,7 +242,9 @@ class MauGame:
             if self.deck.top.cost == 1 and self.rules.side_effect.status:
                 logger.info("Player continue turn")
             elif self.rules.random_color.status:
-                self.choose_color(CardColor(randint(0, 3)))
+                # Карты больше не перекрашиваются насовсем, потому
+                # выбираем только из цветов, которые есть в колоде
+                self.choose_color(choice(self.deck.colors))
             else:
                 self.next_turn()
 
@@ -203,3 +252,93 @@ class MauGame:
         """Устанавливает новое состояние для игры."""
         self.state = state
         self.push_event(self.player, GameEvents.GAME_STATE, str(state.value))
+
+    # Снимки игры
+    # ===========
+
+    def snapshot(self) -> bytes:
+        """Сохраняет состояние игры в компактный двоичный снимок.
+
+        В снимок попадают правила, колода, игроки с их руками и порядок
+        ходов.
+        Обработчик событий и хранилище игроков в снимок не попадают.
+        """
+        w = SnapshotWriter()
+        w.text(self.room_id)
+        w.text(self.owner.user_id)
+        w.u32(self.rules.rule_flags)
+        self.deck_generator.dump(w)
+        w.u8(self.min_players)
+        w.u8(self.max_players)
+        w.u8(self.started | self.open << 1 | self.reverse << 2)
+        w.u16(self.take_counter)
+        w.u8(self.state)
+        w.f64(self.game_start.timestamp())
+        w.f64(self.turn_start.timestamp())
+        self.shotgun.dump(w)
+        w.u8(_DECK_TYPES.index(type(self.deck)))
+        self.deck.dump(w)
+        self.pm.dump(w)
+        if self.bluff_player is None:
+            w.text("")
+            w.u8(0)
+        else:
+            w.text(self.bluff_player[0].user_id)
+            w.u8(self.bluff_player[1])
+        return w.getvalue()
+
+    @classmethod
+    def restore(
+        cls, data: bytes, pm: PlayerManager, event_handler: BaseEventHandler
+    ) -> Self:
+        """Восстанавливает игру из двоичного снимка.
+
+        Все игроки игры добавляются в хранилище менеджера игроков.
+        Если снимок повреждён, вызывает `SnapshotError`.
+        """
+        try:
+            return cls._restore(SnapshotReader(data), pm, event_handler)
+        except SnapshotError:
+            raise
+        # Повреждённые поля снимка вызывают самые разные ошибки
+        except (ValueError, IndexError, KeyError, OverflowError) as e:
+            raise SnapshotError(f"Broken snapshot: {e!r}") from e
+
+    @classmethod
+    def _restore(
+        cls,
+        r: SnapshotReader,
+        pm: PlayerManager,
+        event_handler: BaseEventHandler,
+    ) -> Self:
+        room_id = r.text()
+        owner_id = r.text()
+        game = cls(pm, event_handler, room_id, BaseUser(owner_id, "", ""))
+        game.rules.rule_flags = r.u32()
+        game.deck_generator = DeckGenerator.load(r)
+        game.min_players = r.u8()
+        game.max_players = r.u8()
+        flags = r.u8()
+        game.started = bool(flags & 1)
+        game.open = bool(flags & 2)
+        game.reverse = bool(flags & 4)
+        game.take_counter = r.u16()
+        game.state = GameState(r.u8())
+        game.game_start = datetime.fromtimestamp(r.f64())
+        game.turn_start = datetime.fromtimestamp(r.f64())
+        game.shotgun.load(r)
+
+        deck_type = r.u8()
+        if deck_type >= len(_DECK_TYPES):
+            raise SnapshotError(f"Unknown deck type {deck_type}")
+        game.deck = _DECK_TYPES[deck_type]()
+        game.deck.load(r)
+
+        pm.load(r, game)
+        game.owner = pm.get(owner_id)
+        bluff_id = r.text()
+        bluffing = bool(r.u8())
+        if bluff_id:
+            game.bluff_player = (pm.get(bluff_id), bluffing)
+        r.end()
+        return game
@@ -6,9 +6,11 @@ from typing import TYPE_CHECKING, Self
 from loguru import logger
 
 from mau.deck.behavior import TakeBehavior, WildTakeBehavior
-from mau.enums import GameEvents, GameState
-from mau.events import Event
+from mau.deck.card import CARDS
+from mau.deck.hand import Hand
+from mau.enums import CardColor, GameEvents, GameState
 from mau.game.shotgun import Shotgun
+from mau.snapshot import SnapshotReader, SnapshotWriter
 
 if TYPE_CHECKING:
     from mau.deck.card import MauCard
@@ -49,7 +51,7 @@ class Player:
     def __init__(
         self, game: "MauGame", user_id: str, user_name: str, user_mention: str
     ) -> None:
-        self.hand: list[MauCard] = []
+        self.hand = Hand()
         self.game: MauGame = game
         self.user_id = user_id
         self._user_name = user_name
@@ -73,64 +75,48 @@ class Player:
 
     def is_bluffing(self) -> bool:
         """Проверяет блефует ли игрок, когда выкидывает дикую карту."""
-        for card in self.cover_cards().cover:
-            if card.color == self.game.deck.top.color:
-                return True
-        return False
+        return (
+            self.playable_mask() & CARDS.color_mask(self.game.deck.top.color)
+            != 0
+        )
+
+    def has_cover(self) -> bool:
+        """Может ли игрок покрыть верхнюю карту хоть чем-нибудь."""
+        return self.playable_mask() != 0
+
+    def has_color(self, color: CardColor) -> bool:
+        """Есть ли у игрока в руке карта указанного цвета."""
+        return self.hand.has_any(CARDS.color_mask(color))
 
     def count_cost(self) -> int:
         """Считает полную ценность руки пользователя."""
-        return sum(c.cost for c in self.hand)
+        return self.hand.cost
 
     def push_event(self, event_type: GameEvents, data: str = "") -> None:
         """Отправляет событие в журнал.
 
         Автоматически подставляет игрока и игру.
         """
-        self.game.event_handler.push(Event(self.game, self, event_type, data))
+        self.game.push_event(self, event_type, data)
 
     def take_cards(self) -> None:
         """Игрок берёт заданное количество карт согласно счётчику."""
         take_counter = self.game.take_counter or 1
         logger.debug("{} Draw {} cards", self._user_name, take_counter)
 
-        for card in self.game.deck.take(take_counter):
-            self.hand.append(card)
+        self.hand.extend(self.game.deck.take(take_counter))
         self.game.take_counter = 0
         self.push_event(GameEvents.PLAYER_TAKE, str(take_counter))
         self.game.set_state(GameState.TAKE)
 
-        if (
-            self.game.rules.auto_skip.status
-            and len(self.cover_cards().cover) == 0
-        ):
+        if self.game.rules.auto_skip.status and not self.has_cover():
             self.game.next_turn()
 
-    def _check_cover(self, card: "MauCard") -> bool:
-        if (
-            self.game.rules.intervention.status
-            and card != self.game.deck.top
-            and self != self.game.player
-        ):
-            return False
-
-        if (
-            (
-                isinstance(self.game.deck.top.behavior, TakeBehavior)
-                and self.game.take_counter > 0
-            )
-            and not isinstance(card.behavior, TakeBehavior | WildTakeBehavior)
-            and not self.game.rules.deferred_take.status
-        ):
-            return False
-
-        return True
-
-    def cover_cards(self) -> SortedCards:
-        """Возвращает отсортированный список карт из руки пользователя.
+    def playable_mask(self) -> int:
+        """Битовая маска карт из руки, которыми можно покрыть верхнюю.
 
-        Карты делятся на те, которыми он может покрыть и которыми не может
-        покрыть текущую верхнюю карту.
+        Номер бита совпадает с ID карты в таблице карт.
+        Если сейчас игрок не может ходить картами, вернёт 0.
         """
         top = self.game.deck.top
         logger.debug("Last card was {}", top)
@@ -147,27 +133,39 @@ class Player:
             and self.game.state
             in (GameState.NEXT, GameState.CONTINUE, GameState.TAKE)
         ):
-            return SortedCards([], self.hand)
-
-        cover = []
-        uncover = []
-        for card, can_cover in top.iter_covering(self.hand):
-            if can_cover and self._check_cover(card):
-                cover.append(card)
-            else:
-                uncover.append(card)
-
-        return SortedCards(
-            cover=sorted(cover, key=lambda c: c.cost, reverse=True),
-            uncover=sorted(uncover, key=lambda c: c.cost, reverse=True),
-        )
+            return 0
+
+        mask = self.hand.mask & CARDS.cover_mask(top)
+        # Вмешаться в чужой ход можно только такой же картой
+        if self.game.rules.intervention.status and self != self.game.player:
+            mask &= 1 << top.id
+
+        if (
+            isinstance(top.behavior, TakeBehavior)
+            and self.game.take_counter > 0
+            and not self.game.rules.deferred_take.status
+        ):
+            mask &= CARDS.take_mask
+
+        return mask
+
+    def cover_cards(self) -> SortedCards:
+        """Возвращает отсортированный список карт из руки пользователя.
+
+        Карты делятся на те, которыми он может покрыть и которыми не может
+        покрыть текущую верхнюю карту.
+        Если нужно только узнать, есть ли подходящие карты, лучше
+        использовать `has_cover`.
+        """
+        cover, uncover = self.hand.split(self.playable_mask())
+        return SortedCards(cover, uncover)
 
     # TODO: Режим отладки
     def on_join(self) -> None:
         """Берёт начальный набор карт для игры."""
         self.shotgun.reset()
         logger.debug("{} Draw first hand for player", self._user_name)
-        self.hand = list(self.game.deck.take(7))
+        self.hand = Hand(self.game.deck.take(7))
         self.push_event(GameEvents.PLAYER_TAKE, "7")
 
     def on_leave(self) -> None:
@@ -176,7 +174,7 @@ class Player:
         for card in self.hand:
             card.prepare_used(self.game)
             self.game.deck.put(card)
-        self.hand = []
+        self.hand = Hand()
 
     def twist_hand(self, other_player: Self) -> None:
         """Меняет местами руки для двух игроков."""
@@ -249,6 +247,22 @@ class Player:
         if origin_counter:
             self.game.next_turn()
 
+    def dump(self, w: SnapshotWriter) -> None:
+        """Записывает игрока и его руку в снимок игры."""
+        w.text(self.user_id)
+        w.text(self._user_name)
+        w.text(self._user_mention)
+        self.shotgun.dump(w)
+        w.ids(card.id for card in self.hand)
+
+    @classmethod
+    def restore(cls, game: "MauGame", r: SnapshotReader) -> Self:
+        """Восстанавливает игрока из снимка игры."""
+        player = cls(game, r.text(), r.text(), r.text())
+        player.shotgun.load(r)
+        player.hand = Hand.from_sorted(CARDS[i] for i in r.ids())
+        return player
+
     def __str__(self) -> str:
         """Представление игрока в строковом виде."""
         return str(self._user_name)
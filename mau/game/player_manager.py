@@ -3,11 +3,16 @@
 from collections import deque
 from collections.abc import Iterable, Iterator
 from random import shuffle
+from typing import TYPE_CHECKING
 
 from mau.enums import GameEvents
 from mau.game.player import Player
+from mau.snapshot import SnapshotReader, SnapshotWriter
 from mau.storage import BaseStorage
 
+if TYPE_CHECKING:
+    from mau.game.game import MauGame
+
 
 class PlayerManager:
     """Менеджер игроков.
@@ -77,9 +82,7 @@ class PlayerManager:
 
     def remove_players(self) -> None:
         """Удаляет всех игроков из хранилища, связанных с текущей игрой."""
-        for pl in self.winners:
-            self._storage.remove(pl)
-        for pl in self.losers:
+        for pl in dict.fromkeys((*self.winners, *self.losers)):
             self._storage.remove(pl)
 
     def start(self) -> None:
@@ -118,6 +121,51 @@ class PlayerManager:
         for player, new_hand in zip(self.iter(self._players), hands):
             player.hand = new_hand
 
+    def dump(self, w: SnapshotWriter) -> None:
+        """Записывает порядок ходов и всех игроков в снимок игры.
+
+        Также записываются уже вышедшие из игры игроки, пока они ещё
+        есть в хранилище.
+        """
+        w.u16(self._cp)
+        w.texts(self._players)
+        w.texts(self.winners)
+        w.texts(self.losers)
+
+        players = [
+            pl
+            for uid in dict.fromkeys(
+                (*self._players, *self.winners, *self.losers)
+            )
+            if (pl := self._storage.get(uid)) is not None
+        ]
+        w.u16(len(players))
+        for pl in players:
+            pl.dump(w)
+
+    def load(self, r: SnapshotReader, game: "MauGame") -> None:
+        """Восстанавливает игроков из снимка игры.
+
+        Восстановленные игроки сразу добавляются в хранилище.
+        """
+        self._cp = r.u16()
+        self._players = r.texts()
+        self.winners = r.texts()
+        self.losers = r.texts()
+        for _ in range(r.u16()):
+            pl = Player.restore(game, r)
+            self._storage.add(pl.user_id, pl)
+
+    def move_players(self, storage: BaseStorage) -> None:
+        """Переносит всех игроков игры в другое хранилище.
+
+        После менеджер работает уже с новым хранилищем.
+        """
+        for uid in dict.fromkeys((*self._players, *self.winners, *self.losers)):
+            if (pl := self._storage.get(uid)) is not None:
+                storage.add(uid, pl)
+        self._storage = storage
+
     def __len__(self) -> int:
         """Возвращает количество игроков в игре."""
         return len(self._players)
@@ -44,6 +44,7 @@ class GameRules:
         self.auto_skip = Rule(self, 12, "💸 Авто пропуск")
         self.deferred_take = Rule(self, 13, "⏳ Отложенное взятие")
         self.random_cards = Rule(self, 14, "🎰 Случайные карты")
+        self.turn_timeout = Rule(self, 15, "⏰ Таймер хода")
 
     def iter_rules(self) -> Iterator[tuple[str, bool]]:
         """Возвращает итератор правил."""
@@ -2,6 +2,8 @@
 
 from random import randint
 
+from mau.snapshot import SnapshotReader, SnapshotWriter
+
 
 class Shotgun:
     """Револьвер.
@@ -28,3 +30,13 @@ class Shotgun:
         """Выстреливает из револьвера."""
         self._cur += 1
         return self._cur >= self._lose
+
+    def dump(self, w: SnapshotWriter) -> None:
+        """Записывает состояние револьвера в снимок игры."""
+        w.u16(self._cur)
+        w.u8(self._lose)
+
+    def load(self, r: SnapshotReader) -> None:
+        """Восстанавливает состояние револьвера из снимка игры."""
+        self._cur = r.u16()
+        self._lose = r.u8()
@@ -1,9 +1,12 @@
 """Менеджер сессий.
 
 Предоставляет высокоуровневый класс для работы с игровыми сессиями.
+А также сборщик заброшенных игровых сессий и таймер хода.
 """
 
-from typing import Generic, TypeVar, cast
+from collections.abc import Callable
+from time import time
+from typing import Generic, Protocol, TypeVar, cast
 
 from loguru import logger
 
@@ -13,9 +16,28 @@ from mau.game.game import MauGame
 from mau.game.player import BaseUser, Player
 from mau.game.player_manager import PlayerManager
 from mau.storage import BaseStorage, MemoryStorage
+from mau.timers import TimerWheel
 
 _H = TypeVar("_H", bound=BaseEventHandler)
 
+# Выполняет действие над комнатой, к примеру под её блокировкой
+RoomRunner = Callable[[str, Callable[[], None]], None]
+
+
+def run_now(room_id: str, action: Callable[[], None]) -> None:
+    """Сразу выполняет действие над комнатой."""
+    action()
+
+
+class SessionWatcher(Protocol):
+    """Следит за играми менеджера сессий."""
+
+    def watch(self, game: MauGame) -> None:
+        """Начинает следить за игрой."""
+
+    def forget(self, room_id: str) -> None:
+        """Перестаёт следить за игрой."""
+
 
 class SessionManager(Generic[_H]):
     """Менеджер сессий.
@@ -36,7 +58,14 @@ class SessionManager(Generic[_H]):
 
     """
 
-    __slots__ = ("_games", "_players", "_event_handler")
+    __slots__ = (
+        "_event_handler",
+        "_games",
+        "_players",
+        "_watchers",
+        "active",
+        "created",
+    )
 
     def __init__(
         self,
@@ -47,11 +76,49 @@ class SessionManager(Generic[_H]):
         self._games: BaseStorage[MauGame] = game_storage or MemoryStorage()
         self._players: BaseStorage[Player] = player_storage or MemoryStorage()
         self._event_handler = event_handler or cast(_H, DebugEventHandler())
+        self._watchers: list[SessionWatcher] = []
+        # Сколько сессий сейчас открыто и сколько было создано всего
+        self.active = 0
+        self.created = 0
 
     def set_handler(self, handler: _H) -> None:
         """Устанавливает новый обработчик событий."""
         self._event_handler = handler
 
+    def set_game_storage(self, storage: BaseStorage) -> None:
+        """Устанавливает новое хранилище для игр.
+
+        Уже созданные игры в новое хранилище не переносятся.
+        """
+        self._games = storage
+
+    def add_watcher(self, watcher: SessionWatcher) -> None:
+        """Добавляет наблюдателя за играми.
+
+        К примеру сборщик заброшенных сессий или таймер хода.
+        Он будет следить за всеми новыми и восстановленными играми.
+        """
+        self._watchers.append(watcher)
+
+    def restore_game(self, room_id: str, data: bytes) -> MauGame:
+        """Восстанавливает игру из снимка.
+
+        Игроки восстановленной игры попадают в хранилище игроков.
+        Если снимок повреждён, вызывает `SnapshotError`, а хранилище
+        игроков остаётся нетронутым.
+        Подходит как функция загрузки для `SqliteStorage`, вместе с
+        `MauGame.snapshot` для сохранения.
+        """
+        logger.debug("Restore game in room {}", room_id)
+        # Игроки попадают в хранилище только из целого снимка
+        pm = PlayerManager(MemoryStorage())
+        game = MauGame.restore(data, pm, self._event_handler)
+        pm.move_players(self._players)
+        self.active += 1
+        for watcher in self._watchers:
+            watcher.watch(game)
+        return game
+
     def player(self, user_id: str) -> Player | None:
         """Возвращает игрока напрямую из хранилища по ID пользователя."""
         return self._players.get(user_id)
@@ -80,6 +147,10 @@ class SessionManager(Generic[_H]):
         pm = PlayerManager(self._players)
         game = MauGame(pm, self._event_handler, room_id, owner)
         self._games.add(room_id, game)
+        self.active += 1
+        self.created += 1
+        for watcher in self._watchers:
+            watcher.watch(game)
         game.push_event(game.owner, GameEvents.SESSION_START)
         return game
 
@@ -89,8 +160,187 @@ class SessionManager(Generic[_H]):
         Должна выполняться после `game.end()`, поскольку очищает
         хранилище игроков.
         Удаляет игру из хранилища, отправляет событие `SESSION_END`.
+        После сохраняет изменения в хранилищах.
         """
         logger.info("End session in room {}", room_id)
         game: MauGame = self._games.remove(room_id)
+        self.active -= 1
+        for watcher in self._watchers:
+            watcher.forget(room_id)
         game.pm.remove_players()
         game.push_event(game.owner, GameEvents.SESSION_END)
+        self._games.flush()
+        self._players.flush()
+
+
+class IdleReaper:
+    """Сборщик заброшенных игровых сессий.
+
+    Игры, которые никто не завершил, так и остаются в хранилище.
+    Сборщик завершает сессии, в которых уже `idle_limit` секунд не
+    было новых ходов.
+    Последним действием считается начало текущего хода или начало
+    игры, если ходов ещё не было.
+
+    Для каждой игры ставится таймер в общем колесе таймеров.
+    Когда таймер срабатывает, сборщик проверяет время последнего хода
+    и либо завершает сессию, либо переставляет таймер.
+
+    Сессия завершается через `run`, к примеру под блокировкой комнаты.
+    Пока действие ждёт своей очереди, в игре могли сделать ход, потому
+    время последнего хода проверяется ещё раз.
+
+    Args:
+        sm: Менеджер сессий, из которого удаляются игры.
+        wheel: Колесо таймеров, может быть общим с другими таймерами.
+        idle_limit: Сколько секунд без ходов живёт сессия.
+        run: Как выполнить завершение сессии, по умолчанию сразу.
+
+    """
+
+    __slots__ = ("_run", "idle_limit", "reaped", "sm", "wheel")
+
+    def __init__(
+        self,
+        sm: SessionManager,
+        wheel: TimerWheel,
+        idle_limit: float = 10800,
+        run: RoomRunner = run_now,
+    ) -> None:
+        self.sm = sm
+        self.wheel = wheel
+        self.idle_limit = idle_limit
+        self._run = run
+        self.reaped = 0
+
+    def _deadline(self, game: MauGame) -> float:
+        last = max(game.turn_start, game.game_start).timestamp()
+        return last + self.idle_limit
+
+    def watch(self, game: MauGame) -> None:
+        """Начинает следить за игрой."""
+        room_id = game.room_id
+        self.wheel.schedule(
+            ("idle", room_id),
+            self._deadline(game),
+            lambda: self._check(room_id),
+        )
+
+    def forget(self, room_id: str) -> None:
+        """Перестаёт следить за игрой."""
+        self.wheel.cancel(("idle", room_id))
+
+    def _idle(self, room_id: str) -> MauGame | None:
+        game = self.sm.room(room_id)
+        if game is None:
+            return None
+
+        if self._deadline(game) > time():
+            self.watch(game)
+            return None
+        return game
+
+    def _check(self, room_id: str) -> None:
+        if self._idle(room_id) is not None:
+            self._run(room_id, lambda: self._reap(room_id))
+
+    def _reap(self, room_id: str) -> None:
+        game = self._idle(room_id)
+        if game is None:
+            return
+
+        logger.info("Reap idle session in room {}", room_id)
+        self.reaped += 1
+        # Без события о конце игры, чтобы не писать в заброшенный чат
+        game.pm.end()
+        game.started = False
+        self.sm.remove(room_id)
+
+
+class TurnTimer:
+    """Таймер хода.
+
+    Если в игре включено правило `turn_timeout`, а текущий игрок не
+    сходил за `timeout` секунд, его ход пропускается, как по команде
+    `/skip`.
+
+    Для каждой игры ставится один таймер в общем колесе таймеров.
+    При передаче хода таймер не переставляется.
+    Когда он срабатывает, таймер проверяет начало текущего хода и либо
+    пропускает ход, либо переставляется на конец текущего хода.
+    Потому передача хода ничего не стоит.
+    Игры с выключенным правилом проверяются раз в `timeout` секунд,
+    чтобы правило можно было включить посреди игры.
+
+    Ход пропускается через `run`, как и в `IdleReaper`, и перед
+    пропуском начало хода проверяется ещё раз.
+
+    Args:
+        sm: Менеджер сессий, из которого берутся игры.
+        wheel: Колесо таймеров, может быть общим с другими таймерами.
+        timeout: Сколько секунд даётся на ход.
+        run: Как выполнить пропуск хода, по умолчанию сразу.
+
+    """
+
+    __slots__ = ("_run", "skipped", "sm", "timeout", "wheel")
+
+    def __init__(
+        self,
+        sm: SessionManager,
+        wheel: TimerWheel,
+        timeout: float = 90,
+        run: RoomRunner = run_now,
+    ) -> None:
+        self.sm = sm
+        self.wheel = wheel
+        self.timeout = timeout
+        self._run = run
+        self.skipped = 0
+
+    def watch(self, game: MauGame) -> None:
+        """Начинает следить за игрой."""
+        room_id = game.room_id
+        deadline = game.turn_start.timestamp() + self.timeout
+        now = time()
+        # Если правило выключено, время хода уже могло пройти
+        # Тогда игра просто проверяется раз в `timeout` секунд
+        if deadline <= now:
+            deadline = now + self.timeout
+        self.wheel.schedule(
+            ("turn", room_id), deadline, lambda: self._check(room_id)
+        )
+
+    def forget(self, room_id: str) -> None:
+        """Перестаёт следить за игрой."""
+        self.wheel.cancel(("turn", room_id))
+
+    def _expired(self, game: MauGame) -> bool:
+        return (
+            game.started
+            and game.rules.turn_timeout.status
+            and game.turn_start.timestamp() + self.timeout <= time()
+        )
+
+    def _check(self, room_id: str) -> None:
+        game = self.sm.room(room_id)
+        if game is None:
+            return
+
+        if self._expired(game):
+            self._run(room_id, lambda: self._skip(room_id))
+        else:
+            self.watch(game)
+
+    def _skip(self, room_id: str) -> None:
+        game = self.sm.room(room_id)
+        if game is None:
+            return
+
+        try:
+            if self._expired(game):
+                logger.info("Skip idle player in room {}", room_id)
+                self.skipped += 1
+                game.skip_turn()
+        finally:
+            self.watch(game)
@@ -0,0 +1,554 @@
+"""Симулятор игр Mau без Telegram.
+
+Прогоняет множество полных игр от начала и до конца.
+Ходы игроков выбирает подключаемая стратегия.
+Игры распределяются пачками по пулу процессов.
+
+Для каждого шаблона колоды и каждой комбинации игровых правил
+собирается статистика: сколько игр в секунду, сколько ходов в игре
+и сколько раз в колоде закончились карты.
+По умолчанию каждое правило проверяется по отдельности, а размер
+комбинаций ограничивает `--max-rules`.
+
+Для запуска симулятора воспользуйтесь командой:
+
+```sh
+py -m mau.sim --games 100 --rules 0 4 12 --max-rules 3
+```
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from itertools import combinations
+
+from loguru import logger
+
+from mau.deck.behavior import TakeBehavior, WildTakeBehavior
+from mau.deck.card import MauCard
+from mau.deck.presets import CARD_PRESETS, DeckGenerator
+from mau.enums import CardColor, GameEvents, GameState
+from mau.events import BaseEventHandler, Event
+from mau.exceptions import NotEnoughCardsError
+from mau.game.game import MauGame
+from mau.game.player import BaseUser, Player
+from mau.game.rules import GameRules
+from mau.session import SessionManager
+
+# Стратегии ходов
+# ===============
+
+
+class BasePolicy(ABC):
+    """Стратегия ходов игрока.
+
+    Симулятор спрашивает у стратегии как поступить в каждой ситуации,
+    где в боте игрок нажимает на кнопку или выбирает карту.
+    """
+
+    name = "base"
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+
+    @abstractmethod
+    def choose_card(
+        self, game: MauGame, player: Player, cards: list[MauCard]
+    ) -> MauCard | None:
+        """Выбирает карту из покрывающих.
+
+        Если вернуть None, то игрок будет брать карты.
+        """
+        pass
+
+    def choose_color(self, game: MauGame, player: Player) -> CardColor:
+        """Выбирает цвет для дикой карты.
+
+        Если колода не знает своих цветов, выбирает как при выходе
+        игрока из игры.
+        """
+        if len(game.deck.colors) == 0:
+            return CardColor(self.rng.randint(0, 3))
+        return self.rng.choice(game.deck.colors)
+
+    def choose_player(self, game: MauGame, player: Player) -> Player | None:
+        """Выбирает игрока для обмена картами.
+
+        Если вернуть None, то обмен будет пропущен.
+        """
+        others = [pl for _, pl in game.pm.iter_others()]
+        return self.rng.choice(others) if others else None
+
+    def shot(self, game: MauGame, player: Player) -> bool:
+        """Стрелять ли из револьвера вместо взятия карт."""
+        return self.rng.random() < 0.5  # noqa: PLR2004
+
+    def call_bluff(self, game: MauGame, player: Player) -> bool:
+        """Проверять ли предыдущего игрока на блеф."""
+        return self.rng.random() < 0.5  # noqa: PLR2004
+
+
+class RandomPolicy(BasePolicy):
+    """Случайная стратегия.
+
+    Все решения принимаются случайно.
+    Хорошо подходит для поиска редких игровых ситуаций.
+    """
+
+    name = "random"
+
+    def choose_card(
+        self, game: MauGame, player: Player, cards: list[MauCard]
+    ) -> MauCard | None:
+        """Выбирает случайную карту."""
+        return self.rng.choice(cards)
+
+
+class GreedyPolicy(BasePolicy):
+    """Жадная стратегия.
+
+    Сначала избавляется от самых дорогих карт.
+    Выбирает цвет, которого больше всего в руке.
+    Меняется картами с игроком, у которого их меньше всего.
+    """
+
+    name = "greedy"
+
+    def choose_card(
+        self, game: MauGame, player: Player, cards: list[MauCard]
+    ) -> MauCard | None:
+        """Выбирает самую дорогую карту."""
+        return max(cards, key=lambda c: c.cost)
+
+    def choose_color(self, game: MauGame, player: Player) -> CardColor:
+        """Выбирает самый частый цвет в руке."""
+        colors = Counter(
+            c.color for c in player.hand if c.color in game.deck.colors
+        )
+        if len(colors) == 0:
+            return super().choose_color(game, player)
+        return colors.most_common(1)[0][0]
+
+    def choose_player(self, game: MauGame, player: Player) -> Player | None:
+        """Выбирает игрока с наименьшим количеством карт."""
+        others = [pl for _, pl in game.pm.iter_others()]
+        if len(others) == 0:
+            return None
+        return min(others, key=lambda pl: len(pl.hand))
+
+    def shot(self, game: MauGame, player: Player) -> bool:
+        """Всегда рискует, если карт для взятия много."""
+        return game.take_counter > len(player.hand)
+
+    def call_bluff(self, game: MauGame, player: Player) -> bool:
+        """Никому не верит."""
+        return True
+
+
+POLICIES: dict[str, type[BasePolicy]] = {
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+}
+
+
+# Обработчик событий
+# ==================
+
+
+class CounterEventHandler(BaseEventHandler):
+    """Считает игровые события.
+
+    В отличие от отладочного обработчика ничего не пишет в журнал.
+    Потому не влияет на скорость работы движка.
+    """
+
+    def __init__(self) -> None:
+        self.events: Counter[GameEvents] = Counter()
+
+    def push(self, event: Event) -> None:
+        """Учитывает событие."""
+        self.events[event.event_type] += 1
+
+
+# Проведение игры
+# ===============
+
+
+@dataclass(slots=True, frozen=True)
+class SimTask:
+    """Пачка игр для одного процесса."""
+
+    preset: str
+    rule_flags: int
+    games: int
+    players: int
+    policy: str
+    max_turns: int
+    seed: int
+    compact: bool = False
+
+
+@dataclass(slots=True)
+class SimStats:
+    """Статистика пачки игр.
+
+    Статистики разных пачек с одинаковыми настройками складываются.
+    """
+
+    games: int = 0
+    turns: int = 0
+    exhausted: int = 0
+    stalled: int = 0
+    elapsed: float = 0
+    errors: dict[str, int] = field(default_factory=dict)
+    events: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def games_per_second(self) -> float:
+        """Сколько игр в секунду проводит один процесс."""
+        return self.games / self.elapsed if self.elapsed else 0
+
+    @property
+    def turns_per_game(self) -> float:
+        """Сколько в среднем ходов длится одна игра."""
+        return self.turns / self.games if self.games else 0
+
+    def error(self, error: Exception) -> None:
+        """Учитывает ошибку движка по имени исключения."""
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def merge(self, other: "SimStats") -> None:
+        """Добавляет статистику другой пачки."""
+        self.games += other.games
+        self.turns += other.turns
+        self.exhausted += other.exhausted
+        self.stalled += other.stalled
+        self.elapsed += other.elapsed
+        for name, count in other.errors.items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        for name, count in other.events.items():
+            self.events[name] = self.events.get(name, 0) + count
+
+
+def _shotgun_take(game: MauGame, player: Player) -> None:
+    # Повторяет кнопку "Взять карты" из револьвера в боте
+    take_counter = game.take_counter
+    player.take_cards()
+    if (
+        isinstance(game.deck.top.behavior, TakeBehavior | WildTakeBehavior)
+        and take_counter
+    ):
+        game.next_turn()
+
+
+def _shotgun_shot(game: MauGame, player: Player) -> None:
+    # Повторяет кнопку "Выстрелить" из револьвера в боте
+    if not player.shot():
+        game.take_counter = round(game.take_counter * 1.5)
+        game.next_turn()
+        game.state = GameState.SHOTGUN
+    else:
+        game.leave_player(player)
+
+
+def play_turn(game: MauGame, policy: BasePolicy) -> None:
+    """Проводит одно действие текущего игрока.
+
+    В зависимости от состояния игры выбирает карту, цвет, игрока для
+    обмена или решает что делать с револьвером.
+    """
+    player = game.player
+    if game.state == GameState.CHOOSE_COLOR:
+        game.choose_color(policy.choose_color(game, player))
+
+    elif game.state == GameState.TWIST_HAND:
+        other = policy.choose_player(game, player)
+        if other is None:
+            game.next_turn()
+        else:
+            player.twist_hand(other)
+
+    elif game.state == GameState.SHOTGUN:
+        if policy.shot(game, player):
+            _shotgun_shot(game, player)
+        else:
+            _shotgun_take(game, player)
+
+    elif (
+        isinstance(game.deck.top.behavior, WildTakeBehavior)
+        and game.take_counter
+        and policy.call_bluff(game, player)
+    ):
+        player.call_bluff()
+
+    else:
+        cover = player.cover_cards().cover
+        card = policy.choose_card(game, player, cover) if cover else None
+        if card is not None:
+            game.process_turn(card, player)
+        elif game.state == GameState.TAKE:
+            game.next_turn()
+        else:
+            player.call_take_cards()
+
+
+def play_game(
+    sm: SessionManager,
+    room_id: str,
+    task: SimTask,
+    policy: BasePolicy,
+    stats: SimStats,
+) -> None:
+    """Проводит одну полную игру и записывает результат в статистику."""
+    game = sm.create(room_id, BaseUser("0", "Player 0", "@player_0"))
+    game.rules.rule_flags = task.rule_flags
+    game.deck_generator = DeckGenerator.from_preset(task.preset, task.compact)
+    for i in range(1, task.players):
+        game.join_player(BaseUser(str(i), f"Player {i}", f"@player_{i}"))
+
+    turns = 0
+    try:
+        game.start()
+        while game.started and turns < task.max_turns:
+            play_turn(game, policy)
+            turns += 1
+    except NotEnoughCardsError:
+        stats.exhausted += 1
+    except Exception as e:
+        stats.error(e)
+    else:
+        if game.started:
+            stats.stalled += 1
+    finally:
+        # Сломанная игра может сломать и своё завершение, но это не
+        # должно останавливать остальные игры
+        try:
+            if game.started:
+                game.pm.end()
+                game.started = False
+            sm.remove(room_id)
+        except Exception as e:
+            stats.error(e)
+
+    stats.games += 1
+    stats.turns += turns
+
+
+def run_task(task: SimTask) -> SimStats:
+    """Проводит пачку игр в отдельном процессе."""
+    random.seed(task.seed)
+    policy = POLICIES[task.policy](random.Random(task.seed))
+    handler = CounterEventHandler()
+    sm = SessionManager(event_handler=handler)
+    stats = SimStats()
+
+    start = time.perf_counter()
+    for i in range(task.games):
+        play_game(sm, f"sim_{i}", task, policy, stats)
+    stats.elapsed = time.perf_counter() - start
+    stats.events = {e.name: c for e, c in handler.events.items()}
+    return stats
+
+
+def _init_worker() -> None:
+    # Журнал движка на каждое событие сильно замедляет симуляцию
+    logger.disable("mau")
+
+
+# Сборка задач
+# ============
+
+
+def iter_flags(
+    rules: Sequence[int], max_rules: int | None = None
+) -> Iterator[int]:
+    """Возвращает комбинации переданных игровых правил.
+
+    В каждую комбинацию входит не больше `max_rules` правил.
+    Без ограничения возвращает все комбинации.
+    """
+    limit = len(rules) if max_rules is None else min(max_rules, len(rules))
+    for n in range(limit + 1):
+        for combo in combinations(rules, n):
+            yield sum(1 << rule for rule in combo)
+
+
+def make_tasks(
+    presets: Sequence[str], flags: Sequence[int], batch: int, base: SimTask
+) -> Iterator[SimTask]:
+    """Делит все игры на пачки для пула процессов.
+
+    Для каждого шаблона колоды и комбинации правил проводится
+    `base.games` игр с остальными настройками из `base`.
+    """
+    seed = base.seed
+    for preset in presets:
+        for rule_flags in flags:
+            left = base.games
+            while left > 0:
+                size = min(batch, left)
+                left -= size
+                yield replace(
+                    base,
+                    preset=preset,
+                    rule_flags=rule_flags,
+                    games=size,
+                    seed=seed,
+                )
+                seed += 1
+
+
+def simulate(
+    tasks: list[SimTask], workers: int | None = None
+) -> dict[tuple[str, int], SimStats]:
+    """Распределяет пачки игр по процессам и собирает статистику."""
+    results: dict[tuple[str, int], SimStats] = {}
+    chunksize = max(1, len(tasks) // ((workers or 1) * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        for task, stats in zip(
+            tasks, pool.map(run_task, tasks, chunksize=chunksize)
+        ):
+            key = (task.preset, task.rule_flags)
+            results.setdefault(key, SimStats()).merge(stats)
+    return results
+
+
+# Отчёт
+# =====
+
+
+def rules_names(rule_flags: int) -> list[str]:
+    """Возвращает названия включённых игровых правил."""
+    rules = GameRules()
+    rules.rule_flags = rule_flags
+    return [name for name, status in rules.iter_rules() if status]
+
+
+def print_report(
+    results: dict[tuple[str, int], SimStats], wall_time: float
+) -> None:
+    """Выводит сводную таблицу по всем настройкам игры."""
+    total = SimStats()
+    print(
+        f"{'preset':<8} {'rules':>6} {'games':>6} {'games/s':>9} "
+        f"{'turns':>7} {'exhausted':>9} {'stalled':>7} errors"
+    )
+    for (preset, rule_flags), stats in sorted(results.items()):
+        total.merge(stats)
+        errors = ", ".join(f"{k}={v}" for k, v in stats.errors.items())
+        print(
+            f"{preset:<8} {rule_flags:>#6x} {stats.games:>6} "
+            f"{stats.games_per_second:>9.1f} {stats.turns_per_game:>7.1f} "
+            f"{stats.exhausted:>9} {stats.stalled:>7} {errors}"
+        )
+
+    print(
+        f"\nTotal: {total.games} games in {wall_time:.2f}s "
+        f"({total.games / wall_time:.1f} games/s), "
+        f"{total.turns_per_game:.1f} turns/game, "
+        f"{total.exhausted} exhausted, {total.stalled} stalled"
+    )
+
+
+def dump_report(results: dict[tuple[str, int], SimStats], path: str) -> None:
+    """Сохраняет статистику в JSON файл."""
+    report = [
+        {
+            "preset": preset,
+            "rule_flags": rule_flags,
+            "rules": rules_names(rule_flags),
+            "games_per_second": stats.games_per_second,
+            "turns_per_game": stats.turns_per_game,
+            **asdict(stats),
+        }
+        for (preset, rule_flags), stats in sorted(results.items())
+    ]
+    with open(path, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Запускает симулятор из командной строки."""
+    rules_count = len(GameRules().rules)
+    parser = argparse.ArgumentParser(
+        prog="mau.sim", description="Headless Mau game simulator."
+    )
+    parser.add_argument(
+        "--presets",
+        nargs="+",
+        default=list(CARD_PRESETS),
+        choices=list(CARD_PRESETS),
+        help="deck presets to simulate (default: all)",
+    )
+    parser.add_argument(
+        "--rules",
+        nargs="*",
+        type=int,
+        default=list(range(rules_count)),
+        help="rule indexes to combine (default: all rules)",
+    )
+    parser.add_argument(
+        "--max-rules",
+        type=int,
+        default=1,
+        help="max rules in one combination (default: each rule alone)",
+    )
+    parser.add_argument(
+        "--games", type=int, default=20, help="games per combination"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=50, help="games per worker task"
+    )
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--policy", default="random", choices=list(POLICIES))
+    parser.add_argument("--max-turns", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--compact", action="store_true", help="use compact array decks"
+    )
+    parser.add_argument("--json", help="save report to JSON file")
+    args = parser.parse_args(argv)
+
+    if any(not 0 <= rule < rules_count for rule in args.rules):
+        parser.error(f"rule indexes must be in range 0..{rules_count - 1}")
+
+    tasks = list(
+        make_tasks(
+            args.presets,
+            list(iter_flags(args.rules, args.max_rules)),
+            args.batch,
+            SimTask(
+                preset=args.presets[0],
+                rule_flags=0,
+                games=args.games,
+                players=args.players,
+                policy=args.policy,
+                max_turns=args.max_turns,
+                seed=args.seed,
+                compact=args.compact,
+            ),
+        )
+    )
+    print(f"Simulate {sum(t.games for t in tasks)} games in {len(tasks)} tasks")
+
+    _init_worker()
+    start = time.perf_counter()
+    results = simulate(tasks, args.workers)
+    wall_time = time.perf_counter() - start
+
+    print_report(results, wall_time)
+    if args.json:
+        dump_report(results, args.json)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
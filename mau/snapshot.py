@@ -0,0 +1,158 @@
+"""Двоичные снимки состояния игры.
+
+Снимок позволяет сохранить игру в байты, а после восстановить её.
+К примеру перед перезапуском бота.
+
+Формат снимка простой: после заголовка и номера версии по порядку
+записываются поля игры.
+Числа записываются в little-endian, строки и массивы начинаются со
+своей длины.
+Карты записываются только своими ID из общей таблицы карт.
+
+Каждый компонент игры сам знает как записать и прочитать своё
+состояние через `SnapshotWriter` и `SnapshotReader`.
+"""
+
+import sys
+from array import array
+from collections.abc import Iterable
+from struct import Struct, error
+
+from mau.exceptions import SnapshotError
+
+# Заголовок снимка
+SNAPSHOT_MAGIC = b"MAU"
+# Текущая версия формата снимка
+SNAPSHOT_VERSION = 1
+
+_U8 = Struct("<B")
+_U16 = Struct("<H")
+_U32 = Struct("<I")
+_F64 = Struct("<d")
+_HEADER = Struct("<3sB")
+# Массив хранит числа в порядке байт машины, а снимок в little-endian
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class SnapshotWriter:
+    """Записывает состояние игры в байты."""
+
+    __slots__ = ("_parts",)
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = [
+            _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION)
+        ]
+
+    def u8(self, value: int) -> None:
+        """Записывает число от 0 до 255."""
+        self._parts.append(_U8.pack(value))
+
+    def u16(self, value: int) -> None:
+        """Записывает число от 0 до 65535."""
+        self._parts.append(_U16.pack(value))
+
+    def u32(self, value: int) -> None:
+        """Записывает беззнаковое 32 битное число."""
+        self._parts.append(_U32.pack(value))
+
+    def f64(self, value: float) -> None:
+        """Записывает дробное число."""
+        self._parts.append(_F64.pack(value))
+
+    def text(self, value: str) -> None:
+        """Записывает строку в UTF-8."""
+        data = value.encode()
+        self._parts.append(_U16.pack(len(data)))
+        self._parts.append(data)
+
+    def texts(self, values: Iterable[str]) -> None:
+        """Записывает список строк."""
+        values = list(values)
+        self.u16(len(values))
+        for value in values:
+            self.text(value)
+
+    def ids(self, values: "array[int] | Iterable[int]") -> None:
+        """Записывает массив ID карт."""
+        if not isinstance(values, array) or _BIG_ENDIAN:
+            values = array("H", values)
+        if _BIG_ENDIAN:
+            values.byteswap()
+        self._parts.append(_U16.pack(len(values)))
+        self._parts.append(values.tobytes())
+
+    def getvalue(self) -> bytes:
+        """Возвращает готовый снимок."""
+        return b"".join(self._parts)
+
+
+class SnapshotReader:
+    """Читает состояние игры из снимка.
+
+    Сразу проверяет заголовок и версию снимка.
+    Если снимок повреждён, вызывает `SnapshotError`.
+    """
+
+    __slots__ = ("_data", "_pos")
+
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        self._pos = 0
+        magic, version = self._unpack(_HEADER)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError("Not a game snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    def _unpack(self, fmt: Struct) -> tuple:
+        try:
+            res = fmt.unpack_from(self._data, self._pos)
+        except error as e:
+            raise SnapshotError("Snapshot is truncated") from e
+        self._pos += fmt.size
+        return res
+
+    def _take(self, size: int) -> memoryview:
+        if self._pos + size > len(self._data):
+            raise SnapshotError("Snapshot is truncated")
+        res = self._data[self._pos : self._pos + size]
+        self._pos += size
+        return res
+
+    def u8(self) -> int:
+        """Читает число от 0 до 255."""
+        return int(self._unpack(_U8)[0])
+
+    def u16(self) -> int:
+        """Читает число от 0 до 65535."""
+        return int(self._unpack(_U16)[0])
+
+    def u32(self) -> int:
+        """Читает беззнаковое 32 битное число."""
+        return int(self._unpack(_U32)[0])
+
+    def f64(self) -> float:
+        """Читает дробное число."""
+        return float(self._unpack(_F64)[0])
+
+    def text(self) -> str:
+        """Читает строку в UTF-8."""
+        return str(self._take(self.u16()), "utf-8")
+
+    def texts(self) -> list[str]:
+        """Читает список строк."""
+        return [self.text() for _ in range(self.u16())]
+
+    def ids(self) -> "array[int]":
+        """Читает массив ID карт."""
+        res = array("H")
+        res.frombytes(self._take(self.u16() * res.itemsize))
+        if _BIG_ENDIAN:
+            res.byteswap()
+        return res
+
+    def end(self) -> None:
+        """Проверяет что снимок прочитан полностью."""
+        if self._pos != len(self._data):
+            raise SnapshotError("Unexpected data at the end of snapshot")
@@ -2,14 +2,28 @@
 
 Менеджер сессий использует хранилище сессий чтобы сохранять состояние
 игр и игроков.
-Модуль предоставляет базовое хранилище в оперативной памяти.
+Модуль предоставляет базовое хранилище в оперативной памяти и
+хранилище с сохранением состояния в SQLite.
 """
 
+import sqlite3
 from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pathlib import Path
+from queue import SimpleQueue
+from threading import Thread
+from time import monotonic
 from typing import Generic, TypeVar
 
+from loguru import logger
+
+from mau.exceptions import SnapshotError
+
 _V = TypeVar("_V")
 
+# Строки для записи и ключи для удаления из базы данных
+_Batch = tuple[list[tuple[str, bytes]], list[tuple[str]]]
+
 
 class BaseStorage(ABC, Generic[_V]):
     """Базовое хранилище сессий/игроков.
@@ -41,6 +55,12 @@ class BaseStorage(ABC, Generic[_V]):
         """
         pass
 
+    def flush(self) -> None:
+        """Сохраняет накопленные изменения.
+
+        Хранилищам в оперативной памяти нечего сохранять.
+        """
+
 
 class MemoryStorage(BaseStorage, Generic[_V]):
     """Хранилище в оперативной памяти.
@@ -73,3 +93,200 @@ class MemoryStorage(BaseStorage, Generic[_V]):
         Если такого элемента нет в хранилище - вернёт None.
         """
         return self._storage.get(key)
+
+
+class SqliteStorage(BaseStorage, Generic[_V]):
+    """Хранилище в оперативной памяти с сохранением в SQLite.
+
+    Все элементы хранятся в оперативной памяти, как и в `MemoryStorage`.
+    Изменённые элементы помечаются и время от времени сохраняются в
+    базу данных одной транзакцией.
+    Запись в базу происходит в отдельном потоке, потому игровые
+    действия никогда не ждут диска.
+
+    Поскольку элементы изменяются напрямую, любой полученный через
+    `get` элемент также считается изменённым.
+    Если у элемента есть атрибут `version`, как у игры, элемент
+    считается изменённым когда меняется его версия, даже если его
+    не получали из хранилища.
+
+    Сохранение вызывается при обращении к хранилищу, если прошло
+    `flush_interval` секунд.
+    Чтобы изменения сохранялись и без обращений, вызывайте `flush`
+    раз в `flush_interval` секунд, к примеру по таймеру.
+
+    После перезапуска программы все элементы можно загрузить из базы
+    через `load`.
+
+    Args:
+        path: Путь к файлу базы данных.
+        dumps: Превращает элемент в байты для сохранения.
+        loads: Получает элемент из ключа и сохранённых байтов.
+        table: Название таблицы в базе данных.
+        flush_interval: Как часто в секундах сохранять изменения.
+
+    """
+
+    __slots__ = (
+        "_conn",
+        "_dirty",
+        "_dumps",
+        "_last_flush",
+        "_loads",
+        "_path",
+        "_queue",
+        "_removed",
+        "_storage",
+        "_table",
+        "_versions",
+        "_writer",
+        "flush_interval",
+    )
+
+    def __init__(
+        self,
+        path: str | Path,
+        dumps: Callable[[_V], bytes],
+        loads: Callable[[str, bytes], _V],
+        table: str = "storage",
+        flush_interval: float = 1.0,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Bad table name: {table}")
+
+        self._storage: dict[str, _V] = {}
+        self._dirty: set[str] = set()
+        self._removed: set[str] = set()
+        # Версии элементов на момент последнего сохранения
+        self._versions: dict[str, object] = {}
+        self._path = str(path)
+        self._table = table
+        self._dumps = dumps
+        self._loads = loads
+        self.flush_interval = flush_interval
+        self._last_flush = monotonic()
+
+        self._conn = self._connect()
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._queue: SimpleQueue[_Batch | None] = SimpleQueue()
+        self._writer = Thread(
+            target=self._write_loop, name=f"sqlite-{table}", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self) -> None:
+        while (batch := self._queue.get()) is not None:
+            upsert, delete = batch
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?)",
+                        upsert,
+                    )
+                    self._conn.executemany(
+                        f"DELETE FROM {self._table} WHERE key = ?", delete
+                    )
+            except sqlite3.Error:
+                logger.exception("Failed to save {} batch", self._table)
+
+    def _maybe_flush(self) -> None:
+        if monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def add(self, key: str, value: _V) -> None:
+        """Добавляет новый элемент в хранилище по ключу."""
+        self._storage[key] = value
+        self._dirty.add(key)
+        self._removed.discard(key)
+        self._maybe_flush()
+
+    def remove(self, key: str) -> _V:
+        """Удаляет элемент из хранилища по ключу.
+
+        Возвращает удалённый элемент.
+        Если такого элемента не существует - вернёт исключение.
+        """
+        value = self._storage.pop(key)
+        self._versions.pop(key, None)
+        self._dirty.discard(key)
+        self._removed.add(key)
+        self._maybe_flush()
+        return value
+
+    def get(self, key: str) -> _V | None:
+        """Возвращает элемент по ключу.
+
+        Если такого элемента нет в хранилище - вернёт None.
+        """
+        value = self._storage.get(key)
+        if value is not None and not hasattr(value, "version"):
+            self._dirty.add(key)
+            self._maybe_flush()
+        return value
+
+    def flush(self) -> None:
+        """Отправляет все изменения на запись в базу данных.
+
+        Элементы превращаются в байты сразу, а сама запись происходит
+        в отдельном потоке.
+        """
+        self._last_flush = monotonic()
+        for key, value in self._storage.items():
+            version = getattr(value, "version", None)
+            if version is not None and self._versions.get(key) != version:
+                self._dirty.add(key)
+        if not self._dirty and not self._removed:
+            return
+
+        upsert = []
+        for key in self._dirty:
+            value = self._storage[key]
+            upsert.append((key, self._dumps(value)))
+            self._versions[key] = getattr(value, "version", None)
+        delete = [(key,) for key in self._removed]
+        self._dirty.clear()
+        self._removed.clear()
+        self._queue.put((upsert, delete))
+
+    def load(self) -> int:
+        """Загружает все сохранённые элементы из базы данных.
+
+        Повреждённые и устаревшие элементы пропускаются.
+        Возвращает количество загруженных элементов.
+        """
+        rows = self._conn.execute(f"SELECT key, value FROM {self._table}")
+        count = 0
+        for key, data in rows:
+            try:
+                value = self._loads(key, data)
+            except SnapshotError as e:
+                logger.warning(
+                    "Skip broken {} item {}: {}", self._table, key, e
+                )
+                continue
+            self._storage[key] = value
+            self._versions[key] = getattr(value, "version", None)
+            count += 1
+        logger.info("Loaded {} items from {}", count, self._table)
+        return count
+
+    def close(self) -> None:
+        """Сохраняет оставшиеся изменения и закрывает базу данных.
+
+        Дожидается окончания записи всех изменений.
+        """
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        self._conn.close()
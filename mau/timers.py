@@ -0,0 +1,169 @@
+"""Иерархическое колесо таймеров.
+
+Позволяет держать множество отложенных действий, к примеру для
+каждой игры, без отдельной задачи или таймера на каждое из них.
+
+Время разбивается на тики одинаковой длины.
+Каждый уровень колеса состоит из `slots` ячеек, ячейка первого уровня
+покрывает один тик, а ячейка каждого следующего уровня покрывает
+целиком предыдущий уровень.
+Таймеры из дальних уровней постепенно спускаются на нижние уровни по
+мере приближения их времени.
+Добавление, отмена и срабатывание таймера выполняются за O(1).
+
+Колесо не зависит от asyncio: время передаётся в `advance()`.
+Потому им можно управлять как из цикла событий бота, так и вручную,
+к примеру в симуляторе.
+"""
+
+from collections.abc import Callable, Hashable
+from time import time
+
+from loguru import logger
+
+
+class _Timer:
+    __slots__ = ("callback", "key", "when")
+
+    def __init__(
+        self, key: Hashable, when: int, callback: Callable[[], object]
+    ) -> None:
+        self.key = key
+        self.when = when
+        self.callback = callback
+
+
+class TimerWheel:
+    """Иерархическое колесо таймеров.
+
+    У каждого таймера есть ключ.
+    Новый таймер с тем же ключом заменяет предыдущий.
+
+    Args:
+        tick: Длина одного тика в секундах, точность таймеров.
+        slots: Сколько ячеек на каждом уровне, степень двойки.
+        levels: Сколько уровней у колеса.
+        now: Текущее время, по умолчанию `time.time()`.
+
+    """
+
+    __slots__ = ("_bits", "_levels", "_now", "_timers", "_wheels", "tick")
+
+    def __init__(
+        self,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        now: float | None = None,
+    ) -> None:
+        if slots < 2 or slots & (slots - 1):  # noqa: PLR2004
+            raise ValueError("Timer wheel slots should be a power of two")
+
+        self.tick = tick
+        self._bits = slots.bit_length() - 1
+        self._levels = levels
+        self._wheels: list[list[list[_Timer]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._timers: dict[Hashable, _Timer] = {}
+        self._now = int((time() if now is None else now) // tick)
+
+    def _add(self, timer: _Timer) -> None:
+        delta = timer.when - self._now
+        mask = (1 << self._bits) - 1
+        for level in range(self._levels):
+            if delta < 1 << (self._bits * (level + 1)):
+                slot = (timer.when >> (self._bits * level)) & mask
+                self._wheels[level][slot].append(timer)
+                return
+
+        # Слишком далёкий таймер ждёт на верхнем уровне и
+        # перекладывается заново, пока не станет достаточно близким
+        level = self._levels - 1
+        far = self._now + (1 << (self._bits * self._levels)) - 1
+        self._wheels[level][(far >> (self._bits * level)) & mask].append(timer)
+
+    def schedule(
+        self, key: Hashable, when: float, callback: Callable[[], object]
+    ) -> None:
+        """Вызывает `callback` в момент времени `when`.
+
+        Если таймер с таким ключом уже есть, он будет заменён.
+        """
+        timer = _Timer(
+            key, max(int(when // self.tick), self._now + 1), callback
+        )
+        self._timers[key] = timer
+        self._add(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Отменяет таймер.
+
+        Возвращает True, если такой таймер был.
+        """
+        return self._timers.pop(key, None) is not None
+
+    def deadline(self, key: Hashable) -> float | None:
+        """Когда сработает таймер с таким ключом."""
+        timer = self._timers.get(key)
+        return None if timer is None else timer.when * self.tick
+
+    def _step(self) -> list[_Timer]:
+        self._now += 1
+        mask = (1 << self._bits) - 1
+        for level in range(1, self._levels):
+            if self._now & ((1 << (self._bits * level)) - 1):
+                break
+            slot = (self._now >> (self._bits * level)) & mask
+            timers = self._wheels[level][slot]
+            self._wheels[level][slot] = []
+            for timer in timers:
+                if self._timers.get(timer.key) is timer:
+                    self._add(timer)
+
+        slot = self._now & mask
+        timers = self._wheels[0][slot]
+        self._wheels[0][slot] = []
+        expired = []
+        for timer in timers:
+            if self._timers.get(timer.key) is not timer:
+                continue
+            if timer.when > self._now:
+                self._add(timer)
+            else:
+                expired.append(timer)
+        return expired
+
+    def advance(self, now: float | None = None) -> int:
+        """Продвигает колесо до текущего времени.
+
+        Вызывает все таймеры, время которых уже наступило.
+        Возвращает количество сработавших таймеров.
+        """
+        target = int((time() if now is None else now) // self.tick)
+        if not self._timers:
+            self._now = max(self._now, target)
+            return 0
+
+        fired = 0
+        while self._now < target and self._timers:
+            for timer in self._step():
+                # Предыдущий таймер мог заменить или отменить этот
+                if self._timers.get(timer.key) is not timer:
+                    continue
+                del self._timers[timer.key]
+                fired += 1
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.exception(e)
+        self._now = max(self._now, target)
+        return fired
+
+    def __len__(self) -> int:
+        """Сколько таймеров ожидают срабатывания."""
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Есть ли таймер с таким ключом."""
+        return key in self._timers
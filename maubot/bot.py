@@ -8,13 +8,15 @@ import secrets
 import sys
 from collections.abc import AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
-from typing import Annotated, Any
+from time import time
+from typing import TYPE_CHECKING, Annotated, Any
 
 import uvicorn
 from aiogram import Bot, Dispatcher
 from aiogram.methods import TelegramMethod
 from aiogram.types import (
     CallbackQuery,
+    ChatMemberUpdated,
     ChosenInlineResult,
     ErrorEvent,
     InlineQuery,
@@ -22,17 +24,50 @@ from aiogram.types import (
     Update,
 )
 from aiogram.utils.token import TokenValidationError
-from fastapi import APIRouter, FastAPI, Header, HTTPException
+from fastapi import APIRouter, Body, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
-from maubot.config import config, default, sm
-from maubot.context import get_context
+from mau.event_log import EventLog
+from mau.game.game import MauGame
+from mau.session import IdleReaper, TurnTimer
+from mau.storage import SqliteStorage
+from mau.timers import TimerWheel
+from maubot import tracing
+from maubot.config import config, default, file_ids, sm
+from maubot.context import GameContext, get_context
+from maubot.dedup import RecentUpdates
 from maubot.events.journal import MessageJournal
 from maubot.events.router import er
+from maubot.filters import ADMINS
 from maubot.handlers import ROUTERS
+from maubot.limiter import LimitedRequests, RateLimiter
+from maubot.metrics import (
+    REGISTRY,
+    UPDATE_ERRORS,
+    MetricsServer,
+    RequestMetrics,
+    metrics_router,
+    update_middleware,
+)
+from maubot.room_lock import RoomLocks
+from maubot.tracing import (
+    TRACER,
+    RequestTracing,
+    TraceFile,
+    trace_handler,
+    trace_update,
+)
+from maubot.webhook import UpdateQueue, webhook_reply
+
+if TYPE_CHECKING:
+    from maubot.card_server import CardRenderer
 
 dp = Dispatcher(sm=sm)
+recent_updates = RecentUpdates()
+room_locks = RoomLocks()
+# Общее колесо таймеров для всех игр
+timers = TimerWheel()
 
 # Настраиваем формат отображения логов loguru
 # Обратите внимание что в проекте помимо loguru используется logging
@@ -45,36 +80,93 @@ LOG_FORMAT = (
 # Middleware
 # ==========
 
+# Повторы событий от Telegram не должны выполнять действия дважды
+dp.update.outer_middleware(recent_updates)
+
+
+def _room_id(
+    event: CallbackQuery | ChosenInlineResult | Message, context: GameContext
+) -> str | None:
+    if context.game is not None:
+        return context.game.room_id
+    if isinstance(event, Message):
+        return str(event.chat.id)
+    if isinstance(event, CallbackQuery) and event.message is not None:
+        return str(event.message.chat.id)
+    return None
+
+
+def _set_context(data: dict[str, Any], context: GameContext) -> None:
+    data["context"] = context
+    data["game"] = context.game
+    data["player"] = context.player
+    journal: MessageJournal = data["journal"]
+    data["channel"] = (
+        journal.get_channel(context.game.room_id)
+        if context.game is not None
+        else None
+    )
 
-@dp.message.middleware()  # type: ignore
-@dp.inline_query.middleware()  # type: ignore
-@dp.callback_query.middleware()  # type: ignore
-@dp.chat_member.middleware()  # type: ignore
-@dp.chosen_inline_result.middleware()  # type: ignore
+
+@dp.message.outer_middleware()  # type: ignore
+@dp.inline_query.outer_middleware()  # type: ignore
+@dp.callback_query.outer_middleware()  # type: ignore
+@dp.chosen_inline_result.outer_middleware()  # type: ignore
 async def game_middleware(
     handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
     event: Update,
     data: dict[str, Any],
 ) -> Callable[[Update, dict[str, Any]], Awaitable[Any]]:
-    """Предоставляет экземпляр игры в обработчики сообщений."""
-    if isinstance(
-        event, CallbackQuery | ChosenInlineResult | InlineQuery | Message
-    ):
-        context = get_context(sm, event)
-        data["game"] = context.game
-        data["player"] = context.player
-        data["channel"] = (
-            sm._event_handler.get_channel(context.game.room_id)
-            if context.game is not None
-            else None
-        )
+    """Предоставляет игровой контекст в фильтры и обработчики.
+
+    События одной комнаты обрабатываются по очереди, вместе с
+    проверкой фильтров, чтобы фильтры видели то же состояние игры, что
+    и обработчик.
+    Если за время ожидания версия игры изменилась, контекст
+    определяется заново.
+    Inline запросы только читают состояние игры и не ждут блокировки.
+    """
+    with tracing.span("middleware.game"):
+        return await _game_middleware(handler, event, data)
 
-    return await handler(event, data)
+
+async def _game_middleware(
+    handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+    event: Update,
+    data: dict[str, Any],
+) -> Any:  # noqa: ANN401
+    if isinstance(event, InlineQuery):
+        _set_context(data, get_context(sm, event))
+        return await handler(event, data)
+    if not isinstance(event, CallbackQuery | ChosenInlineResult | Message):
+        return await handler(event, data)
+
+    context = get_context(sm, event)
+    room_id = _room_id(event, context)
+    if room_id is None:
+        _set_context(data, context)
+        return await handler(event, data)
+
+    version = context.game.version if context.game is not None else None
+    async with room_locks.hold(room_id):
+        # Пока событие ждало своей очереди, игра могла измениться
+        if context.game is None or context.game.version != version:
+            context = get_context(sm, event)
+        _set_context(data, context)
+        return await handler(event, data)
+
+
+@dp.chat_member()
+async def chat_member_handler(event: ChatMemberUpdated) -> None:
+    """Сбрасывает кеш администраторов, если права участника изменились."""
+    if event.old_chat_member.status != event.new_chat_member.status:
+        ADMINS.invalidate(event.chat.id)
 
 
 @dp.errors()
 async def catch_errors(event: ErrorEvent) -> None:
     """Простой обработчик для ошибок."""
+    UPDATE_ERRORS.inc(event.update.event_type)
     logger.warning(event)
     logger.exception(event.exception)
 
@@ -94,6 +186,241 @@ async def catch_errors(event: ErrorEvent) -> None:
     )
 
 
+# Таймеры
+# =======
+
+
+async def run_timers() -> None:
+    """Продвигает колесо таймеров раз в тик."""
+    while True:
+        timers.advance()
+        await asyncio.sleep(timers.tick)
+
+
+# Действия таймеров, которые ждут блокировки комнаты
+_room_tasks: set[asyncio.Task[None]] = set()
+
+
+async def _run_locked(room_id: str, action: Callable[[], None]) -> None:
+    async with room_locks.hold(room_id):
+        try:
+            action()
+        except Exception as e:
+            logger.exception(e)
+
+
+def run_locked(room_id: str, action: Callable[[], None]) -> None:
+    """Выполняет действие таймера под блокировкой комнаты.
+
+    Таймеры меняют игру так же, как и обработчики событий, потому
+    дожидаются пока обработчики той же комнаты закончат работу.
+    """
+    task = asyncio.create_task(_run_locked(room_id, action))
+    _room_tasks.add(task)
+    task.add_done_callback(_room_tasks.discard)
+
+
+async def start_timers(dispatcher: Dispatcher) -> None:
+    """Запускает колесо таймеров вместе с ботом."""
+    dispatcher.workflow_data["timers_task"] = asyncio.create_task(run_timers())
+
+
+async def stop_timers(dispatcher: Dispatcher) -> None:
+    """Останавливает колесо таймеров."""
+    task: asyncio.Task[None] | None = dispatcher.workflow_data.pop(
+        "timers_task", None
+    )
+    if task is not None:
+        task.cancel()
+
+
+async def flush_journal(dispatcher: Dispatcher) -> None:
+    """Отправляет отложенные изменения журналов при остановке бота."""
+    journal: MessageJournal = dispatcher.workflow_data["journal"]
+    await journal.flush()
+
+
+# Метрики
+# =======
+
+
+def setup_metrics(
+    bot: Bot,
+    journal: MessageJournal,
+    limiter: RateLimiter,
+    watchers: list[IdleReaper | TurnTimer],
+    renderer: "CardRenderer | None" = None,
+) -> None:
+    """Замеряет обработку событий и запросы, собирает счётчики бота.
+
+    Счётчики компонентов бота читаются только при запросе метрик.
+    С webhook метрики отдаёт приложение, иначе отдельный сервер.
+    """
+    dp.update.outer_middleware(update_middleware)
+    bot.session.middleware(RequestMetrics())
+    if not config.use_hook:
+        dp.startup.register(start_metrics)
+        dp.shutdown.register(stop_metrics)
+
+    r = REGISTRY
+    r.gauge("mau_sessions", "Open game sessions.", lambda: sm.active)
+    r.counter(
+        "mau_sessions_created_total",
+        "Created game sessions.",
+        lambda: sm.created,
+    )
+    r.gauge("mau_timers", "Pending game timers.", lambda: len(timers))
+    for watcher in watchers:
+        if isinstance(watcher, IdleReaper):
+            reaper = watcher
+            r.counter(
+                "mau_sessions_reaped_total",
+                "Idle game sessions closed automatically.",
+                lambda: reaper.reaped,
+            )
+        else:
+            turn_timer = watcher
+            r.counter(
+                "mau_turns_skipped_total",
+                "Turns skipped by the turn timer.",
+                lambda: turn_timer.skipped,
+            )
+
+    r.gauge(
+        "mau_journal_rooms",
+        "Rooms processing game events.",
+        lambda: journal.pending,
+    )
+    r.gauge(
+        "mau_journal_events",
+        "Game events waiting to be processed.",
+        lambda: sum(journal.queue_depths().values()),
+    )
+    r.counter(
+        "mau_journal_events_total",
+        "Game events merged or dropped by the journal.",
+        lambda: {("merged",): journal.merged, ("dropped",): journal.dropped},
+        ("result",),
+    )
+
+    r.gauge(
+        "mau_limiter_pending",
+        "Telegram requests waiting for the rate limiter.",
+        lambda: limiter.pending,
+    )
+    r.counter(
+        "mau_limiter_calls_total",
+        "Telegram requests sent by the rate limiter.",
+        lambda: {
+            ("sent",): limiter.stats.calls,
+            ("retried",): limiter.stats.retries,
+            ("failed",): limiter.stats.failed,
+        },
+        ("result",),
+    )
+    r.counter(
+        "mau_limiter_wait_seconds_total",
+        "Time requests waited for the rate limiter.",
+        lambda: limiter.stats.waited,
+    )
+
+    r.counter(
+        "mau_updates_duplicate_total",
+        "Skipped duplicate updates.",
+        lambda: recent_updates.hits,
+    )
+    r.counter(
+        "mau_room_locks_total",
+        "Room lock acquisitions.",
+        lambda: {
+            ("acquired",): room_locks.acquired,
+            ("contended",): room_locks.contended,
+        },
+        ("result",),
+    )
+    r.counter(
+        "mau_admin_cache_total",
+        "Chat administrators cache lookups.",
+        lambda: {("hit",): ADMINS.hits, ("miss",): ADMINS.misses},
+        ("result",),
+    )
+
+    update_queue: UpdateQueue | None = dp.workflow_data.get("update_queue")
+    if update_queue is not None:
+        queue = update_queue
+        r.gauge(
+            "mau_update_queue_depth",
+            "Webhook updates waiting in the queue.",
+            lambda: queue.depth,
+        )
+        r.counter(
+            "mau_update_queue_total",
+            "Webhook updates passed through the queue.",
+            lambda: {
+                ("processed",): queue.stats.processed,
+                ("failed",): queue.stats.failed,
+                ("dropped",): queue.stats.dropped,
+                ("rejected",): queue.stats.rejected,
+            },
+            ("result",),
+        )
+
+    if renderer is not None:
+        cards = renderer
+        r.counter(
+            "mau_card_requests_total",
+            "Card image requests by source.",
+            lambda: {
+                ("memory",): cards.stats.memory_hits,
+                ("disk",): cards.stats.disk_hits,
+                ("render",): cards.stats.renders,
+                ("failed",): cards.stats.failed,
+            },
+            ("source",),
+        )
+
+
+async def start_metrics(dispatcher: Dispatcher) -> None:
+    """Запускает отдельный сервер метрик для long polling."""
+    server = MetricsServer(port=config.metrics_port)
+    await server.start()
+    dispatcher.workflow_data["metrics_server"] = server
+
+
+async def stop_metrics(dispatcher: Dispatcher) -> None:
+    """Останавливает сервер метрик."""
+    server: MetricsServer | None = dispatcher.workflow_data.pop(
+        "metrics_server", None
+    )
+    if server is not None:
+        await server.stop()
+
+
+# Трассировка
+# ===========
+
+
+def setup_tracing(bot: Bot) -> TraceFile | None:
+    """Записывает трассы части событий, если указан файл трасс."""
+    if config.trace_path is None:
+        return None
+
+    logger.info("Write traces to {}", config.trace_path)
+    trace_file = TraceFile(config.trace_path)
+    TRACER.sink = trace_file
+    TRACER.sample_rate = config.trace_sample
+    dp.update.outer_middleware(trace_update)
+    for observer in (
+        dp.message,
+        dp.callback_query,
+        dp.inline_query,
+        dp.chosen_inline_result,
+    ):
+        observer.middleware(trace_handler)
+    bot.session.middleware(RequestTracing())
+    return trace_file
+
+
 # Настройка webhook
 # =================
 
@@ -102,7 +429,9 @@ async def on_startup(bot: Bot) -> None:
     """Настройка webhook при запуске."""
     logger.info("Set hook to: {}", config.hook_url)
     await bot.set_webhook(
-        f"{config.hook_url}{config.hook_root}", secret_token=config.hook_secret
+        f"{config.hook_url}{config.hook_root}",
+        secret_token=config.hook_secret,
+        allowed_updates=dp.resolve_used_update_types(),
     )
 
 
@@ -123,10 +452,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     # db connected
     await dp.emit_startup(**workflow_data)
+    update_queue: UpdateQueue | None = dp.workflow_data.get("update_queue")
+    if update_queue is not None:
+        update_queue.start()
 
     yield
 
     # app teardown
+    if update_queue is not None:
+        await update_queue.close()
     await dp.emit_shutdown(**workflow_data)
 
 
@@ -135,58 +469,57 @@ router = APIRouter()
 
 @router.post(config.hook_root)
 async def process_hook(
-    update: Update,
+    update: Annotated[dict[str, Any], Body()],
     secret: Annotated[
         str, Header(alias="x-telegram-bot-api-secret-token")
     ] = "",
 ) -> dict:
-    """Обрабатывает приходящие события для бота."""
+    """Обрабатывает приходящие события для бота.
+
+    Если включена очередь событий, событие только добавляется в
+    очередь, а Telegram сразу получает ответ.
+    Иначе если обработчик вернул метод Telegram, то при включённом
+    `hook_reply` он отправляется прямо в ответе на webhook.
+    """
     if not secrets.compare_digest(secret, config.hook_secret):
         raise HTTPException(401, "Unauthorized")
 
+    update_queue: UpdateQueue | None = dp.workflow_data.get("update_queue")
+    if update_queue is not None:
+        if not update_queue.put(update):
+            raise HTTPException(503, "Update queue is full")
+        return {}
+
+    bot: Bot = dp.workflow_data["bot"]
     result: TelegramMethod[Any] | None = await dp.feed_webhook_update(
-        dp.workflow_data["bot"], update
+        bot, update
     )
-
-    if not result:
+    if result is None:
         return {}
 
-    logger.debug(result)
-    return {}
-
-
-#     writer = MultipartWriter(
-#         "form-data", boundary=f"webhookBoundary{secrets.token_urlsafe(16)}"
-#     )
-
-#     payload = writer.append(result.__api_method__)
-#     payload.set_content_disposition("form-data", name="method")
-
-#     files: dict[str, InputFile] = {}
-#     for key, value in result.model_dump(warnings=False).items():
-#         value = bot.session.prepare_value(value, bot=bot, files=files)
-#         if not value:
-#             continue
-#         payload = writer.append(value)
-#         payload.set_content_disposition("form-data", name=key)
+    if config.hook_reply:
+        reply = webhook_reply(bot, result)
+        if reply is not None:
+            return reply
 
-#     for key, value in files.items():
-#         payload = writer.append(value.read(bot))
-#         payload.set_content_disposition(
-#             "form-data",
-#             name=key,
-#             filename=value.filename or key,
-#         )
-
-#     return StreamingResponse(writer, media_type="multipart/form-data")
+    await dp.silent_call_request(bot, result)
+    return {}
 
 
 # Запуск бота
 # ===========
 
 
-def create_app(router: APIRouter) -> FastAPI:
-    """Запускает работу Webhook."""
+def create_app(
+    router: APIRouter,
+    renderer: "CardRenderer | None" = None,
+    metrics: bool = False,
+) -> FastAPI:
+    """Запускает работу Webhook.
+
+    Если передан генератор карт, также отдаёт изображения карт.
+    Если включены метрики, отдаёт их по адресу `/metrics`.
+    """
     app: FastAPI = FastAPI(
         debug=True,
         title="Mau:bot",
@@ -204,9 +537,112 @@ def create_app(router: APIRouter) -> FastAPI:
     )
 
     app.include_router(router)
+    if renderer is not None:
+        from maubot.card_server import card_router  # noqa: PLC0415
+
+        app.include_router(card_router(renderer))
+    if metrics:
+        app.include_router(metrics_router())
     return app
 
 
+def create_renderer() -> "CardRenderer | None":
+    """Создаёт локальный генератор карт, если он включён."""
+    if config.card_assets_path is None:
+        return None
+    if not config.use_hook:
+        logger.warning("Local card renderer works only with webhook")
+        return None
+
+    # Pillow нужен только для локального генератора карт
+    from maubot.card_server import CardRenderer  # noqa: PLC0415
+
+    logger.info("Render cards from {}", config.card_assets_path)
+    return CardRenderer(
+        config.card_assets_path,
+        config.card_cache_path,
+        config.card_cache_size,
+        workers=config.card_workers,
+    )
+
+
+def create_update_queue(bot: Bot) -> None:
+    """Создаёт очередь событий webhook, если она включена."""
+    if config.use_hook and config.hook_workers > 0:
+        dp.workflow_data["update_queue"] = UpdateQueue(
+            dp,
+            bot,
+            config.hook_workers,
+            config.hook_queue_size,
+            config.hook_overflow,
+        )
+
+
+def create_watchers() -> list[IdleReaper | TurnTimer]:
+    """Запускает таймеры игр и подключает их к менеджеру сессий."""
+    watchers: list[IdleReaper | TurnTimer] = []
+    # Заброшенные игры завершаются сами, в том числе восстановленные
+    if config.idle_limit > 0:
+        watchers.append(IdleReaper(sm, timers, config.idle_limit, run_locked))
+    # Бездействующие игроки пропускают ход сами
+    if config.turn_timeout > 0:
+        watchers.append(TurnTimer(sm, timers, config.turn_timeout, run_locked))
+    for watcher in watchers:
+        sm.add_watcher(watcher)
+
+    dp.startup.register(start_timers)
+    dp.shutdown.register(stop_timers)
+    return watchers
+
+
+def create_journal(bot: Bot, limiter: RateLimiter) -> MessageJournal:
+    """Создаёт журнал игры и подключает его к менеджеру сессий.
+
+    При остановке бота журнал отправляет отложенные изменения.
+    """
+    journal = MessageJournal(
+        bot, er, config.journal_delay, limiter=limiter, file_ids=file_ids
+    )
+    sm.set_handler(journal)
+    dp.workflow_data["journal"] = journal
+    dp.shutdown.register(flush_journal)
+    return journal
+
+
+def create_event_log(journal: MessageJournal) -> EventLog | None:
+    """Записывает игровые события на диск, если указан журнал событий."""
+    if config.event_log_path is None:
+        return None
+    event_log = EventLog(journal, config.event_log_path)
+    sm.set_handler(event_log)
+    return event_log
+
+
+def _flush_storage(storage: SqliteStorage[MauGame]) -> None:
+    # Игры меняются и без обращений к хранилищу, потому сохраняем их
+    # по таймеру
+    storage.flush()
+    timers.schedule(
+        "storage",
+        time() + storage.flush_interval,
+        lambda: _flush_storage(storage),
+    )
+
+
+def create_storage() -> SqliteStorage[MauGame] | None:
+    """Загружает сохранённые игры, если указан файл базы данных."""
+    if config.storage_path is None:
+        return None
+    logger.info("Load games from {}", config.storage_path)
+    storage: SqliteStorage[MauGame] = SqliteStorage(
+        config.storage_path, MauGame.snapshot, sm.restore_game, "games"
+    )
+    storage.load()
+    sm.set_game_storage(storage)
+    _flush_storage(storage)
+    return storage
+
+
 def main() -> None:
     """Запускает бота.
 
@@ -230,14 +666,45 @@ def main() -> None:
         logger.debug("Include router {}", r.name)
 
     logger.info("Set event handler")
-    sm.set_handler(MessageJournal(bot, er))
+    limiter = RateLimiter(
+        config.rate_global, config.rate_chat, config.rate_chat_burst
+    )
+    bot.session.middleware(LimitedRequests(limiter))
+    file_ids.load()
+    journal = create_journal(bot, limiter)
+    event_log = create_event_log(journal)
+
+    watchers = create_watchers()
+
+    # Игры восстанавливаются уже с новым обработчиком событий
+    storage = create_storage()
+
+    renderer = create_renderer()
+    create_update_queue(bot)
+
+    if config.metrics:
+        logger.info("Collect metrics")
+        setup_metrics(bot, journal, limiter, watchers, renderer)
+    trace_file = setup_tracing(bot)
 
     logger.success("Start polling!")
-    if config.use_hook:
-        dp.workflow_data["bot"] = bot
-        dp.startup.register(on_startup)
-        dp.shutdown.register(on_shutdown)
-        app = create_app(router)
-        uvicorn.run(app, host=config.server_host, port=config.server_port)
-    else:
-        asyncio.run(dp.start_polling(bot))
+    try:
+        if config.use_hook:
+            dp.workflow_data["bot"] = bot
+            dp.startup.register(on_startup)
+            dp.shutdown.register(on_shutdown)
+            app = create_app(router, renderer, config.metrics)
+            uvicorn.run(app, host=config.server_host, port=config.server_port)
+        else:
+            asyncio.run(dp.start_polling(bot))
+    finally:
+        file_ids.save()
+        if renderer is not None:
+            renderer.close()
+        if trace_file is not None:
+            trace_file.close()
+        if storage is not None:
+            logger.info("Save games to {}", config.storage_path)
+            storage.close()
+        if event_log is not None:
+            event_log.close()
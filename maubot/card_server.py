@@ -0,0 +1,365 @@
+"""Локальный генератор изображений карт.
+
+По умолчанию изображения карт берутся с внешнего генератора карт
+`mau-cards`, подробнее в `docs/use/card_generator.md`.
+Локальный генератор собирает те же изображения из тех же асетов,
+но прямо на сервере бота.
+Так бот не зависит от доступности внешнего генератора.
+
+Сборка изображения выполняется в отдельных процессах, чтобы не
+блокировать обработку событий бота.
+Готовые изображения хранятся в памяти и на диске.
+Изображение карты никогда не меняется, потому клиенты могут навсегда
+сохранить его у себя.
+
+Для сборки изображений нужен Pillow из группы зависимостей `cards`,
+потому модуль загружается только при включённом локальном генераторе.
+"""
+
+import asyncio
+import hashlib
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from loguru import logger
+from PIL import Image, ImageEnhance
+
+# Размер изображения карты
+CARD_SIZE = (312, 512)
+
+# Изображения карт неизменны, клиент может хранить их сколько угодно
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Доступные эффекты для карт
+CARD_FILTERS = ("cover", "uncover")
+
+# Насколько затемняется карта, которую нельзя разыграть
+_UNCOVER_BRIGHTNESS = 0.4
+
+# Отступ символов от края карты и между собой
+_MARGIN = 24
+_GAP = 2
+
+_ASSET_RE = re.compile(r"^[a-z0-9_-]+$")
+_PACK_RE = re.compile(r"^([0-7])_([0-9])_([0-9]{1,2})_([a-z+]+)$")
+
+# Символы в углах карты для каждого типа карты
+_SYMBOLS: dict[str, tuple[str, ...]] = {
+    "number": ("{value}",),
+    "twist": ("reverse", "{value}"),
+    "rotate": ("reverse", "{value}"),
+    "turn": ("block",),
+    "block": ("block",),
+    "reverse": ("reverse",),
+    "color": ("color",),
+    "wild+color": ("color",),
+    "delta": ("delta",),
+    "take": ("plus", "{value}"),
+    "wild+take": ("plus", "{value}"),
+    "put": ("minus", "{value}"),
+}
+
+# Главный символ карты для каждого типа карты
+_GLYPHS: dict[str, str] = {
+    "number": "{value}",
+    "twist": "{value}",
+    "rotate": "{value}",
+    "turn": "block",
+    "block": "block",
+    "reverse": "reverse",
+    "color": "color",
+    "wild+color": "color",
+    "delta": "delta",
+    "take": "take_{take}",
+    "wild+take": "take_{take}",
+    "put": "take_{take}",
+}
+
+CardKey = tuple[str, str, str]
+
+
+# Сборка изображения
+# ==================
+
+
+@lru_cache(maxsize=256)
+def _layer(path: Path) -> Image.Image:
+    with Image.open(path) as image:
+        return image.convert("RGBA")
+
+
+def _take_glyph(value: int) -> int:
+    if value <= 1:
+        return 1
+    return 2 if value < 4 else 4  # noqa: PLR2004
+
+
+def render_card(assets: Path, asset: str, pack: str, card_filter: str) -> bytes:
+    """Собирает изображение карты из асетов.
+
+    Выполняется в отдельном процессе.
+    Возвращает изображение карты в формате PNG.
+    """
+    match = _PACK_RE.match(pack)
+    if match is None:
+        raise ValueError(f"Invalid card pack: {pack}")
+    color, value, _, card_type = match.groups()
+    names = {"value": value, "take": _take_glyph(int(value))}
+    root = assets / asset
+
+    image = _layer(root / "base.png").copy()
+    image.alpha_composite(_layer(root / "color" / f"{color}.png"))
+
+    glyph = _layer(root / "glyph" / f"{_GLYPHS[card_type].format(**names)}.png")
+    image.alpha_composite(
+        glyph,
+        (
+            (CARD_SIZE[0] - glyph.width) // 2,
+            (CARD_SIZE[1] - glyph.height) // 2,
+        ),
+    )
+
+    symbols = [name.format(**names) for name in _SYMBOLS[card_type]]
+    x = _MARGIN
+    for name in symbols:
+        symbol = _layer(root / "sym" / f"{name}.png")
+        image.alpha_composite(symbol, (x, _MARGIN))
+        x += symbol.width + _GAP
+
+    x = CARD_SIZE[0] - _MARGIN
+    for name in symbols:
+        symbol = _layer(root / "sym_reverse" / f"{name}.png")
+        x -= symbol.width
+        image.alpha_composite(
+            symbol, (x, CARD_SIZE[1] - _MARGIN - symbol.height)
+        )
+        x -= _GAP
+
+    if card_filter == "uncover":
+        alpha = image.getchannel("A")
+        image = ImageEnhance.Brightness(image).enhance(_UNCOVER_BRIGHTNESS)
+        image.putalpha(alpha)
+
+    buffer = BytesIO()
+    image.save(buffer, "PNG", optimize=False)
+    return buffer.getvalue()
+
+
+# Хранение изображений
+# ====================
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedCard:
+    """Готовое изображение карты."""
+
+    content: bytes
+    etag: str
+
+    @classmethod
+    def from_content(cls, content: bytes) -> "RenderedCard":
+        """Создаёт изображение карты и вычисляет его ETag."""
+        return cls(
+            content, f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+        )
+
+
+@dataclass(slots=True)
+class RendererStats:
+    """Статистика генератора карт."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    renders: int = 0
+    failed: int = 0
+
+
+class CardRenderer:
+    """Собирает изображения карт и хранит готовые изображения.
+
+    Сначала изображение ищется в памяти, после на диске и только
+    потом собирается заново в пуле процессов.
+    Одновременные запросы одной и той же карты собирают изображение
+    только один раз.
+
+    Args:
+        assets: Директория с наборами асетов.
+        cache_path: Директория для хранения готовых изображений.
+            Если не указана, изображения хранятся только в памяти.
+        memory_size: Сколько изображений хранить в памяти.
+        disk_size: Сколько изображений хранить на диске.
+        workers: Сколько процессов собирают изображения.
+
+    """
+
+    def __init__(
+        self,
+        assets: Path,
+        cache_path: Path | None = None,
+        memory_size: int = 512,
+        disk_size: int = 4096,
+        workers: int | None = None,
+    ) -> None:
+        self.assets = assets
+        self.cache_path = cache_path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.stats = RendererStats()
+
+        self._workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._memory: OrderedDict[CardKey, RenderedCard] = OrderedDict()
+        self._disk: OrderedDict[CardKey, Path] = OrderedDict()
+        self._rendering: dict[CardKey, asyncio.Future[RenderedCard | None]] = {}
+
+        if cache_path is not None:
+            self._scan_disk(cache_path)
+
+    def _scan_disk(self, cache_path: Path) -> None:
+        files = sorted(
+            cache_path.glob("*/*/*.png"), key=lambda p: p.stat().st_mtime
+        )
+        for path in files:
+            key = (path.parent.parent.name, path.stem, path.parent.name)
+            self._disk[key] = path
+        self._trim_disk()
+        logger.info("Found {} rendered cards on disk", len(self._disk))
+
+    def _trim_disk(self) -> None:
+        while len(self._disk) > self.disk_size:
+            _, path = self._disk.popitem(last=False)
+            path.unlink(missing_ok=True)
+
+    def _remember(self, key: CardKey, card: RenderedCard) -> None:
+        self._memory[key] = card
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def is_valid(self, asset: str, pack: str, card_filter: str) -> bool:
+        """Проверяет что такое изображение карты можно собрать."""
+        match = _PACK_RE.match(pack)
+        return (
+            card_filter in CARD_FILTERS
+            and match is not None
+            and match.group(4) in _GLYPHS
+            and _ASSET_RE.match(asset) is not None
+            and (self.assets / asset / "base.png").is_file()
+        )
+
+    async def get(
+        self, asset: str, pack: str, card_filter: str
+    ) -> RenderedCard | None:
+        """Возвращает изображение карты.
+
+        Если такую карту нельзя собрать, вернёт None.
+        """
+        key = (asset, pack, card_filter)
+        card = self._memory.get(key)
+        if card is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            return card
+
+        rendering = self._rendering.get(key)
+        if rendering is not None:
+            return await asyncio.shield(rendering)
+
+        if not self.is_valid(asset, pack, card_filter):
+            return None
+
+        future: asyncio.Future[RenderedCard | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._rendering[key] = future
+        try:
+            card = await self._load(key)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning("Failed to render card {}: {}", key, e)
+            future.set_result(None)
+            return None
+        else:
+            self._remember(key, card)
+            future.set_result(card)
+            return card
+        finally:
+            del self._rendering[key]
+
+    async def _load(self, key: CardKey) -> RenderedCard:
+        path = self._disk.get(key)
+        if path is not None:
+            self._disk.move_to_end(key)
+            try:
+                content = await asyncio.to_thread(path.read_bytes)
+            except FileNotFoundError:
+                del self._disk[key]
+            else:
+                self.stats.disk_hits += 1
+                return RenderedCard.from_content(content)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._workers)
+        content = await asyncio.get_running_loop().run_in_executor(
+            self._pool, render_card, self.assets, *key
+        )
+        self.stats.renders += 1
+
+        if self.cache_path is not None:
+            asset, pack, card_filter = key
+            path = self.cache_path / asset / card_filter / f"{pack}.png"
+            await asyncio.to_thread(_write_file, path, content)
+            self._disk[key] = path
+            self._trim_disk()
+        return RenderedCard.from_content(content)
+
+    def close(self) -> None:
+        """Останавливает процессы сборки изображений."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _write_file(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(content)
+    tmp.replace(path)
+
+
+# Обработчик запросов
+# ===================
+
+
+def card_router(renderer: CardRenderer) -> APIRouter:
+    """Ручка для получения изображений карт.
+
+    Ссылки совпадают с внешним генератором карт:
+    `/card/{asset}/{pack}/{filter}`.
+    """
+    router = APIRouter()
+
+    @router.get("/card/{asset}/{pack}/{card_filter}")
+    async def get_card(
+        asset: str,
+        pack: str,
+        card_filter: str,
+        if_none_match: Annotated[str, Header()] = "",
+    ) -> Response:
+        """Отдаёт изображение карты."""
+        card = await renderer.get(asset, pack, card_filter)
+        if card is None:
+            raise HTTPException(404, "Card not found")
+
+        headers = {"Cache-Control": CACHE_CONTROL, "ETag": card.etag}
+        if if_none_match == card.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(card.content, media_type="image/png", headers=headers)
+
+    return router
@@ -5,12 +5,16 @@
 Загружаются один раз при запуске и больше не изменяются.
 """
 
+from pathlib import Path
+
 from aiogram.client.default import DefaultBotProperties
 from pydantic import BaseModel, Field, SecretStr
 from pydantic_settings import BaseSettings
 
+from mau.events import BaseEventHandler
 from mau.session import SessionManager
-from maubot.events.journal import MessageJournal
+from maubot.file_ids import CARD_URL, FileIdRegistry
+from maubot.webhook import OverflowPolicy
 
 
 class Config(BaseSettings):
@@ -25,6 +29,46 @@ class Config(BaseSettings):
     - hook_root: Ссылка на сервер хука для telegram.
     - hook_root: API ручка для хука.
     - hook_secret: Дополнительный секрет для проверки событий хука.
+    - hook_reply: Отправлять метод, возвращённый обработчиком, прямо в
+      ответе на webhook, без отдельного запроса.
+    - hook_workers: Сколько событий webhook обрабатывать одновременно
+      в фоне. 0 - обрабатывать событие, пока Telegram ждёт ответа.
+    - hook_queue_size: Сколько событий webhook может ждать обработки.
+    - hook_overflow: Что делать с событием при переполнении очереди:
+      `drop_new`, `drop_old` или `reject`.
+
+    Прочие настройки:
+    - storage_path: Файл базы данных для сохранения игр между
+      перезапусками бота. Если не указан, игры хранятся только в памяти.
+    - event_log_path: Директория для журнала игровых событий.
+      Если не указана, события не записываются.
+    - idle_limit: Через сколько секунд без ходов игра завершается
+      автоматически. 0 - никогда.
+    - turn_timeout: Сколько секунд даётся на ход в играх с правилом
+      "Таймер хода". 0 - правило не работает.
+    - journal_delay: Сколько секунд собирать изменения журнала игры,
+      чтобы отправить их одним сообщением. 0 - отправлять сразу.
+    - rate_global: Сколько запросов в секунду бот отправляет в Telegram.
+    - rate_chat: Сколько запросов в секунду бот отправляет в один чат.
+      Telegram позволяет около 20 сообщений в минуту в групповой чат.
+    - rate_chat_burst: Сколько запросов в чат можно отправить подряд.
+    - file_ids_path: Файл для сохранения `file_id` изображений карт.
+    - card_url: Шаблон ссылки на изображение карты.
+
+    Локальный генератор карт (только для webhook):
+    - card_assets_path: Директория с асетами карт.
+      Если не указана, локальный генератор карт выключен.
+    - card_cache_path: Директория для хранения готовых изображений.
+    - card_cache_size: Сколько готовых изображений хранить в памяти.
+    - card_workers: Сколько процессов собирают изображения.
+
+    Метрики:
+    - metrics: Отдавать метрики в формате Prometheus по адресу
+      `/metrics`. С webhook метрики отдаёт тот же сервер.
+    - metrics_port: На каком порту отдавать метрики при long polling.
+    - trace_path: Файл для трасс обработки событий.
+      Если не указан, трассы не записываются.
+    - trace_sample: Какая доля событий попадает в трассы, от 0 до 1.
     """
 
     telegram_token: SecretStr = Field()
@@ -35,6 +79,31 @@ class Config(BaseSettings):
     hook_url: str
     hook_root: str
     hook_secret: str
+    hook_reply: bool = False
+    hook_workers: int = 0
+    hook_queue_size: int = 1024
+    hook_overflow: OverflowPolicy = OverflowPolicy.DROP_OLD
+
+    storage_path: Path | None = None
+    event_log_path: Path | None = None
+    idle_limit: float = 10800
+    turn_timeout: float = 90
+    journal_delay: float = 0.2
+    rate_global: float = 30
+    rate_chat: float = 20 / 60
+    rate_chat_burst: float = 3
+    file_ids_path: Path | None = Path("file_ids.json")
+    card_url: str = CARD_URL
+
+    card_assets_path: Path | None = None
+    card_cache_path: Path | None = None
+    card_cache_size: int = 512
+    card_workers: int | None = None
+
+    metrics: bool = False
+    metrics_port: int = 9100
+    trace_path: Path | None = None
+    trace_sample: float = 0.01
 
 
 class StickerSet(BaseModel):
@@ -46,5 +115,6 @@ class StickerSet(BaseModel):
 
 # Настройки бота по умолчанию
 default = DefaultBotProperties(parse_mode="HTML")
-sm: SessionManager[MessageJournal] = SessionManager()
+sm: SessionManager[BaseEventHandler] = SessionManager()
 config: Config = Config(_env_file=".env")  # type: ignore
+file_ids = FileIdRegistry(config.file_ids_path, card_url=config.card_url)
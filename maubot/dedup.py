@@ -0,0 +1,91 @@
+"""Отбрасывает повторно полученные события.
+
+Telegram повторно присылает событие webhook, если не дождался ответа,
+а после перезапуска long polling бот может снова получить недавние
+события.
+Если повторить выбор карты или взятие карт, действие выполнится
+дважды.
+
+Потому бот запоминает `update_id` недавних событий и пропускает те,
+что уже видел.
+"""
+
+from array import array
+from collections.abc import Awaitable, Callable
+from time import monotonic
+from typing import Any
+
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+
+
+class RecentUpdates:
+    """Недавно полученные события.
+
+    Хранит не больше `size` последних `update_id` и не дольше `ttl`
+    секунд.
+    Идентификаторы лежат в кольцевом буфере для порядка вытеснения и
+    во множестве для быстрой проверки.
+
+    Также используется как outer middleware для событий диспетчера.
+
+    Args:
+        size: Сколько последних событий помнить.
+        ttl: Сколько секунд помнить событие.
+
+    """
+
+    __slots__ = ("_ids", "_seen", "_start", "_times", "hits", "misses", "ttl")
+
+    def __init__(self, size: int = 4096, ttl: float = 600) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._ids = array("q", [0] * size)
+        self._times = array("d", [0.0] * size)
+        self._seen: set[int] = set()
+        self._start = 0
+
+    def _expire(self, now: float) -> None:
+        size = len(self._ids)
+        while self._seen:
+            if self._times[self._start] > now - self.ttl:
+                return
+            self._seen.discard(self._ids[self._start])
+            self._start = (self._start + 1) % size
+
+    def seen(self, update_id: int) -> bool:
+        """Проверяет было ли уже такое событие и запоминает его."""
+        now = monotonic()
+        self._expire(now)
+        if update_id in self._seen:
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        size = len(self._ids)
+        if len(self._seen) == size:
+            self._seen.discard(self._ids[self._start])
+            self._start = (self._start + 1) % size
+        end = (self._start + len(self._seen)) % size
+        self._ids[end] = update_id
+        self._times[end] = now
+        self._seen.add(update_id)
+        return False
+
+    def __len__(self) -> int:
+        """Сколько событий сейчас помнит."""
+        return len(self._seen)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        """Пропускает событие, если оно уже было получено."""
+        if isinstance(event, Update) and self.seen(event.update_id):
+            logger.warning("Skip duplicate update {}", event.update_id)
+            return UNHANDLED
+        return await handler(event, data)
@@ -3,6 +3,8 @@
 import asyncio
 from collections import deque
 from collections.abc import Awaitable, Callable
+from contextvars import Context
+from time import perf_counter
 from typing import Any, TypeVar
 
 from aiogram import Bot
@@ -12,9 +14,14 @@ from loguru import logger
 from mau.deck.card import MauCard
 from mau.enums import GameEvents
 from mau.events import BaseEventHandler, Event
+from maubot import tracing
+from maubot.file_ids import FileIdRegistry
+from maubot.limiter import Priority, RateLimiter
+from maubot.metrics import EVENT_SECONDS
 
 FuncType = Callable[..., Any] | Callable[..., Awaitable[Any]]
 T = TypeVar("T", bound=FuncType)
+_R = TypeVar("_R")
 
 
 class EventRouter:
@@ -32,7 +39,14 @@ class EventRouter:
             return
 
         channel = journal.get_channel(event.game.room_id)
-        await handler(event, channel)
+        start = perf_counter()
+        try:
+            with tracing.span(f"event.{event.event_type.name.lower()}"):
+                await handler(event, channel)
+        finally:
+            EVENT_SECONDS.observe(
+                perf_counter() - start, event.event_type.name.lower()
+            )
 
     def event(self, event: GameEvents) -> Callable:
         """Декоратор для добавления новых обработчиков событий."""
@@ -45,33 +59,81 @@ class EventRouter:
 
 
 class MessageChannel:
-    """Канал сообщений, привязанный к конкретному чату."""
-
-    def __init__(self, room_id: str, bot: Bot) -> None:
+    """Канал сообщений, привязанный к конкретному чату.
+
+    За один ход движок может отправить сразу несколько событий, каждое
+    из которых изменяет журнал.
+    Если указана задержка `delay`, канал работает в режиме объединения:
+    `send` не отправляет журнал сразу, а ждёт указанное время.
+    Все изменения журнала и клавиатуры за это время отправляются одним
+    запросом к Telegram.
+    Отправки журнала одного канала не пересекаются, потому пока первая
+    отправка создаёт сообщение журнала, вторая его дождётся и изменит.
+
+    Args:
+        room_id: В какой чат отправлять сообщения.
+        bot: Через какого бота отправлять сообщения.
+        delay: Сколько секунд собирать изменения журнала.
+            По умолчанию журнал отправляется сразу.
+        limiter: Общий планировщик запросов к Telegram.
+            Если не указан, запросы отправляются напрямую.
+        file_ids: Реестр загруженных изображений карт.
+
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        bot: Bot,
+        delay: float = 0,
+        limiter: RateLimiter | None = None,
+        file_ids: FileIdRegistry | None = None,
+    ) -> None:
         self.room_id = room_id
         self.lobby_message: Message | None = None
         self.room_message: Message | None = None
         self.message_queue: deque[str] = deque(maxlen=5)
         self.bot = bot
         self.markup: InlineKeyboardMarkup | None = None
+        self.delay = delay
+        self.limiter = limiter
+        self.file_ids = file_ids or FileIdRegistry()
+        self._send_task: asyncio.Task[None] | None = None
+        self._send_lock = asyncio.Lock()
+        self._send_span: tracing.Span | None = None
+        # Что уже отправлено в сообщение журнала
+        self._sent: tuple[str, InlineKeyboardMarkup | None] | None = None
+
+    async def _call(
+        self, priority: Priority, factory: Callable[[], Awaitable[_R]]
+    ) -> _R:
+        if self.limiter is None:
+            return await factory()
+        return await self.limiter.call(self.room_id, priority, factory)
 
     async def send_lobby(
         self, message: str, reply_markup: InlineKeyboardMarkup | None = None
     ) -> None:
         """Отправляет сообщение-лобби о начале новой игры."""
         if self.lobby_message is None:
-            lobby_message = await self.bot.send_message(
-                text=message,
-                chat_id=self.room_id,
-                reply_markup=reply_markup,
+            lobby_message = await self._call(
+                Priority.LOBBY,
+                lambda: self.bot.send_message(
+                    text=message,
+                    chat_id=self.room_id,
+                    reply_markup=reply_markup,
+                ),
             )
             if isinstance(lobby_message, Message):
                 self.lobby_message = lobby_message
 
         else:
-            await self.lobby_message.edit_text(
-                text=message,
-                reply_markup=reply_markup,
+            lobby = self.lobby_message
+            await self._call(
+                Priority.LOBBY,
+                lambda: lobby.edit_text(
+                    text=message, reply_markup=reply_markup
+                ),
             )
 
     # TODO: Удаляем?
@@ -95,36 +157,114 @@ class MessageChannel:
         новое сообщение с журналом.
         Если же журнал привязан, то изменится текст сообщения.
         По умолчанию журнал очищается при каждом новом ходе игрока.
+
+        В режиме объединения журнал будет отправлен после задержки.
+        """
+        if self.delay <= 0:
+            await self._send()
+        elif self._send_task is None:
+            self._send_span = tracing.start_span("journal.delay")
+            # Трасса продолжается только через отрезок ожидания
+            self._send_task = asyncio.create_task(
+                self._delayed_send(), context=Context()
+            )
+
+    def _take_span(self) -> tracing.Span | None:
+        send_span = self._send_span
+        self._send_span = None
+        return send_span
+
+    async def _delayed_send(self) -> None:
+        await asyncio.sleep(self.delay)
+        self._send_task = None
+        try:
+            with tracing.resume(self._take_span()):
+                await self._send()
+        except Exception as e:
+            logger.exception(
+                "Failed to send journal to {}: {}", self.room_id, e
+            )
+
+    def cancel(self) -> None:
+        """Отменяет отложенную отправку журнала."""
+        if self._send_task is not None:
+            self._send_task.cancel()
+            self._send_task = None
+        _end_span(self._take_span())
+
+    async def flush(self) -> None:
+        """Сразу отправляет отложенные изменения журнала.
+
+        К примеру перед концом игры, чтобы итоги игры не остались ждать
+        отправки в уже удалённом канале.
         """
+        if self._send_task is not None:
+            self._send_task.cancel()
+            self._send_task = None
+        with tracing.resume(self._take_span()):
+            await self._send()
+
+    async def _send(self) -> None:
+        async with self._send_lock:
+            await self._send_locked()
+
+    async def _send_locked(self) -> None:
         if len(self.message_queue) == 0:
             return None
 
-        if self.room_message is None:
-            self.room_message = await self.bot.send_message(
-                chat_id=self.room_id,
-                text="\n".join(self.message_queue),
-                reply_markup=self.markup,
+        text = "\n".join(self.message_queue)
+        markup = self.markup
+        # Telegram не позволяет изменить сообщение на точно такое же
+        if self._sent == (text, markup):
+            return None
+
+        room_message = self.room_message
+        if room_message is None:
+            self.room_message = await self._call(
+                Priority.TURN,
+                lambda: self.bot.send_message(
+                    chat_id=self.room_id, text=text, reply_markup=markup
+                ),
             )
         else:
-            await self.room_message.edit_text(
-                text="\n".join(self.message_queue),
-                reply_markup=self.markup,
+            await self._call(
+                Priority.TURN,
+                lambda: room_message.edit_text(text=text, reply_markup=markup),
             )
+        self._sent = (text, markup)
 
     async def send_card(self, card: MauCard) -> None:
-        """Отправляет карту как стикер."""
-        await self.bot.send_photo(
-            chat_id=self.room_id,
-            photo=f"https://mau.miroq.ru/card/next/{card.pack()}/cover",
+        """Отправляет карту как стикер.
+
+        Если изображение карты уже загружено в Telegram, отправляет его
+        по `file_id`, иначе по ссылке и запоминает полученный `file_id`.
+        """
+        file_id = self.file_ids.get(card)
+        message = await self._call(
+            Priority.CARD,
+            lambda: self.bot.send_photo(
+                chat_id=self.room_id,
+                photo=file_id or self.file_ids.url(card),
+            ),
         )
+        if file_id is None and message.photo:
+            self.file_ids.add(card, message.photo[-1].file_id)
 
     async def clear(self) -> None:
-        """Очищает буфер событий и сбрасывает клавиатуру."""
-        self.markup = None
-        self.lobby_message = None
-        if self.room_message is not None:
-            await self.room_message.delete()
-            self.room_message = None
+        """Очищает буфер событий и сбрасывает клавиатуру.
+
+        Отложенная отправка отменяется, ведь сообщение журнала всё равно
+        будет удалено.
+        """
+        self.cancel()
+        async with self._send_lock:
+            self.markup = None
+            self.lobby_message = None
+            self._sent = None
+            room_message = self.room_message
+            if room_message is not None:
+                self.room_message = None
+                await self._call(Priority.TURN, room_message.delete)
 
     def set_markup(self, markup: InlineKeyboardMarkup | None) -> None:
         """Устанавливает клавиатуру для игровых событий."""
@@ -135,32 +275,166 @@ class MessageChannel:
         self.message_queue.append(text)
 
 
+# События, которые нельзя отбросить при переполнении очереди
+_CRITICAL_EVENTS = frozenset(
+    (
+        GameEvents.SESSION_START,
+        GameEvents.SESSION_END,
+        GameEvents.GAME_START,
+        GameEvents.GAME_END,
+    )
+)
+# События, которые в лобби только обновляют сообщение-лобби
+_LOBBY_EVENTS = frozenset((GameEvents.GAME_JOIN, GameEvents.GAME_LEAVE))
+
+
+def _is_lobby_edit(event: Event) -> bool:
+    return event.event_type in _LOBBY_EVENTS and not event.game.started
+
+
+def _end_span(span: tracing.Span | None) -> None:
+    if span is not None:
+        span.end()
+
+
 class MessageJournal(BaseEventHandler):
-    """Обрабатывает события в рамках Telegram бота."""
+    """Обрабатывает события в рамках Telegram бота.
+
+    У каждой комнаты своя очередь событий и свой обработчик очереди.
+    События одной комнаты обрабатываются строго по порядку, а разные
+    комнаты обрабатываются одновременно.
+    Обработчик комнаты завершается, как только очередь опустела.
 
-    def __init__(self, bot: Bot, router: EventRouter) -> None:
+    Если очередь комнаты переполнена, новые события отбрасываются,
+    кроме начала и конца игры.
+    Подряд идущие изменения лобби объединяются в одно, поскольку
+    сообщение лобби всё равно показывает текущее состояние комнаты.
+
+    Задержка `delay`, планировщик запросов `limiter` и реестр
+    изображений карт `file_ids` передаются во все каналы сообщений.
+    Канал сообщений удаляется вместе с сессией, после события
+    `SESSION_END`.
+    """
+
+    # Сколько событий может ждать обработки в одной комнате
+    max_queue = 64
+
+    def __init__(
+        self,
+        bot: Bot,
+        router: EventRouter,
+        delay: float = 0,
+        limiter: RateLimiter | None = None,
+        file_ids: FileIdRegistry | None = None,
+    ) -> None:
         self.channels: dict[str, MessageChannel] = {}
         self._loop: asyncio.AbstractEventLoop | None = None
         self.bot: Bot = bot
         self.router = router
+        self.delay = delay
+        self.limiter = limiter
+        self.file_ids = file_ids or FileIdRegistry()
+
+        # Вместе с событием хранится отрезок трассы ожидания в очереди
+        self._queues: dict[str, deque[tuple[Event, tracing.Span | None]]] = {}
+        self._workers: dict[str, asyncio.Task[None]] = {}
+        # Сколько событий было объединено и отброшено
+        self.merged = 0
+        self.dropped = 0
 
     def push(self, event: Event) -> None:
-        """Обрабатывает входящие события."""
+        """Добавляет событие в очередь комнаты."""
         if self._loop is None:
             self._loop = asyncio.get_running_loop()
 
         logger.debug(event)
-        self._loop.create_task(self.router.process(event, self))
+        room_id = event.game.room_id
+        queue = self._queues.get(room_id)
+        if queue is None:
+            queue = deque()
+            self._queues[room_id] = queue
+
+        waiting = tracing.start_span("journal.queue")
+        if queue and _is_lobby_edit(event) and _is_lobby_edit(queue[-1][0]):
+            _end_span(queue[-1][1])
+            queue[-1] = (event, waiting)
+            self.merged += 1
+        elif (
+            len(queue) >= self.max_queue
+            and event.event_type not in _CRITICAL_EVENTS
+        ):
+            logger.warning("Room {} queue is full, drop {}", room_id, event)
+            _end_span(waiting)
+            self.dropped += 1
+        else:
+            queue.append((event, waiting))
+
+        if room_id not in self._workers:
+            # Обработчик переживает событие, создавшее его, потому
+            # не наследует его трассу, а продолжает трассу каждого события
+            self._workers[room_id] = self._loop.create_task(
+                self._worker(room_id, queue), context=Context()
+            )
+
+    async def _worker(
+        self, room_id: str, queue: deque[tuple[Event, tracing.Span | None]]
+    ) -> None:
+        while queue:
+            event, waiting = queue.popleft()
+            try:
+                with tracing.resume(waiting):
+                    await self.router.process(event, self)
+            except Exception as e:
+                logger.exception("Failed to process {}: {}", event, e)
+            if event.event_type == GameEvents.SESSION_END:
+                self.remove_channel(room_id)
+
+        # Пока очередь пуста, новых событий добавиться не может
+        del self._queues[room_id]
+        del self._workers[room_id]
+
+    async def flush(self) -> None:
+        """Сразу отправляет отложенные изменения журналов всех чатов.
+
+        Вызывается при остановке бота.
+        """
+        channels = list(self.channels.items())
+        results = await asyncio.gather(
+            *(channel.flush() for _, channel in channels),
+            return_exceptions=True,
+        )
+        for (room_id, _), res in zip(channels, results, strict=True):
+            if isinstance(res, Exception):
+                logger.error("Failed to flush journal to {}: {}", room_id, res)
+
+    @property
+    def pending(self) -> int:
+        """Сколько комнат сейчас обрабатывают свои события."""
+        return len(self._workers)
+
+    def queue_depths(self) -> dict[str, int]:
+        """Возвращает сколько событий ждут обработки в каждой комнате."""
+        return {room_id: len(queue) for room_id, queue in self._queues.items()}
 
     def get_channel(self, room_id: str) -> MessageChannel:
         """Получает/создаёт канал сообщений для чата."""
         channel = self.channels.get(room_id)
         if channel is None:
-            channel = MessageChannel(room_id, self.bot)
+            channel = MessageChannel(
+                room_id, self.bot, self.delay, self.limiter, self.file_ids
+            )
             self.channels[room_id] = channel
 
         return channel
 
     def remove_channel(self, room_id: str) -> None:
-        """Устанавливает канал сообщений для чата."""
-        self.channels.pop(room_id)
+        """Удаляет канал сообщений для чата.
+
+        Отложенная отправка журнала отменяется, чтобы в чат
+        завершённой игры не пришло новое сообщение журнала.
+        """
+        channel = self.channels.pop(room_id, None)
+        if channel is not None:
+            channel.cancel()
+        if self.limiter is not None:
+            self.limiter.remove_chat(room_id)
@@ -27,8 +27,10 @@ async def start_session(event: Event, chan: MessageChannel) -> None:
 
 @er.event(GameEvents.SESSION_END)
 async def end_session(event: Event, chan: MessageChannel) -> None:
-    """Очищает устаревший канал сообщений."""
-    sm._event_handler.remove_channel(event.game.room_id)
+    """Сессия завершена.
+
+    Канал сообщений удаляет сам журнал после этого события.
+    """
 
 
 # Обработка событий игры
@@ -59,7 +61,8 @@ async def end_game(event: Event, chan: MessageChannel) -> None:
     """Завершает игру в чате."""
     chan.add(messages.end_game_players(event.game.pm))
     chan.set_markup(markups.NEW_GAME_MARKUP)
-    await chan.send()
+    # Итоги отправляются сразу, канал удаляется вместе с сессией
+    await chan.flush()
     sm.remove(event.game.room_id)
 
 
@@ -233,6 +236,15 @@ async def player_bluffing(event: Event, chan: MessageChannel) -> None:
         chan.add(f"🎩 {player.mention} <b>Честный игрок</b>!")
 
 
+@er.event(GameEvents.PLAYER_SKIP)
+async def player_skip(event: Event, chan: MessageChannel) -> None:
+    """Оповещает что ход игрока пропущен за бездействие."""
+    chan.add(
+        f"☕ {event.player.mention} потерял свои ку.. карты.\n"
+        "Мы их нашли и дали игроку ещё немного карт от нас.\n"
+    )
+
+
 @er.event(GameEvents.PLAYER_INTERVENED)
 async def on_intervention(event: Event, chan: MessageChannel) -> None:
     """Когда игрок вмешивается в игру и перехватывает ход."""
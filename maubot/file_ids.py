@@ -0,0 +1,106 @@
+"""Реестр загруженных в Telegram изображений карт.
+
+Изображения карт генерирует сервер карт по ссылке вида
+`https://mau.miroq.ru/card/{asset}/{pack}/{filter}`.
+Вместо внешнего сервера можно использовать локальный генератор карт
+из `maubot.card_server`, указав ссылку на свой сервер.
+Если отправить карту по ссылке, Telegram каждый раз будет заново
+скачивать изображение с сервера карт.
+
+После первой отправки Telegram выдаёт `file_id` изображения.
+Реестр запоминает `file_id` для каждой карты, чтобы в следующий раз
+отправлять уже загруженное изображение.
+Реестр заполняется сам по мере отправки карт, либо сразу для всех
+карт через `py -m maubot.warmup`.
+"""
+
+import json
+from pathlib import Path
+
+from loguru import logger
+
+from mau.deck.card import MauCard
+
+# Адрес сервера карт
+CARD_URL = "https://mau.miroq.ru/card/{asset}/{pack}/{filter}"
+
+# Набор изображений карт по умолчанию
+DEFAULT_ASSET = "next"
+
+# Ключ изображения: набор изображений, строка карты и фильтр
+FileKey = tuple[str, str, str]
+
+
+class FileIdRegistry:
+    """Хранит `file_id` изображений карт.
+
+    Args:
+        path: Файл для сохранения реестра между перезапусками.
+            Если не указан, реестр хранится только в памяти.
+        asset: Какой набор изображений карт используется.
+        card_url: Шаблон ссылки на изображение карты.
+
+    """
+
+    __slots__ = ("_changed", "_file_ids", "asset", "card_url", "path")
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        asset: str = DEFAULT_ASSET,
+        card_url: str = CARD_URL,
+    ) -> None:
+        self.path = path
+        self.asset = asset
+        self.card_url = card_url
+        self._file_ids: dict[FileKey, str] = {}
+        self._changed = False
+
+    def url(self, card: MauCard, card_filter: str = "cover") -> str:
+        """Ссылка на изображение карты на сервере карт."""
+        return self.card_url.format(
+            asset=self.asset, pack=card.pack(), filter=card_filter
+        )
+
+    def get(self, card: MauCard, card_filter: str = "cover") -> str | None:
+        """Возвращает `file_id` изображения карты, если он известен."""
+        return self._file_ids.get((self.asset, card.pack(), card_filter))
+
+    def add(
+        self, card: MauCard, file_id: str, card_filter: str = "cover"
+    ) -> None:
+        """Запоминает `file_id` изображения карты."""
+        key = (self.asset, card.pack(), card_filter)
+        if self._file_ids.get(key) != file_id:
+            self._file_ids[key] = file_id
+            self._changed = True
+
+    def photo(self, card: MauCard, card_filter: str = "cover") -> str:
+        """Возвращает `file_id` изображения или ссылку на него."""
+        return self.get(card, card_filter) or self.url(card, card_filter)
+
+    def load(self) -> None:
+        """Загружает реестр из файла."""
+        if self.path is None or not self.path.exists():
+            return
+
+        with self.path.open() as f:
+            for asset, pack, card_filter, file_id in json.load(f):
+                self._file_ids[(asset, pack, card_filter)] = file_id
+        logger.info("Loaded {} card file ids", len(self._file_ids))
+
+    def save(self) -> None:
+        """Сохраняет реестр в файл, если в нём что-то изменилось."""
+        if self.path is None or not self._changed:
+            return
+
+        with self.path.open("w") as f:
+            json.dump(
+                [[*key, value] for key, value in self._file_ids.items()], f
+            )
+        self._changed = False
+        logger.info("Saved {} card file ids", len(self._file_ids))
+
+    def __len__(self) -> int:
+        """Сколько изображений уже загружено."""
+        return len(self._file_ids)
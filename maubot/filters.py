@@ -6,12 +6,16 @@
 Поскольку могут использоваться не в одном роутере.
 """
 
-from aiogram.enums import ChatMemberStatus
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+
+from aiogram.enums import ChatMemberStatus, ChatType
 from aiogram.filters import Filter
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, Chat, Message
 
-from maubot.config import sm
-from maubot.context import get_context
+from maubot import tracing
+from maubot.context import GameContext
 
 NO_JOIN_MESSAGE = (
     "🍓 Для начала надо <b>зайти в комнату</b>.\n"
@@ -33,6 +37,88 @@ async def _send(event: CallbackQuery | Message, message: str) -> None:
         await event.answer(message)
 
 
+class AdminCache:
+    """Кеш администраторов чатов.
+
+    Права администратора проверяются при каждом действии создателя
+    комнаты, к примеру при каждом переключении правил.
+    Чтобы не спрашивать каждый раз Telegram, список администраторов
+    чата запоминается на `ttl` секунд.
+    Список сбрасывается раньше, если в чате изменились права участника.
+
+    Хранит администраторов не более чем для `size` чатов.
+    """
+
+    __slots__ = ("_chats", "_loading", "hits", "misses", "size", "ttl")
+
+    def __init__(self, ttl: float = 300, size: int = 4096) -> None:
+        self.ttl = ttl
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._chats: OrderedDict[int, tuple[float, frozenset[int]]] = (
+            OrderedDict()
+        )
+        self._loading: dict[int, asyncio.Future[frozenset[int]]] = {}
+
+    async def _load(self, chat: Chat) -> frozenset[int]:
+        loading = self._loading.get(chat.id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        future: asyncio.Future[frozenset[int]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._loading[chat.id] = future
+        try:
+            members = await chat.get_administrators()
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку уже получит вызвавший, ожидающим она не нужна
+            future.exception()
+            raise
+        else:
+            admins = frozenset(
+                member.user.id
+                for member in members
+                if member.status
+                in (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR)
+            )
+            future.set_result(admins)
+        finally:
+            del self._loading[chat.id]
+
+        self._chats.pop(chat.id, None)
+        self._chats[chat.id] = (monotonic() + self.ttl, admins)
+        if len(self._chats) > self.size:
+            self._chats.popitem(last=False)
+        return admins
+
+    async def is_admin(self, chat: Chat, user_id: int) -> bool:
+        """Проверяет является ли пользователь администратором чата."""
+        if chat.type == ChatType.PRIVATE:
+            return False
+
+        cached = self._chats.get(chat.id)
+        if cached is not None and cached[0] > monotonic():
+            self.hits += 1
+            return user_id in cached[1]
+
+        self.misses += 1
+        return user_id in await self._load(chat)
+
+    def invalidate(self, chat_id: int) -> None:
+        """Забывает администраторов чата."""
+        self._chats.pop(chat_id, None)
+
+    def __len__(self) -> int:
+        """Для скольких чатов известны администраторы."""
+        return len(self._chats)
+
+
+ADMINS = AdminCache()
+
+
 async def _is_admin(event: CallbackQuery | Message) -> bool:
     if isinstance(event, Message):
         chat = event.chat
@@ -43,11 +129,7 @@ async def _is_admin(event: CallbackQuery | Message) -> bool:
 
     if event.from_user is None:
         return False
-    member = await chat.get_member(event.from_user.id)
-    return member.status in (
-        ChatMemberStatus.CREATOR,
-        ChatMemberStatus.ADMINISTRATOR,
-    )
+    return await ADMINS.is_admin(chat, event.from_user.id)
 
 
 # Фильтры
@@ -61,9 +143,12 @@ class ActiveGame(Filter):
     Даёт гарантию что в данном чате имеется игра.
     """
 
-    async def __call__(self, event: CallbackQuery | Message) -> bool:
+    @tracing.traced("filter.ActiveGame")
+    async def __call__(
+        self, event: CallbackQuery | Message, context: GameContext
+    ) -> bool:
         """Проверяет что игра существует."""
-        if get_context(sm, event).game is None:
+        if context.game is None:
             await _send(event, NO_ROOM_MESSAGE)
             return False
 
@@ -78,10 +163,11 @@ class ActivePlayer(Filter):
     автоматические проверяется.
     """
 
-    async def __call__(self, event: CallbackQuery | Message) -> bool:
+    @tracing.traced("filter.ActivePlayer")
+    async def __call__(
+        self, event: CallbackQuery | Message, context: GameContext
+    ) -> bool:
         """Проверяет что данный игрок есть в игре."""
-        context = get_context(sm, event)
-
         if context.game is None:
             await _send(event, NO_ROOM_MESSAGE)
             return False
@@ -101,14 +187,19 @@ class GameOwner(Filter):
     Это полезно в некоторых административных командах.
     """
 
-    async def __call__(self, event: CallbackQuery | Message) -> bool:
+    @tracing.traced("filter.GameOwner")
+    async def __call__(
+        self, event: CallbackQuery | Message, context: GameContext
+    ) -> bool:
         """Проверяет что данный игрок создатель комнаты."""
-        context = get_context(sm, event)
-
         if context.game is None:
             await _send(event, NO_ROOM_MESSAGE)
             return False
 
+        # Создателю комнаты не нужно спрашивать Telegram о правах
+        if context.player is not None and context.player == context.game.owner:
+            return True
+
         if await _is_admin(event):
             return True
 
@@ -138,14 +229,21 @@ class NowPlaying(Filter):
     игровых режимов.
     """
 
-    async def __call__(self, event: CallbackQuery) -> bool:
+    @tracing.traced("filter.NowPlaying")
+    async def __call__(
+        self, event: CallbackQuery, context: GameContext
+    ) -> bool:
         """Проверяет что текущий игрок имеет право сделать ход."""
-        ctx = get_context(sm, event)
-        if ctx.player is None or not ctx.player.can_play or ctx.game is None:
+        if (
+            context.player is None
+            or not context.player.can_play
+            or context.game is None
+        ):
             await event.answer("🍉 А вы точно сейчас играете?")
             return False
 
-        if ctx.player != ctx.game.player:
-            ctx.game.pm.set_cp(ctx.player)
+        if context.player != context.game.player:
+            context.game.pm.set_cp(context.player)
+            context.game.touch()
 
         return True
@@ -91,6 +91,7 @@ async def set_deck_preset(
     """Выбирает один из заготовленных шаблонов колоды для игры."""
     await query.answer()
     game.deck_generator = DeckGenerator.from_preset(callback_data.name)
+    game.touch()
     preset = CARD_PRESETS.get(
         game.deck_generator.preset_name,
         DeckPreset("Свой", "Время творить чудеса", []),
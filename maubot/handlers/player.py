@@ -5,6 +5,7 @@
 
 from aiogram import F, Router
 from aiogram.filters import Command
+from aiogram.methods import AnswerCallbackQuery
 from aiogram.types import CallbackQuery, Message
 
 from mau.deck.behavior import TakeBehavior, WildTakeBehavior
@@ -45,7 +46,9 @@ async def leave_player(message: Message, player: Player) -> None:
 
 
 @router.callback_query(F.data == "join", filters.ActiveGame())
-async def join_callback(query: CallbackQuery, game: MauGame) -> None:
+async def join_callback(
+    query: CallbackQuery, game: MauGame
+) -> AnswerCallbackQuery:
     """Добавляет игрока в текущую комнату."""
     if not isinstance(query.message, Message):
         raise ValueError("Query message should be Message instance")
@@ -58,9 +61,8 @@ async def join_callback(query: CallbackQuery, game: MauGame) -> None:
         ),
     )
     if player is None:
-        await query.answer("🔒 К сожалению данная комната <b>закрыта</b>.")
-    else:
-        await query.answer("👋 Добро пожаловать в комнату")
+        return query.answer("🔒 К сожалению данная комната <b>закрыта</b>.")
+    return query.answer("👋 Добро пожаловать в комнату")
 
 
 @router.callback_query(F.data == "shot_take", filters.NowPlaying())
@@ -106,6 +108,7 @@ async def shotgun_call(
             game.pm.set_cp(player)
         game.next_turn()
         game.state = GameState.SHOTGUN
+        game.touch()
     else:
         if game.player == player:
             channel.add("😴 На этом игра для вас <b>закончилась</b>.\n")
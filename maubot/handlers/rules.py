@@ -3,6 +3,7 @@
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
+from aiogram.methods import AnswerCallbackQuery
 from aiogram.types import (
     CallbackQuery,
     InlineKeyboardButton,
@@ -46,13 +47,15 @@ async def send_rules_list(message: Message, game: MauGame) -> None:
 
 
 @router.callback_query(F.data == "room_rules", GameOwner())
-async def get_rules_call(query: CallbackQuery, game: MauGame) -> None:
+async def get_rules_call(
+    query: CallbackQuery, game: MauGame
+) -> AnswerCallbackQuery:
     """Отображает настройки для текущей комнаты."""
     if isinstance(query.message, Message):
         await query.message.answer(
             ROOM_SETTINGS, reply_markup=rules_markup(game.rules)
         )
-    await query.answer()
+    return query.answer()
 
 
 class RulesCallback(CallbackData, prefix="rule"):
@@ -64,11 +67,12 @@ class RulesCallback(CallbackData, prefix="rule"):
 @router.callback_query(RulesCallback.filter(), GameOwner())
 async def edit_room_rules_call(
     query: CallbackQuery, callback_data: RulesCallback, game: MauGame
-) -> None:
+) -> AnswerCallbackQuery:
     """Изменяет настройки для текущей комнаты."""
     game.rules.toggle(callback_data.index)
+    game.touch()
     if isinstance(query.message, Message):
         await query.message.edit_text(
             ROOM_SETTINGS, reply_markup=rules_markup(game.rules)
         )
-    await query.answer()
+    return query.answer()
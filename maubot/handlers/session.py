@@ -5,13 +5,10 @@
 в роутер `player`.
 """
 
-import random
-
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message
 
-from mau.enums import CardColor
 from mau.game.game import MauGame
 from mau.game.player import BaseUser
 from mau.session import SessionManager
@@ -102,6 +99,7 @@ async def stop_gama(message: Message, game: MauGame) -> None:
 async def open_gama(message: Message, game: MauGame) -> None:
     """Открывает игровую комнату для всех участников чата."""
     game.open = True
+    game.touch()
     await message.answer(
         "🍰 Комната <b>открыта</b>!\n любой участник может зайти (/join)."
     )
@@ -111,6 +109,7 @@ async def open_gama(message: Message, game: MauGame) -> None:
 async def close_gama(message: Message, game: MauGame) -> None:
     """Закрывает игровую комнату для всех участников чата."""
     game.open = False
+    game.touch()
     await message.answer(
         "🔒 Комната <b>закрыта</b>.\nНикто не помешает вам доиграть."
     )
@@ -141,23 +140,9 @@ async def kick_player(
 
 
 @router.message(Command("skip"), filters.GameOwner())
-async def skip_player(
-    message: Message, game: MauGame, channel: MessageChannel
-) -> None:
+async def skip_player(message: Message, game: MauGame) -> None:
     """пропускает участника за долгое бездействие."""
-    game.take_counter += 1
-    game.player.take_cards()
-    skip_player = game.player
-    channel.add(
-        f"☕ {skip_player.mention} потерял свои ку.. карты.\n"
-        "Мы их нашли и дали игроку ещё немного карт от нас.\n"
-    )
-    # Иногда может быть такое, что пропускается чёрная карта
-    # Тогда ей нужно дать какой-нибудь цвет
-    if game.deck.top.color == game.deck.wild_color:
-        game.choose_color(CardColor(random.randint(0, 3)))
-    else:
-        game.next_turn()
+    game.skip_turn()
 
 
 @router.callback_query(F.data == "new_game")
@@ -6,6 +6,7 @@
 import re
 
 from aiogram import F, Router
+from aiogram.methods import AnswerCallbackQuery, AnswerInlineQuery
 from aiogram.types import CallbackQuery, ChosenInlineResult, InlineQuery
 
 from mau.deck.card import MauCard
@@ -25,20 +26,19 @@ router = Router(name="Turn")
 @router.inline_query()
 async def inline_handler(
     query: InlineQuery, game: MauGame | None, player: Player | None
-) -> None:
+) -> AnswerInlineQuery:
     """Обработчик inline запросов. Предоставляет клавиатуру со всеми картами."""
     if game is None or player is None or query.from_user is None:
-        await query.answer(
+        return query.answer(
             [markups.NO_GAME_QUERY],
             cache_time=0,
             is_personal=True,
         )
-    else:
-        await query.answer(
-            list(markups.hand_query(player)),
-            cache_time=0,
-            is_personal=True,
-        )
+    return query.answer(
+        markups.HAND_CACHE.get(player),
+        cache_time=0,
+        is_personal=True,
+    )
 
 
 @router.chosen_inline_result(NowPlaying())
@@ -75,11 +75,11 @@ async def call_bluff(query: CallbackQuery, player: Player) -> None:
 @router.callback_query(F.data.regexp(r"color:(\d)").as_("color"), NowPlaying())
 async def choose_color_call(
     query: CallbackQuery, game: MauGame, color: re.Match[str]
-) -> None:
+) -> AnswerCallbackQuery:
     """Игрок выбирает цвет по нажатию на кнопку."""
     card_color = CardColor(int(color.groups()[0]))
     game.choose_color(card_color)
-    await query.answer(f"🎨 Вы выбрали {card_color}.")
+    return query.answer(f"🎨 Вы выбрали {card_color}.")
 
 
 @router.callback_query(
@@ -87,13 +87,15 @@ async def choose_color_call(
 )
 async def select_player_call(
     query: CallbackQuery, game: MauGame, player: Player, user_id: re.Match[str]
-) -> None:
+) -> AnswerCallbackQuery:
     """Действие при выборе игрока для обмена картами."""
     other_player = game.pm.get(user_id.groups()[0])
     if game.state == GameState.TWIST_HAND:
         player.twist_hand(other_player)
 
     elif query.message is not None:
-        query.message.answer("🍻 Что-то пошло не так, но мы не знаем что.")
+        await query.message.answer(
+            "🍻 Что-то пошло не так, но мы не знаем что."
+        )
 
-    await query.answer(f"🤝 Вы обменялись с {other_player}.")
+    return query.answer(f"🤝 Вы обменялись с {other_player}.")
@@ -0,0 +1,370 @@
+"""Ограничение скорости исходящих запросов к Telegram.
+
+Telegram ограничивает как общее количество запросов бота, так и
+количество сообщений в одном чате.
+При превышении ограничений Telegram возвращает ошибку с временем,
+через которое можно повторить запрос.
+
+Планировщик запросов общий для всех каналов сообщений.
+Ответы обработчиков в чат проходят через него с помощью
+`LimitedRequests`.
+Он следит за ограничениями через "ведро токенов" для каждого чата и
+общее ведро для всего бота.
+Запросы выполняются в порядке приоритета, а при ошибке `retry_after`
+чат приостанавливается и запрос повторяется автоматически.
+"""
+
+import asyncio
+import heapq
+from collections.abc import Awaitable, Callable
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from time import monotonic
+from typing import Any, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+
+_T = TypeVar("_T")
+
+# Запрос уже выполняется планировщиком
+_limited: ContextVar[bool] = ContextVar("limited", default=False)
+
+
+class Priority(IntEnum):
+    """Приоритет исходящего запроса.
+
+    Чем меньше значение, тем раньше будет выполнен запрос.
+    """
+
+    TURN = 0
+    LOBBY = 1
+    CARD = 2
+
+
+class TokenBucket:
+    """Ведро токенов.
+
+    Каждый запрос забирает один токен.
+    Токены восстанавливаются с постоянной скоростью `rate` в секунду,
+    но их не может быть больше `capacity`.
+    """
+
+    __slots__ = ("capacity", "rate", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Когда в ведре появится хотя бы один токен."""
+        self._refill(now)
+        if self._tokens >= 1:
+            return now
+        return now + (1 - self._tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Забирает один токен из ведра."""
+        self._refill(now)
+        self._tokens -= 1
+
+
+@dataclass(order=True, slots=True)
+class _Call:
+    priority: int
+    seq: int
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future[Any] = field(compare=False)
+    enqueued: float = field(compare=False)
+    # Запрос выполняется в контексте того, кто его отправил
+    context: Context = field(compare=False)
+    retries: int = field(default=0, compare=False)
+
+
+class _Chat:
+    __slots__ = ("bucket", "busy", "calls", "paused_until", "token")
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+        self.calls: list[_Call] = []
+        self.paused_until = 0.0
+        # Выполняется ли сейчас запрос в этот чат
+        self.busy = False
+        # Номер последней записи чата в очереди планировщика
+        self.token = 0
+
+    def ready_at(self, now: float) -> float:
+        return max(self.paused_until, self.bucket.ready_at(now))
+
+
+@dataclass(slots=True)
+class LimiterStats:
+    """Статистика планировщика запросов."""
+
+    calls: int = 0
+    retries: int = 0
+    failed: int = 0
+    waited: float = 0
+    max_wait: float = 0
+
+    @property
+    def average_wait(self) -> float:
+        """Сколько в среднем запрос ждал своей очереди в секундах."""
+        return self.waited / self.calls if self.calls else 0
+
+
+class RateLimiter:
+    """Планировщик исходящих запросов к Telegram.
+
+    В каждый чат одновременно выполняется только один запрос, потому
+    запросы чата приходят в Telegram в порядке приоритета, а после
+    `retry_after` в чат не уходят уже начатые запросы.
+
+    Чаты, которым есть что отправить, лежат в двух кучах: по времени,
+    когда чат сможет отправить запрос, и по первому запросу среди уже
+    готовых чатов.
+    Так выбор следующего запроса не перебирает все ожидающие чаты.
+
+    По умолчанию в чат отправляется не больше 20 сообщений в минуту,
+    как Telegram и ограничивает групповые чаты.
+
+    Args:
+        global_rate: Сколько запросов в секунду может отправлять бот.
+        chat_rate: Сколько запросов в секунду можно отправить в чат.
+        chat_burst: Сколько запросов в чат можно отправить подряд.
+        max_retries: Сколько раз повторять запрос после `retry_after`.
+
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        max_retries: int = 3,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.stats = LimiterStats()
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[str, _Chat] = {}
+        # Когда чат будет готов, номер записи и сам чат
+        self._waiting: list[tuple[float, int, str]] = []
+        # Первый запрос готового чата, номер записи и сам чат
+        self._ready: list[tuple[_Call, int, str]] = []
+        self._tokens = count(1)
+        self._seq = count()
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task[None] | None = None
+        self._running: set[asyncio.Task[None]] = set()
+
+    @property
+    def pending(self) -> int:
+        """Сколько запросов ждут отправки."""
+        return sum(len(chat.calls) for chat in self._chats.values())
+
+    async def call(
+        self,
+        chat_id: str,
+        priority: Priority,
+        factory: Callable[[], Awaitable[_T]],
+    ) -> _T:
+        """Выполняет запрос к Telegram с учётом ограничений.
+
+        Запрос создаётся через `factory`, поскольку при повторе нужно
+        создать его заново.
+        Возвращает результат запроса.
+        """
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._dispatch())
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _Chat(TokenBucket(self.chat_rate, self.chat_burst))
+            self._chats[chat_id] = chat
+
+        future: asyncio.Future[_T] = asyncio.get_running_loop().create_future()
+        item = _Call(
+            priority,
+            next(self._seq),
+            factory,
+            future,
+            monotonic(),
+            copy_context(),
+        )
+        heapq.heappush(chat.calls, item)
+        # Новый запрос мог стать первым в чате
+        if chat.calls[0] is item:
+            self._schedule(chat_id, chat)
+        return await future
+
+    def _schedule(self, chat_id: str, chat: _Chat) -> None:
+        """Ставит чат в очередь планировщика.
+
+        Прошлые записи чата в очередях становятся недействительными.
+        """
+        if chat.busy or not chat.calls:
+            return
+        chat.token = next(self._tokens)
+        heapq.heappush(
+            self._waiting, (chat.ready_at(monotonic()), chat.token, chat_id)
+        )
+        self._wakeup.set()
+
+    def _valid(self, chat_id: str, token: int) -> _Chat | None:
+        chat = self._chats.get(chat_id)
+        if chat is None or chat.token != token or chat.busy or not chat.calls:
+            return None
+        return chat
+
+    def _next_chat(self, now: float) -> tuple[str | None, float]:
+        """Выбирает готовый чат с самым важным запросом.
+
+        Если готовых чатов нет, возвращает когда появится следующий.
+        """
+        while self._waiting and self._waiting[0][0] <= now:
+            _, token, chat_id = heapq.heappop(self._waiting)
+            chat = self._valid(chat_id, token)
+            if chat is not None:
+                heapq.heappush(self._ready, (chat.calls[0], token, chat_id))
+
+        while self._ready:
+            _, token, chat_id = self._ready[0]
+            if self._valid(chat_id, token) is not None:
+                return chat_id, now
+            heapq.heappop(self._ready)
+
+        return None, self._waiting[0][0] if self._waiting else float("inf")
+
+    async def _dispatch(self) -> None:
+        while True:
+            now = monotonic()
+            chat_id, next_time = self._next_chat(now)
+            if chat_id is None:
+                self._wakeup.clear()
+                timeout = None if next_time == float("inf") else next_time - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except TimeoutError:
+                    pass
+                continue
+
+            ready = self._global.ready_at(now)
+            if ready > now:
+                await asyncio.sleep(ready - now)
+                continue
+
+            heapq.heappop(self._ready)
+            chat = self._chats[chat_id]
+            item = heapq.heappop(chat.calls)
+            chat.busy = True
+            self._global.take(now)
+            chat.bucket.take(now)
+
+            wait = now - item.enqueued
+            self.stats.calls += 1
+            self.stats.waited += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+
+            task = asyncio.create_task(
+                self._run(chat_id, chat, item), context=item.context
+            )
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, chat_id: str, chat: _Chat, item: _Call) -> None:
+        try:
+            await self._call(chat_id, chat, item)
+        finally:
+            chat.busy = False
+            self._schedule(chat_id, chat)
+
+    async def _call(self, chat_id: str, chat: _Chat, item: _Call) -> None:
+        if item.future.done():
+            return
+
+        _limited.set(True)
+        try:
+            result = await item.factory()
+        except TelegramRetryAfter as e:
+            logger.warning("Chat {} retry after {}s", chat_id, e.retry_after)
+            chat.paused_until = monotonic() + e.retry_after
+            if item.retries >= self.max_retries or item.future.done():
+                self.stats.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+                return
+            self.stats.retries += 1
+            item.retries += 1
+            self._chats.setdefault(chat_id, chat)
+            heapq.heappush(chat.calls, item)
+        except Exception as e:
+            self.stats.failed += 1
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def remove_chat(self, chat_id: str) -> None:
+        """Забывает о чате, если для него нет ожидающих запросов."""
+        chat = self._chats.get(chat_id)
+        if chat is not None and not chat.calls and not chat.busy:
+            del self._chats[chat_id]
+
+    async def close(self) -> None:
+        """Останавливает планировщик."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
+class LimitedRequests(BaseRequestMiddleware):
+    """Пропускает через планировщик все сообщения в чаты.
+
+    Обработчики отвечают в чат напрямую, к примеру `message.answer()`.
+    Такие сообщения тоже расходуют ограничение чата, потому идут через
+    тот же планировщик, что и запросы журнала.
+
+    Подключается к сессии бота: `bot.session.middleware(...)`.
+    """
+
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """Выполняет запрос через планировщик."""
+        chat_id = getattr(method, "chat_id", None)
+        if (
+            chat_id is None
+            or _limited.get()
+            or not method.__api_method__.startswith(("send", "edit"))
+        ):
+            return await make_request(bot, method)
+        return await self.limiter.call(
+            str(chat_id), Priority.TURN, lambda: make_request(bot, method)
+        )
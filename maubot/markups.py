@@ -3,21 +3,26 @@
 В тои числе клавиатура для Inline Query.
 """
 
+from collections import OrderedDict
 from collections.abc import Iterator
 
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
+    InlineQueryResultUnion,
 )
 from aiogram.types import InlineQueryResultArticle as InlineArticle
+from aiogram.types import InlineQueryResultCachedPhoto as InlineCachedPhoto
 from aiogram.types import InlineQueryResultPhoto as InlinePhoto
 from aiogram.types import InputTextMessageContent as InputText
 
 from mau.deck.behavior import WildTakeBehavior
+from mau.deck.card import MauCard
 from mau.enums import GameState
 from mau.game.game import MauGame
 from mau.game.player import Player
 from mau.game.player_manager import PlayerManager
+from maubot.config import file_ids
 from maubot.messages import game_status
 
 # Когда кто-то пробует использовать inline режим бота без активной комнаты
@@ -50,31 +55,106 @@ NEW_GAME_MARKUP = InlineKeyboardMarkup(
 )
 
 
-def hand_query(player: Player) -> Iterator[InlinePhoto]:
-    """Возвращает основную клавиатуру с игровыми действиями."""
-    player_cards = player.cover_cards()
-    for i, card in enumerate(player_cards.cover):
-        yield InlinePhoto(
-            id=f"{card.pack()}:{i}",
-            photo_url=f"https://mau.miroq.ru/card/next/{card.pack()}/cover",
-            thumbnail_url=f"https://mau.miroq.ru/card/next/{card.pack()}/cover",
-            photo_width=64,
-            photo_height=128,
+def _card_result(
+    card: MauCard,
+    card_filter: str,
+    result_id: str,
+    message: InputText | None = None,
+) -> InlineQueryResultUnion:
+    file_id = file_ids.get(card, card_filter)
+    if file_id is not None:
+        return InlineCachedPhoto(
+            id=result_id,
+            photo_file_id=file_id,
+            input_message_content=message,
             description=card.pack(),
         )
 
-    for i, card in enumerate(player_cards.uncover):
-        yield InlinePhoto(
-            id=f"status:{i}",
-            photo_url=f"https://mau.miroq.ru/card/next/{card.pack()}/uncover",
-            thumbnail_url=f"https://mau.miroq.ru/card/next/{card.pack()}/uncover",
-            input_message_content=InputText(
-                message_text=game_status(player.game),
-            ),
-            photo_width=64,
-            photo_height=128,
-            description=card.pack(),
-        )
+    url = file_ids.url(card, card_filter)
+    return InlinePhoto(
+        id=result_id,
+        photo_url=url,
+        thumbnail_url=url,
+        input_message_content=message,
+        photo_width=64,
+        photo_height=128,
+        description=card.pack(),
+    )
+
+
+def _cover_results(cover: list[MauCard]) -> list[InlineQueryResultUnion]:
+    return [
+        _card_result(card, "cover", f"{card.pack()}:{i}")
+        for i, card in enumerate(cover)
+    ]
+
+
+def _status_results(
+    game: MauGame, uncover: list[MauCard]
+) -> list[InlineQueryResultUnion]:
+    if not uncover:
+        return []
+
+    # Одно и то же состояние игры для всех неактивных карт
+    status = InputText(message_text=game_status(game))
+    return [
+        _card_result(card, "uncover", f"status:{i}", status)
+        for i, card in enumerate(uncover)
+    ]
+
+
+def hand_query(player: Player) -> Iterator[InlineQueryResultUnion]:
+    """Возвращает основную клавиатуру с игровыми действиями.
+
+    Если изображение карты уже загружено в Telegram, используется
+    сохранённое изображение, иначе ссылка на сервер карт.
+    """
+    cover, uncover = player.hand.split(player.playable_mask())
+    yield from _cover_results(cover)
+    yield from _status_results(player.game, uncover)
+
+
+class HandQueryCache:
+    """Кеш результатов inline запроса для каждого игрока.
+
+    Игроки открывают клавиатуру с картами по многу раз за ход, а
+    состояние игры при этом не меняется.
+    Результаты хранятся вместе с версией игры и собираются заново
+    только если с тех пор игра изменилась.
+    Состояние игры для неактивных карт содержит время, потому оно
+    не кешируется и собирается при каждом запросе.
+
+    Хранит результаты не более чем для `size` игроков.
+    """
+
+    __slots__ = ("_results", "size")
+
+    def __init__(self, size: int = 1024) -> None:
+        self.size = size
+        self._results: OrderedDict[
+            str, tuple[int, list[InlineQueryResultUnion], list[MauCard]]
+        ] = OrderedDict()
+
+    def get(self, player: Player) -> list[InlineQueryResultUnion]:
+        """Возвращает клавиатуру с картами игрока."""
+        cached = self._results.get(player.user_id)
+        if cached is not None and cached[0] == player.game.version:
+            _, cover, uncover = cached
+        else:
+            cards, uncover = player.hand.split(player.playable_mask())
+            cover = _cover_results(cards)
+            self._results.pop(player.user_id, None)
+            self._results[player.user_id] = (
+                player.game.version,
+                cover,
+                uncover,
+            )
+            if len(self._results) > self.size:
+                self._results.popitem(last=False)
+        return cover + _status_results(player.game, uncover)
+
+
+HAND_CACHE = HandQueryCache()
 
 
 # Inline клавиатура
@@ -117,8 +117,8 @@ def game_status(game: MauGame) -> str:
         f"⏳ <b>Игра идёт</b> {game_delta}\n\n"
         f"{players_list(game.pm, game.reverse, game.rules.shotgun.status)}\n"
         f"{game_rules_list(game)}"
-        f"📦 <b>карт</b> в колоде: {len(game.deck.cards)} доступно / "
-        f"{len(game.deck.used_cards)} использовано.\n{shotgun_stats}"
+        f"📦 <b>карт</b> в колоде: {game.deck.count} доступно / "
+        f"{game.deck.used_count} использовано.\n{shotgun_stats}"
     )
 
 
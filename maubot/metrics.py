@@ -0,0 +1,444 @@
+"""Метрики бота в формате Prometheus.
+
+Небольшая собственная реализация, чтобы не тянуть отдельную
+зависимость ради нескольких счётчиков.
+
+- `Counter`: Счётчик, который только растёт.
+- `Histogram`: Распределение значений по заранее заданным корзинам,
+  к примеру времени обработки событий.
+- `Collected`: Значения, которые собираются только при запросе метрик.
+  Подходит для уже существующих счётчиков и размеров очередей.
+
+Бот обновляет метрики из одного потока цикла событий, потому запись
+значения обходится без блокировок.
+Корзины гистограммы выделяются один раз для каждого набора меток.
+
+Метрики отдаются по адресу `/metrics` вместе с webhook, или отдельным
+сервером `MetricsServer` при long polling.
+"""
+
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator
+from time import perf_counter
+from typing import Any, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from loguru import logger
+
+# Тип ответа с метриками
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Корзины по умолчанию для времени в секундах
+TIME_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+_M = TypeVar("_M", bound="Metric")
+
+Labels = tuple[str, ...]
+Sample = tuple[str, Labels, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """Базовая метрика.
+
+    Args:
+        name: Имя метрики.
+        documentation: Описание метрики.
+        labels: Имена меток метрики.
+
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Labels = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterator[Sample]:
+        """Возвращает значения метрики для каждого набора меток.
+
+        Значение состоит из имени, значений меток и самого значения.
+        """
+        return iter(())
+
+    def label_names(self, sample_name: str) -> Labels:
+        """Имена меток для значения метрики."""
+        return self.labels
+
+    def render(self) -> str:
+        """Записывает метрику в текстовом формате Prometheus."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, values, value in self.samples():
+            labels = _format_labels(self.label_names(name), values)
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Счётчик, который только растёт."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Labels = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        """Увеличивает счётчик для заданных значений меток."""
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def get(self, *labels: str) -> float:
+        """Текущее значение счётчика."""
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[Sample]:
+        """Возвращает значения счётчика."""
+        for labels, value in self._values.items():
+            yield (self.name, labels, value)
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам.
+
+    Каждое значение попадает в первую корзину, граница которой не
+    меньше значения.
+    Накопительные значения корзин считаются только при запросе метрик.
+
+    Args:
+        name: Имя метрики.
+        documentation: Описание метрики.
+        labels: Имена меток метрики.
+        buckets: Верхние границы корзин по возрастанию.
+
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = TIME_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.bounds = (*sorted(buckets), float("inf"))
+        self._series: dict[Labels, _Series] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Записывает новое значение."""
+        series = self._series.get(labels)
+        if series is None:
+            series = _Series(len(self.bounds))
+            self._series[labels] = series
+        series.buckets[bisect_left(self.bounds, value)] += 1
+        series.count += 1
+        series.sum += value
+
+    def count(self, *labels: str) -> int:
+        """Сколько значений было записано."""
+        series = self._series.get(labels)
+        return 0 if series is None else series.count
+
+    def label_names(self, sample_name: str) -> Labels:
+        """У корзин есть дополнительная метка с границей."""
+        if sample_name.endswith("_bucket"):
+            return (*self.labels, "le")
+        return self.labels
+
+    def samples(self) -> Iterator[Sample]:
+        """Возвращает корзины, сумму и количество значений."""
+        for labels, series in self._series.items():
+            total = 0
+            for bound, hits in zip(self.bounds, series.buckets, strict=True):
+                total += hits
+                yield (
+                    f"{self.name}_bucket",
+                    (*labels, _format_value(bound)),
+                    total,
+                )
+            yield (f"{self.name}_sum", labels, series.sum)
+            yield (f"{self.name}_count", labels, series.count)
+
+
+class Collected(Metric):
+    """Метрика, значения которой собираются при запросе метрик.
+
+    Функция возвращает либо одно значение, либо словарь значений по
+    значениям меток.
+
+    Args:
+        name: Имя метрики.
+        documentation: Описание метрики.
+        collect: Функция для получения значений.
+        labels: Имена меток метрики.
+        kind: Тип метрики, `gauge` или `counter`.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], float | dict[Labels, float]],
+        labels: Labels = (),
+        kind: str = "gauge",
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> Iterator[Sample]:
+        """Собирает текущие значения."""
+        values = self.collect()
+        if isinstance(values, dict):
+            for labels, value in values.items():
+                yield (self.name, labels, value)
+        else:
+            yield (self.name, (), values)
+
+
+class Registry:
+    """Набор метрик, которые отдаются вместе."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: _M) -> _M:
+        """Добавляет метрику и возвращает её.
+
+        Метрика с тем же именем заменяет предыдущую.
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], float | dict[Labels, float]],
+        labels: Labels = (),
+    ) -> Collected:
+        """Добавляет значение, собираемое при запросе метрик."""
+        return self.register(Collected(name, documentation, collect, labels))
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], float | dict[Labels, float]],
+        labels: Labels = (),
+    ) -> Collected:
+        """Добавляет уже существующий счётчик."""
+        return self.register(
+            Collected(name, documentation, collect, labels, "counter")
+        )
+
+    def render(self) -> str:
+        """Записывает все метрики в текстовом формате Prometheus.
+
+        Ошибка в одной метрике не мешает отдать остальные.
+        """
+        parts = []
+        for metric in self._metrics.values():
+            try:
+                parts.append(metric.render())
+            except Exception as e:
+                logger.exception("Failed to collect {}: {}", metric.name, e)
+        return "\n".join(parts) + "\n"
+
+
+REGISTRY = Registry()
+
+UPDATE_SECONDS = REGISTRY.register(
+    Histogram(
+        "mau_update_seconds",
+        "Update processing time by update type.",
+        ("type",),
+    )
+)
+UPDATE_ERRORS = REGISTRY.register(
+    Counter(
+        "mau_update_errors_total",
+        "Updates failed with an exception by update type.",
+        ("type",),
+    )
+)
+EVENT_SECONDS = REGISTRY.register(
+    Histogram(
+        "mau_game_event_seconds",
+        "Game event processing time by event type.",
+        ("event",),
+    )
+)
+API_SECONDS = REGISTRY.register(
+    Histogram(
+        "mau_api_request_seconds",
+        "Telegram Bot API request time by method.",
+        ("method",),
+    )
+)
+API_ERRORS = REGISTRY.register(
+    Counter(
+        "mau_api_errors_total",
+        "Failed Telegram Bot API requests by method.",
+        ("method",),
+    )
+)
+
+
+async def update_middleware(
+    handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+    event: TelegramObject,
+    data: dict[str, Any],
+) -> Any:  # noqa: ANN401
+    """Замеряет время обработки каждого события.
+
+    Используется как outer middleware для событий диспетчера.
+    Ошибки обработчиков перехватывает сам диспетчер, потому они
+    считаются в его обработчике ошибок через `UPDATE_ERRORS`.
+    """
+    update_type = event.event_type if isinstance(event, Update) else "unknown"
+    start = perf_counter()
+    try:
+        return await handler(event, data)
+    finally:
+        UPDATE_SECONDS.observe(perf_counter() - start, update_type)
+
+
+class RequestMetrics(BaseRequestMiddleware):
+    """Замеряет время запросов к Telegram Bot API.
+
+    Подключается к сессии бота: `bot.session.middleware(...)`.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """Выполняет запрос и записывает его время."""
+        api_method = method.__api_method__
+        start = perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            API_ERRORS.inc(api_method)
+            raise
+        finally:
+            API_SECONDS.observe(perf_counter() - start, api_method)
+
+
+def metrics_router(registry: Registry = REGISTRY) -> APIRouter:
+    """Ручка `/metrics` для приложения webhook."""
+    router = APIRouter()
+
+    @router.get("/metrics", response_class=PlainTextResponse)
+    async def get_metrics() -> PlainTextResponse:
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+    return router
+
+
+class MetricsServer:
+    """Отдельный сервер метрик для работы через long polling.
+
+    Args:
+        registry: Какие метрики отдавать.
+        host: На каком адресе запустить сервер.
+        port: На каком порту запустить сервер.
+
+    """
+
+    def __init__(
+        self, registry: Registry = REGISTRY, host: str = "", port: int = 9100
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    async def start(self) -> None:
+        """Запускает сервер метрик."""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host or None, self.port).start()
+        logger.info("Serve metrics on port {}", self.port)
+
+    async def stop(self) -> None:
+        """Останавливает сервер метрик."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,59 @@
+"""Последовательная обработка событий одной комнаты.
+
+События обрабатываются одновременно, как при long polling, так и
+через webhook.
+Если обработчик ждёт отправки сообщения, в это время может начаться
+обработка другого события той же комнаты и состояние игры разойдётся.
+
+Потому события одной комнаты обрабатываются строго по очереди,
+а события разных комнат всё так же одновременно.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class RoomLocks:
+    """Блокировки для каждой комнаты.
+
+    Блокировка существует только пока её кто-то держит или ждёт,
+    потому количество блокировок не растёт вместе с числом комнат.
+    """
+
+    __slots__ = ("_locks", "_users", "acquired", "contended")
+
+    def __init__(self) -> None:
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: dict[str, int] = {}
+        self.acquired = 0
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, room_id: str) -> AsyncIterator[None]:
+        """Удерживает блокировку комнаты.
+
+        Если блокировка уже занята, учитывает это в `contended`.
+        """
+        lock = self._locks.get(room_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[room_id] = lock
+            self._users[room_id] = 0
+
+        self._users[room_id] += 1
+        self.acquired += 1
+        if lock.locked():
+            self.contended += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[room_id] -= 1
+            if self._users[room_id] == 0:
+                del self._users[room_id]
+                del self._locks[room_id]
+
+    def __len__(self) -> int:
+        """Сколько комнат сейчас заблокировано."""
+        return len(self._locks)
@@ -0,0 +1,477 @@
+"""Трассировка обработки событий.
+
+Показывает на что ушло время от получения события до запросов к
+Telegram: middleware, фильтры, обработчик, игровые события журнала
+и сами запросы к Bot API.
+
+Каждое событие Telegram открывает трассу с корневым отрезком.
+Вложенные отрезки находят родителя через `contextvars`, потому
+отрезки продолжаются и в задачах, созданных во время обработки.
+Если событие отложено в очередь, отрезок ожидания передаётся вместе с
+ним и обработка продолжается через `resume()`.
+Трасса завершается, когда закрыты все её отрезки.
+
+В трассу попадает только доля событий `sample_rate`.
+Если трасса не ведётся, отрезок обходится одной проверкой контекста.
+
+Готовые трассы записываются в файл по строке на трассу.
+Сводку по стадиям можно получить командой:
+
+```sh
+py -m maubot.tracing traces.log
+```
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from contextvars import ContextVar
+from functools import wraps
+from itertools import count
+from pathlib import Path
+from random import random
+from time import perf_counter_ns, time
+from types import TracebackType
+from typing import IO, Any, ParamSpec, Protocol, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+
+
+class TraceSink(Protocol):
+    """Куда записываются завершённые трассы."""
+
+    def write(self, trace: "Trace") -> None:
+        """Записывает трассу."""
+
+
+class Span:
+    """Отрезок трассы.
+
+    Время хранится в наносекундах по `perf_counter_ns()`.
+    """
+
+    __slots__ = ("duration", "index", "name", "parent", "start", "trace")
+
+    def __init__(self, trace: "Trace", name: str, parent: int) -> None:
+        self.trace = trace
+        self.name = name
+        # Номер родительского отрезка в трассе, -1 для корня
+        self.parent = parent
+        self.index = len(trace.spans)
+        self.start = perf_counter_ns()
+        self.duration = -1
+        trace.spans.append(self)
+        trace.open += 1
+
+    def end(self) -> None:
+        """Закрывает отрезок, повторный вызов ничего не делает."""
+        if self.duration >= 0:
+            return
+        self.duration = perf_counter_ns() - self.start
+        self.trace.release()
+
+
+class Trace:
+    """Трасса одного события.
+
+    Args:
+        tracer: Куда отправить трассу после завершения.
+        trace_id: Номер трассы.
+
+    """
+
+    __slots__ = ("id", "open", "spans", "start", "started_at", "tracer")
+
+    def __init__(self, tracer: "Tracer", trace_id: int) -> None:
+        self.tracer = tracer
+        self.id = trace_id
+        self.spans: list[Span] = []
+        self.open = 0
+        self.start = perf_counter_ns()
+        self.started_at = time()
+
+    def release(self) -> None:
+        """Отпускает трассу, последний отпустивший завершает её."""
+        self.open -= 1
+        if self.open == 0:
+            self.tracer.finish(self)
+
+    def dump(self) -> dict[str, Any]:
+        """Компактное представление трассы.
+
+        Каждый отрезок записывается как имя, номер родителя, начало и
+        длительность в микросекундах.
+        """
+        return {
+            "id": self.id,
+            "t": round(self.started_at, 3),
+            "s": [
+                [
+                    span.name,
+                    span.parent,
+                    (span.start - self.start) // 1000,
+                    span.duration // 1000,
+                ]
+                for span in self.spans
+            ],
+        }
+
+
+# Текущий отрезок трассы
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+def current() -> Span | None:
+    """Текущий отрезок трассы, если трасса ведётся."""
+    return _current.get()
+
+
+def start_span(name: str) -> Span | None:
+    """Открывает отрезок внутри текущего, не делая его текущим.
+
+    Подходит для отрезков, которые закрываются в другом месте, к
+    примеру ожидание в очереди.
+    Закрыть отрезок нужно через `end()` или `resume()`.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.index)
+
+
+class _Scope:
+    __slots__ = ("name", "span", "token")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.span = start_span(self.name)
+        if self.span is not None:
+            self.token = _current.set(self.span)
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.span is not None:
+            _current.reset(self.token)
+            self.span.end()
+
+
+def span(name: str) -> _Scope:
+    """Отрезок трассы на время блока `with`."""
+    return _Scope(name)
+
+
+class _Resume:
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span | None) -> None:
+        self.span = span
+
+    def __enter__(self) -> None:
+        if self.span is None:
+            return
+        # Трасса не должна завершиться между ожиданием и обработкой
+        self.span.trace.open += 1
+        self.span.end()
+        self.token = _current.set(self.span)
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.span is not None:
+            _current.reset(self.token)
+            self.span.trace.release()
+
+
+def resume(span: Span | None) -> _Resume:
+    """Закрывает отрезок ожидания и продолжает трассу внутри блока.
+
+    Новые отрезки блока станут вложенными в отрезок ожидания.
+    """
+    return _Resume(span)
+
+
+def traced(
+    name: str,
+) -> Callable[[Callable[_P, Awaitable[_R]]], Callable[_P, Awaitable[_R]]]:
+    """Оборачивает асинхронную функцию в отрезок трассы."""
+
+    def decorator(
+        func: Callable[_P, Awaitable[_R]],
+    ) -> Callable[_P, Awaitable[_R]]:
+        @wraps(func)
+        async def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Tracer:
+    """Открывает трассы и отправляет завершённые трассы в хранилище.
+
+    Args:
+        sink: Куда записывать трассы. Без него трассы не ведутся.
+        sample_rate: Какая доля событий попадает в трассы, от 0 до 1.
+
+    """
+
+    def __init__(
+        self, sink: TraceSink | None = None, sample_rate: float = 0.01
+    ) -> None:
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.traces = 0
+        self._ids = count(1)
+
+    def trace(self, name: str) -> "_Root":
+        """Открывает новую трассу на время блока `with`.
+
+        Трасса открывается только для доли событий `sample_rate`.
+        """
+        return _Root(self, name)
+
+    def finish(self, trace: Trace) -> None:
+        """Записывает завершённую трассу."""
+        if self.sink is None:
+            return
+        self.traces += 1
+        try:
+            self.sink.write(trace)
+        except Exception as e:
+            logger.exception("Failed to write trace: {}", e)
+
+
+class _Root:
+    __slots__ = ("name", "span", "token", "tracer")
+
+    def __init__(self, tracer: Tracer, name: str) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.span: Span | None = None
+
+    def __enter__(self) -> None:
+        if (
+            self.tracer.sink is None
+            or _current.get() is not None
+            or random() >= self.tracer.sample_rate
+        ):
+            return
+        trace = Trace(self.tracer, next(self.tracer._ids))
+        self.span = Span(trace, self.name, -1)
+        self.token = _current.set(self.span)
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.span is not None:
+            _current.reset(self.token)
+            self.span.end()
+
+
+TRACER = Tracer()
+
+
+# Хранение трасс
+# ==============
+
+
+class TraceFile:
+    """Файл трасс с ротацией.
+
+    Каждая трасса записывается одной JSON строкой.
+    Когда файл превышает `max_bytes`, он переименовывается в
+    `traces.log.1`, предыдущие копии сдвигаются, а самые старые
+    удаляются.
+
+    Args:
+        path: Путь к файлу трасс.
+        max_bytes: Размер файла, после которого начинается новый.
+        backups: Сколько старых файлов хранить.
+
+    """
+
+    def __init__(
+        self, path: Path, max_bytes: int = 16 << 20, backups: int = 3
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file: IO[str] | None = None
+        self._size = 0
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+            self._size = self._file.tell()
+        return self._file
+
+    def _rotate(self) -> None:
+        self.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def write(self, trace: Trace) -> None:
+        """Дописывает трассу в файл."""
+        line = json.dumps(trace.dump(), separators=(",", ":")) + "\n"
+        self._open().write(line)
+        self._size += len(line)
+        if self._size >= self.max_bytes:
+            self._rotate()
+
+    def close(self) -> None:
+        """Закрывает файл трасс."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Middleware
+# ==========
+
+
+async def trace_update(
+    handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+    event: TelegramObject,
+    data: dict[str, Any],
+) -> Any:  # noqa: ANN401
+    """Открывает трассу для события Telegram.
+
+    Используется как outer middleware для событий диспетчера, потому
+    работает как с webhook, так и с long polling.
+    """
+    name = event.event_type if isinstance(event, Update) else "unknown"
+    with TRACER.trace(f"update.{name}"):
+        return await handler(event, data)
+
+
+async def trace_handler(
+    handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+    event: TelegramObject,
+    data: dict[str, Any],
+) -> Any:  # noqa: ANN401
+    """Отрезок для обработчика события.
+
+    Используется как inner middleware, фильтры к этому моменту уже
+    проверены.
+    """
+    if _current.get() is None:
+        return await handler(event, data)
+    handler_object = data.get("handler")
+    name = getattr(getattr(handler_object, "callback", None), "__name__", "")
+    with span(f"handler.{name or 'unknown'}"):
+        return await handler(event, data)
+
+
+class RequestTracing(BaseRequestMiddleware):
+    """Отрезки для запросов к Telegram Bot API.
+
+    Подключается к сессии бота: `bot.session.middleware(...)`.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """Выполняет запрос внутри отрезка трассы."""
+        if _current.get() is None:
+            return await make_request(bot, method)
+        with span(f"api.{method.__api_method__}"):
+            return await make_request(bot, method)
+
+
+# Сводка по стадиям
+# =================
+
+
+def read_traces(paths: Sequence[Path]) -> Iterator[dict[str, Any]]:
+    """Читает трассы из файлов, повреждённые строки пропускаются."""
+    for path in paths:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def summary(
+    traces: Iterator[dict[str, Any]], group: bool = False
+) -> dict[str, list[float]]:
+    """Собирает длительности отрезков по стадиям в миллисекундах.
+
+    Если `group`, стадии объединяются по первой части имени, к
+    примеру все `api.*` вместе.
+    """
+    stages: dict[str, list[float]] = defaultdict(list)
+    for trace in traces:
+        for name, _, _, duration in trace["s"]:
+            stage = name.split(".", 1)[0] if group else name
+            stages[stage].append(duration / 1000)
+    return stages
+
+
+def _percentiles(values: list[float]) -> tuple[float, float, float]:
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Выводит p50, p95 и p99 длительности каждой стадии."""
+    parser = argparse.ArgumentParser(prog="maubot.tracing")
+    parser.add_argument("paths", nargs="+", type=Path, help="trace files")
+    parser.add_argument(
+        "--group", action="store_true", help="merge stages by prefix"
+    )
+    args = parser.parse_args(argv)
+
+    stages = summary(read_traces(args.paths), args.group)
+    print(f"{'stage':<32} {'count':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, values in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        p50, p95, p99 = _percentiles(values)
+        print(
+            f"{stage:<32} {len(values):>8} "
+            f"{p50:>7.2f}ms {p95:>7.2f}ms {p99:>7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
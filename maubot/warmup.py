@@ -0,0 +1,96 @@
+"""Заранее загружает изображения всех карт в Telegram.
+
+Отправляет в указанный чат изображения всех карт из всех шаблонов
+колод, запоминает их `file_id` в реестре и сразу удаляет сообщения.
+После этого боту больше не нужно отправлять карты по ссылке.
+
+Уже загруженные изображения пропускаются, потому команду можно
+безопасно запускать повторно, к примеру после добавления новых карт.
+
+```sh
+py -m maubot.warmup CHAT_ID
+```
+"""
+
+import argparse
+import asyncio
+import sys
+from collections.abc import Iterator, Sequence
+from functools import partial
+
+from aiogram import Bot
+from loguru import logger
+
+from mau.deck.card import MauCard
+from mau.deck.presets import CARD_PRESETS
+from maubot.config import config, file_ids
+from maubot.limiter import Priority, RateLimiter
+
+# Какие изображения карт используются ботом
+CARD_FILTERS = ("cover", "uncover")
+
+# Как часто сохранять реестр во время загрузки
+_SAVE_EVERY = 50
+
+
+def preset_cards() -> Iterator[MauCard]:
+    """Все различные карты из всех шаблонов колод."""
+    seen: set[MauCard] = set()
+    for preset in CARD_PRESETS.values():
+        for group in preset.groups:
+            for card in group.cards():
+                if card not in seen:
+                    seen.add(card)
+                    yield card
+
+
+async def warmup(bot: Bot, chat_id: str) -> int:
+    """Загружает изображения всех карт в Telegram.
+
+    Возвращает количество загруженных изображений.
+    """
+    limiter = RateLimiter(config.rate_global, config.rate_chat, 20)
+    uploaded = 0
+    for card in preset_cards():
+        for card_filter in CARD_FILTERS:
+            if file_ids.get(card, card_filter) is not None:
+                continue
+
+            url = file_ids.url(card, card_filter)
+            message = await limiter.call(
+                chat_id,
+                Priority.CARD,
+                partial(bot.send_photo, chat_id=chat_id, photo=url),
+            )
+            if message.photo:
+                file_ids.add(card, message.photo[-1].file_id, card_filter)
+                uploaded += 1
+            await limiter.call(chat_id, Priority.CARD, message.delete)
+
+            if uploaded % _SAVE_EVERY == 0:
+                file_ids.save()
+
+    await limiter.close()
+    file_ids.save()
+    return uploaded
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Загружает изображения карт в указанный чат."""
+    parser = argparse.ArgumentParser(prog="maubot.warmup")
+    parser.add_argument("chat_id", help="chat to upload card images")
+    args = parser.parse_args(argv)
+
+    file_ids.load()
+    logger.info("Already known {} card images", len(file_ids))
+
+    async def run() -> int:
+        async with Bot(config.telegram_token.get_secret_value()) as bot:
+            return await warmup(bot, args.chat_id)
+
+    uploaded = asyncio.run(run())
+    logger.success("Uploaded {} card images", uploaded)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
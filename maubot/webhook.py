@@ -0,0 +1,184 @@
+"""Обработка событий webhook.
+
+## Ответ методом
+
+Если обработчик события возвращает метод Telegram, к примеру
+`return query.answer(...)`, то этот метод можно не отправлять
+отдельным запросом, а вернуть в ответе на сам webhook.
+Telegram выполнит его сам, а бот сэкономит целый исходящий запрос.
+
+Однако результат такого метода боту неизвестен.
+Потому так стоит возвращать только методы, результат которых не
+важен: ответы на inline и callback запросы, простые сообщения.
+Методы с загрузкой файлов всегда отправляются отдельным запросом.
+
+## Очередь событий
+
+Пока обработчик работает, Telegram ждёт ответа на webhook.
+Если обработчик медленный, Telegram повторно присылает то же событие,
+а соединения с сервером копятся.
+
+Очередь событий сразу отвечает Telegram, а сами события обрабатывает
+ограниченное число фоновых обработчиков.
+Если очередь переполнена, поступает согласно `OverflowPolicy`.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from enum import StrEnum
+from time import monotonic
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from loguru import logger
+
+
+def webhook_reply(bot: Bot, method: TelegramMethod[Any]) -> dict | None:
+    """Собирает ответ на webhook из метода Telegram.
+
+    Значения подготавливаются так же, как при обычной отправке метода,
+    в том числе подставляются настройки бота по умолчанию.
+    Если метод загружает файлы, вернёт None.
+    """
+    files: dict[str, Any] = {}
+    reply: dict[str, Any] = {"method": method.__api_method__}
+    for key, value in method.model_dump(warnings=False).items():
+        prepared = bot.session.prepare_value(
+            value, bot=bot, files=files, _dumps_json=False
+        )
+        if prepared is not None:
+            reply[key] = prepared
+
+    if files:
+        return None
+    return reply
+
+
+class OverflowPolicy(StrEnum):
+    """Что делать с новым событием, когда очередь переполнена.
+
+    - `DROP_NEW`: Отбросить новое событие.
+    - `DROP_OLD`: Отбросить самое старое событие из очереди.
+    - `REJECT`: Отказать Telegram, чтобы он прислал событие позже.
+    """
+
+    DROP_NEW = "drop_new"
+    DROP_OLD = "drop_old"
+    REJECT = "reject"
+
+
+@dataclass(slots=True)
+class QueueStats:
+    """Статистика очереди событий."""
+
+    received: int = 0
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    rejected: int = 0
+    max_depth: int = 0
+    waited: float = 0
+    max_wait: float = 0
+
+    @property
+    def average_wait(self) -> float:
+        """Сколько в среднем событие ждало обработки в секундах."""
+        return self.waited / self.processed if self.processed else 0
+
+
+class UpdateQueue:
+    """Очередь событий webhook с фоновыми обработчиками.
+
+    Args:
+        dp: Диспетчер, который обрабатывает события.
+        bot: Бот, от имени которого обрабатываются события.
+        workers: Сколько событий обрабатывается одновременно.
+        max_size: Сколько событий может ждать в очереди.
+        overflow: Что делать при переполнении очереди.
+
+    """
+
+    # Сколько секунд ждать обработки оставшихся событий при остановке
+    drain_timeout: float = 10
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        workers: int = 8,
+        max_size: int = 1024,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLD,
+    ) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self.overflow = overflow
+        self.stats = QueueStats()
+
+        self._queue: asyncio.Queue[tuple[float, dict[str, Any]]] = (
+            asyncio.Queue(max_size)
+        )
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def depth(self) -> int:
+        """Сколько событий ждут обработки."""
+        return self._queue.qsize()
+
+    def put(self, update: dict[str, Any]) -> bool:
+        """Добавляет событие в очередь.
+
+        Возвращает False, если Telegram нужно отказать.
+        """
+        self.stats.received += 1
+        if self._queue.full():
+            if self.overflow == OverflowPolicy.REJECT:
+                self.stats.rejected += 1
+                return False
+            self.stats.dropped += 1
+            if self.overflow == OverflowPolicy.DROP_NEW:
+                logger.warning("Update queue is full, drop new update")
+                return True
+            self._queue.get_nowait()
+            self._queue.task_done()
+            logger.warning("Update queue is full, drop old update")
+
+        self._queue.put_nowait((monotonic(), update))
+        self.stats.max_depth = max(self.stats.max_depth, self._queue.qsize())
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            enqueued, update = await self._queue.get()
+            wait = monotonic() - enqueued
+            self.stats.waited += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+            try:
+                result = await self.dp.feed_raw_update(self.bot, update)
+                if isinstance(result, TelegramMethod):
+                    await self.dp.silent_call_request(self.bot, result)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.exception(e)
+            finally:
+                self.stats.processed += 1
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """Запускает фоновые обработчики событий."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+
+    async def close(self) -> None:
+        """Дожидается обработки событий и останавливает обработчики."""
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning("Drop {} unprocessed updates", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
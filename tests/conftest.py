@@ -0,0 +1,9 @@
+"""Общие настройки тестов.
+
+Модули бота читают настройки ещё при импорте, потому для тестов
+подставляются настройки из замеров.
+"""
+
+from benchmarks.fake_api import use_bot_env
+
+use_bot_env()
@@ -0,0 +1,46 @@
+"""Таблица карт и заранее посчитанные маски."""
+
+from mau.deck.behavior import TakeBehavior, WildTakeBehavior
+from mau.deck.card import CARDS, CardColor
+from mau.deck.presets import DeckGenerator
+
+
+def test_card_lookup() -> None:
+    """Карту можно найти по ID, описанию и упакованной строке."""
+    for i, card in enumerate(CARDS):
+        assert card.id == i
+        assert CARDS[card.id] is card
+        assert CARDS.get(card.color, card.value, card.behavior.name) is card
+        assert CARDS.unpack(card.pack()) is card
+        assert CARDS.unpack(f"{card.pack()}:3") is card
+    assert CARDS.unpack("nope") is None
+
+
+def test_deck_uses_shared_cards() -> None:
+    """Колода состоит из карт общей таблицы, а не из своих копий."""
+    deck = DeckGenerator.from_preset("classic").deck
+    for card in deck.cards:
+        assert CARDS[card.id] is card
+
+
+def test_cover_mask_matches_can_cover() -> None:
+    """Маска покрытия совпадает с проверкой каждой пары карт."""
+    for card in CARDS:
+        mask = CARDS.cover_mask(card)
+        for other in CARDS:
+            assert bool(mask >> other.id & 1) == card.can_cover(other), (
+                card,
+                other,
+            )
+
+
+def test_color_and_take_masks() -> None:
+    """Маски цвета и карт взятия содержат ровно подходящие карты."""
+    for color in CardColor:
+        mask = CARDS.color_mask(color)
+        for card in CARDS:
+            assert bool(mask >> card.id & 1) == (card.color == color)
+
+    for card in CARDS:
+        is_take = isinstance(card.behavior, TakeBehavior | WildTakeBehavior)
+        assert bool(CARDS.take_mask >> card.id & 1) == is_take
@@ -0,0 +1,98 @@
+"""Игровой контекст в обработчиках событий."""
+
+import asyncio
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from aiogram.types import Chat, Message, User
+
+from mau.game.player import BaseUser
+from maubot import bot
+from maubot.context import GameContext
+
+
+class FakeJournal:
+    """Выдаёт имя комнаты вместо канала сообщений."""
+
+    def get_channel(self, room_id: str) -> str:
+        """Возвращает канал сообщений комнаты."""
+        return room_id
+
+
+def _message(room_id: int, user_id: int) -> Message:
+    return Message(
+        message_id=1,
+        date=datetime.now(UTC),
+        chat=Chat(id=room_id, type="group"),
+        from_user=User(id=user_id, is_bot=False, first_name="user"),
+        text="/game",
+    )
+
+
+async def _handle(event: Message) -> dict[str, Any]:
+    async def handler(event: Message, data: dict[str, Any]) -> dict[str, Any]:
+        return data
+
+    data = {"journal": FakeJournal()}
+    return await bot.game_middleware(handler, event, data)  # type: ignore
+
+
+def test_context() -> None:
+    """Контекст передаётся в обработчик вместе с игрой и игроком."""
+    message = _message(-101, 101)
+    game = bot.sm.create("-101", BaseUser("101", "user", "user"))
+    try:
+        data = asyncio.run(_handle(message))
+    finally:
+        bot.sm.remove("-101")
+
+    assert data["context"] == GameContext(game=game, player=game.owner)
+    assert data["game"] is game
+    assert data["player"] is game.owner
+    assert data["channel"] == "-101"
+
+
+def test_reload_after_wait() -> None:
+    """Если игра изменилась за время ожидания, контекст обновляется."""
+    message = _message(-102, 102)
+
+    async def main() -> dict[str, Any]:
+        async with bot.room_locks.hold("-102"):
+            task = asyncio.create_task(_handle(message))
+            await asyncio.sleep(0)
+            assert not task.done()
+            bot.sm.create("-102", BaseUser("102", "user", "user"))
+        return await task
+
+    try:
+        data = asyncio.run(main())
+        game = bot.sm.room("-102")
+    finally:
+        bot.sm.remove("-102")
+
+    assert game is not None
+    assert data["game"] is game
+    assert data["player"] is game.owner
+
+
+def test_resolve_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Если игра не менялась, контекст определяется один раз."""
+    calls = 0
+    get_context = bot.get_context
+
+    def counted(*args: Any) -> GameContext:  # noqa: ANN401
+        nonlocal calls
+        calls += 1
+        return get_context(*args)
+
+    monkeypatch.setattr(bot, "get_context", counted)
+    message = _message(-103, 103)
+    game = bot.sm.create("-103", BaseUser("103", "user", "user"))
+    try:
+        data = asyncio.run(_handle(message))
+    finally:
+        bot.sm.remove("-103")
+
+    assert data["game"] is game
+    assert calls == 1
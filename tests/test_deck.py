@@ -0,0 +1,48 @@
+"""Колода карт и её компактный вариант."""
+
+import random
+from collections import Counter
+
+import pytest
+
+from mau.deck.deck import CompactDeck, Deck
+from mau.deck.presets import CARD_PRESETS, DeckGenerator
+from mau.exceptions import NotEnoughCardsError
+
+
+@pytest.mark.parametrize("preset", list(CARD_PRESETS))
+def test_compact_deck_cards(preset: str) -> None:
+    """Компактная колода состоит из тех же карт, что и обычная."""
+    deck = DeckGenerator.from_preset(preset).deck
+    compact = DeckGenerator.from_preset(preset, compact=True).deck
+    assert isinstance(compact, CompactDeck)
+    assert compact.count == deck.count
+    assert set(compact.colors) == set(deck.colors)
+    assert Counter(compact.take(compact.count)) == Counter(deck.cards)
+
+
+def test_compact_deck_take_put() -> None:
+    """Использованные карты возвращаются в колоду, когда она кончилась."""
+    random.seed(0)
+    deck = DeckGenerator.from_preset("classic", compact=True).deck
+    total = deck.count
+    deck.shuffle()
+    top = deck.top
+    hand = list(deck.take(7))
+    assert deck.count == total - 8  # noqa: PLR2004
+
+    for card in hand:
+        deck.put(card)
+    assert deck.used_count == len(hand)
+    assert len(list(deck.take(deck.count + 1))) == total - 7  # noqa: PLR2004
+    assert deck.used_count == 0
+    assert deck.top is top
+
+
+@pytest.mark.parametrize("deck", [Deck(), CompactDeck()])
+def test_empty_deck(deck: Deck) -> None:
+    """Из пустой колоды нельзя взять карту или открыть верхнюю."""
+    with pytest.raises(NotEnoughCardsError):
+        list(deck.take())
+    with pytest.raises(NotEnoughCardsError):
+        _ = deck.top
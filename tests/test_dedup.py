@@ -0,0 +1,45 @@
+"""Отбрасывание повторных событий."""
+
+import pytest
+
+from maubot import dedup
+
+
+def test_seen_once() -> None:
+    """Событие пропускается только при повторном получении."""
+    recent = dedup.RecentUpdates(size=4)
+    assert not recent.seen(1)
+    assert recent.seen(1)
+    assert not recent.seen(2)
+    assert (recent.hits, recent.misses) == (1, 2)
+    assert len(recent) == 2  # noqa: PLR2004
+
+
+def test_ring_eviction() -> None:
+    """Когда буфер заполнен, забываются самые старые события."""
+    recent = dedup.RecentUpdates(size=4)
+    for update_id in range(10):
+        assert not recent.seen(update_id)
+        assert len(recent) == min(update_id + 1, 4)
+
+    for update_id in range(6, 10):
+        assert recent.seen(update_id)
+    assert not recent.seen(5)
+    assert not recent.seen(6)
+
+
+def test_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    """События забываются спустя ttl секунд."""
+    now = 1000.0
+    monkeypatch.setattr(dedup, "monotonic", lambda: now)
+    recent = dedup.RecentUpdates(size=8, ttl=10)
+    recent.seen(1)
+    now += 5
+    recent.seen(2)
+
+    now += 6
+    assert not recent.seen(1)
+    assert recent.seen(2)
+    now += 5
+    assert not recent.seen(2)
+    assert recent.seen(1)
@@ -0,0 +1,102 @@
+"""Журнал игровых событий на диске."""
+
+import random
+from pathlib import Path
+
+from mau.enums import GameEvents
+from mau.event_log import EventLog, EventLogReader
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler, RandomPolicy, play_turn
+
+
+def _play(log: EventLog, room_id: str, turns: int) -> None:
+    sm = SessionManager(event_handler=log)
+    game = sm.create(room_id, BaseUser(f"{room_id}.0", "Player 0", "@p0"))
+    game.join_player(BaseUser(f"{room_id}.1", "Player 1", "@p1"))
+    game.start()
+    policy = RandomPolicy(random.Random(0))
+    for _ in range(turns):
+        play_turn(game, policy)
+
+
+def _write_log(
+    path: Path, segment_size: int = 64 * 1024
+) -> CounterEventHandler:
+    handler = CounterEventHandler()
+    log = EventLog(handler, path, segment_size)
+    _play(log, "a", 10)
+    _play(log, "b", 5)
+    log.close()
+    return handler
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    """Из журнала читаются все события, переданные обработчику."""
+    handler = _write_log(tmp_path)
+    records = list(EventLogReader(tmp_path))
+
+    assert len(records) == handler.events.total()
+    assert {r.room_id for r in records} == {"a", "b"}
+    assert records[0].event_type == GameEvents.SESSION_START
+    assert records[0].player_id == "a.0"
+    assert [r.time for r in records] == sorted(r.time for r in records)
+
+    starts = [r for r in records if r.event_type == GameEvents.GAME_START]
+    assert len(starts) == 2  # noqa: PLR2004
+    for record in starts:
+        sm = SessionManager(event_handler=CounterEventHandler())
+        game = sm.restore_game(record.room_id, record.state)
+        assert game.started
+    assert all(
+        r.state == b"" for r in records if r.event_type != GameEvents.GAME_START
+    )
+
+
+def test_filters(tmp_path: Path) -> None:
+    """Записи отбираются по комнате и типу события."""
+    _write_log(tmp_path)
+    reader = EventLogReader(tmp_path)
+    records = list(reader)
+
+    room = list(reader.records(room_id="b"))
+    assert room == [r for r in records if r.room_id == "b"]
+    turns = list(reader.records(room_id="a", event_type=GameEvents.GAME_TURN))
+    assert turns
+    assert turns == [
+        r
+        for r in records
+        if r.room_id == "a" and r.event_type == GameEvents.GAME_TURN
+    ]
+
+
+def test_segments(tmp_path: Path) -> None:
+    """Журнал делится на сегменты, каждый запуск начинает новый."""
+    _write_log(tmp_path, segment_size=256)
+    first = len(EventLogReader(tmp_path).segments())
+    assert first > 1
+
+    _write_log(tmp_path, segment_size=256)
+    reader = EventLogReader(tmp_path)
+    assert len(reader.segments()) > first
+    assert len(list(reader.records(event_type=GameEvents.GAME_START))) == 4  # noqa: PLR2004
+
+
+def test_truncated_tail(tmp_path: Path) -> None:
+    """Чтение останавливается на недописанной записи в конце."""
+    _write_log(tmp_path)
+    segment = EventLogReader(tmp_path).segments()[-1]
+    records = list(EventLogReader(segment))
+    data = segment.read_bytes()
+
+    segment.write_bytes(data[:-3])
+    assert list(EventLogReader(segment)) == records[:-1]
+
+    # Повреждённая запись отбрасывается вместе со всеми после неё
+    broken = bytearray(data)
+    broken[-3] ^= 0xFF
+    segment.write_bytes(broken)
+    assert list(EventLogReader(segment)) == records[:-1]
+
+    segment.write_bytes(data[:5])
+    assert list(EventLogReader(segment)) == []
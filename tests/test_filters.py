@@ -0,0 +1,126 @@
+"""Кеш администраторов чатов."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import cast
+
+import pytest
+from aiogram.enums import ChatMemberStatus, ChatType
+from aiogram.types import Chat
+
+from maubot import filters
+
+
+class FakeChat:
+    """Чат, который считает запросы администраторов."""
+
+    def __init__(self, chat_id: int, admins: list[int]) -> None:
+        self.id = chat_id
+        self.type = ChatType.GROUP
+        self.admins = admins
+        self.requests = 0
+        self.error: Exception | None = None
+
+    async def get_administrators(self) -> list[SimpleNamespace]:
+        """Возвращает администраторов чата."""
+        self.requests += 1
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return [
+            SimpleNamespace(
+                user=SimpleNamespace(id=user_id),
+                status=ChatMemberStatus.ADMINISTRATOR,
+            )
+            for user_id in self.admins
+        ] + [
+            SimpleNamespace(
+                user=SimpleNamespace(id=0), status=ChatMemberStatus.MEMBER
+            )
+        ]
+
+
+def _is_admin(cache: filters.AdminCache, chat: FakeChat, user_id: int) -> bool:
+    return asyncio.run(cache.is_admin(cast("Chat", chat), user_id))
+
+
+def test_cache_admins(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Администраторы запоминаются на ttl секунд."""
+    now = 1000.0
+    monkeypatch.setattr(filters, "monotonic", lambda: now)
+    cache = filters.AdminCache(ttl=10)
+    chat = FakeChat(1, [1, 2])
+
+    assert _is_admin(cache, chat, 1)
+    assert _is_admin(cache, chat, 2)
+    assert not _is_admin(cache, chat, 0)
+    assert chat.requests == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    now += 11
+    chat.admins = [2]
+    assert not _is_admin(cache, chat, 1)
+    assert chat.requests == 2  # noqa: PLR2004
+
+
+def test_invalidate() -> None:
+    """После сброса администраторы запрашиваются заново."""
+    cache = filters.AdminCache()
+    chat = FakeChat(1, [1])
+    assert _is_admin(cache, chat, 1)
+
+    chat.admins = []
+    cache.invalidate(1)
+    assert not _is_admin(cache, chat, 1)
+    assert chat.requests == 2  # noqa: PLR2004
+
+
+def test_private_chat() -> None:
+    """В личных чатах нет администраторов."""
+    cache = filters.AdminCache()
+    chat = FakeChat(1, [1])
+    chat.type = ChatType.PRIVATE
+    assert not _is_admin(cache, chat, 1)
+    assert chat.requests == 0
+
+
+def test_single_request() -> None:
+    """Одновременные проверки дожидаются одного запроса."""
+    cache = filters.AdminCache()
+    chat = FakeChat(1, [1])
+
+    async def main() -> list[bool]:
+        return list(
+            await asyncio.gather(
+                *(cache.is_admin(cast("Chat", chat), i) for i in range(3))
+            )
+        )
+
+    assert asyncio.run(main()) == [False, True, False]
+    assert chat.requests == 1
+
+
+def test_request_error() -> None:
+    """Ошибка запроса не запоминается."""
+    cache = filters.AdminCache()
+    chat = FakeChat(1, [1])
+    chat.error = RuntimeError("Telegram is down")
+    with pytest.raises(RuntimeError):
+        _is_admin(cache, chat, 1)
+    assert len(cache) == 0
+
+    chat.error = None
+    assert _is_admin(cache, chat, 1)
+
+
+def test_cache_size() -> None:
+    """Хранятся администраторы только последних чатов."""
+    cache = filters.AdminCache(size=2)
+    chats = [FakeChat(chat_id, [1]) for chat_id in range(3)]
+    for chat in chats:
+        assert _is_admin(cache, chat, 1)
+    assert len(cache) == 2  # noqa: PLR2004
+
+    assert _is_admin(cache, chats[2], 1)
+    assert _is_admin(cache, chats[0], 1)
+    assert [chat.requests for chat in chats] == [2, 1, 1]
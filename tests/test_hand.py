@@ -0,0 +1,83 @@
+"""Рука игрока и её битовая маска."""
+
+import random
+
+import pytest
+
+from mau.deck.card import CARDS, MauCard
+from mau.deck.hand import Hand
+
+
+def _mask(cards: list[MauCard]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def _check(hand: Hand, cards: list[MauCard]) -> None:
+    assert len(hand) == len(cards)
+    assert hand.mask == _mask(cards)
+    assert hand.cost == sum(card.cost for card in cards)
+    assert sorted(hand, key=lambda c: c.id) == sorted(cards, key=lambda c: c.id)
+    costs = [card.cost for card in hand]
+    assert costs == sorted(costs, reverse=True)
+
+
+def test_append_remove() -> None:
+    """Маска, стоимость и порядок совпадают с обычным списком карт."""
+    rng = random.Random(0)
+    hand = Hand()
+    cards: list[MauCard] = []
+    for _ in range(500):
+        if cards and rng.random() < 0.4:  # noqa: PLR2004
+            card = rng.choice(cards)
+            cards.remove(card)
+            hand.remove(card)
+        else:
+            card = CARDS[rng.randrange(len(CARDS))]
+            cards.append(card)
+            hand.append(card)
+        _check(hand, cards)
+
+
+def test_duplicate_cards() -> None:
+    """Бит карты снимается только вместе с последней такой картой."""
+    card = CARDS[0]
+    hand = Hand([card, card])
+    assert hand.count(card) == 2  # noqa: PLR2004
+    hand.remove(card)
+    assert card in hand
+    assert hand.count(card) == 1
+    hand.remove(card)
+    assert card not in hand
+    assert hand.mask == 0
+    with pytest.raises(ValueError, match="x not in list"):
+        hand.remove(card)
+
+
+def test_select_split() -> None:
+    """Выбор по маске сохраняет порядок руки."""
+    rng = random.Random(1)
+    hand = Hand(rng.choices(list(CARDS), k=20))
+    mask = rng.getrandbits(len(CARDS))
+
+    selected, other = hand.split(mask)
+    assert selected == [c for c in hand if mask >> c.id & 1]
+    assert other == [c for c in hand if not mask >> c.id & 1]
+    assert hand.select(mask) == selected
+    assert hand.has_any(mask) == bool(selected)
+    assert not hand.has_any(0)
+
+
+def test_copy_clear_from_sorted() -> None:
+    """Копия не зависит от оригинала, а пустая рука обнуляет маску."""
+    rng = random.Random(2)
+    hand = Hand(rng.choices(list(CARDS), k=10))
+    copy = hand.copy()
+    restored = Hand.from_sorted(hand)
+
+    hand.clear()
+    _check(hand, [])
+    _check(copy, list(restored))
+    assert list(copy) == list(restored)
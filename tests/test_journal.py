@@ -0,0 +1,193 @@
+"""Журнал игровых событий в чате."""
+
+import asyncio
+from typing import Any
+
+from mau.enums import GameEvents
+from mau.events import Event
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler
+from maubot.events.journal import EventRouter, MessageChannel, MessageJournal
+
+
+class FakeMessage:
+    """Отправленное сообщение."""
+
+    def __init__(self, bot: "FakeBot", text: str) -> None:
+        self.bot = bot
+        self.text = text
+
+    async def edit_text(self, text: str, **kwargs: Any) -> "FakeMessage":  # noqa: ANN401
+        """Изменяет текст сообщения."""
+        self.bot.calls.append(("edit", text))
+        self.text = text
+        return self
+
+    async def delete(self) -> bool:
+        """Удаляет сообщение."""
+        self.bot.calls.append(("delete", self.text))
+        return True
+
+
+class FakeBot:
+    """Запоминает запросы вместо отправки в Telegram."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, str]] = []
+
+    async def send_message(self, text: str, **kwargs: Any) -> FakeMessage:  # noqa: ANN401
+        """Отправляет сообщение."""
+        self.calls.append(("send", text))
+        return FakeMessage(self, text)
+
+
+def _channel(bot: FakeBot, delay: float) -> MessageChannel:
+    return MessageChannel("room", bot, delay)  # type: ignore[arg-type]
+
+
+def test_coalesce_updates() -> None:
+    """Изменения журнала за время задержки отправляются одним запросом."""
+    bot = FakeBot()
+
+    async def main() -> None:
+        channel = _channel(bot, 0.05)
+        for text in ("a", "b", "c"):
+            channel.add(text)
+            await channel.send()
+        await asyncio.sleep(0.1)
+
+        channel.add("d")
+        await channel.send()
+        await channel.send()
+        await asyncio.sleep(0.1)
+
+        # Тот же текст повторно не отправляется
+        await channel.send()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert bot.calls == [("send", "a\nb\nc"), ("edit", "a\nb\nc\nd")]
+
+
+def test_flush_and_clear() -> None:
+    """Отложенный журнал можно отправить сразу или отменить."""
+    bot = FakeBot()
+
+    async def main() -> None:
+        channel = _channel(bot, 10)
+        channel.add("a")
+        await channel.send()
+        await channel.flush()
+
+        channel.add("b")
+        await channel.send()
+        await channel.clear()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert bot.calls == [("send", "a"), ("delete", "a")]
+
+
+def test_no_delay() -> None:
+    """Без задержки каждое изменение отправляется сразу."""
+    bot = FakeBot()
+
+    async def main() -> None:
+        channel = _channel(bot, 0)
+        channel.add("a")
+        await channel.send()
+        channel.add("b")
+        await channel.send()
+
+    asyncio.run(main())
+    assert bot.calls == [("send", "a"), ("edit", "a\nb")]
+
+
+def _journal(
+    bot: FakeBot, processed: list[tuple[str, GameEvents]]
+) -> MessageJournal:
+    router = EventRouter()
+
+    async def record(event: Event, channel: MessageChannel) -> None:
+        await asyncio.sleep(0)
+        processed.append((event.game.room_id, event.event_type))
+
+    for event_type in GameEvents:
+        router.event(event_type)(record)
+    return MessageJournal(bot, router)  # type: ignore[arg-type]
+
+
+def _game(room_id: str) -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    return sm.create(room_id, BaseUser("0", "Player 0", "@player_0"))
+
+
+async def _process(journal: MessageJournal, events: list[Event]) -> None:
+    for event in events:
+        journal.push(event)
+    await asyncio.wait(asyncio.all_tasks() - {asyncio.current_task()})
+    assert journal.pending == 0
+
+
+def test_room_order() -> None:
+    """События комнаты обрабатываются по порядку."""
+    processed: list[tuple[str, GameEvents]] = []
+    turns = [GameEvents.GAME_TURN, GameEvents.GAME_STATE, GameEvents.GAME_END]
+
+    async def main() -> None:
+        journal = _journal(FakeBot(), processed)
+        games = [_game("a"), _game("b")]
+        await _process(
+            journal,
+            [
+                Event(game, game.owner, event_type, "")
+                for event_type in turns
+                for game in games
+            ],
+        )
+
+    asyncio.run(main())
+    for room_id in ("a", "b"):
+        assert [e for r, e in processed if r == room_id] == turns
+
+
+def test_merge_lobby_events() -> None:
+    """Подряд идущие изменения лобби обрабатываются один раз."""
+    processed: list[tuple[str, GameEvents]] = []
+
+    async def main() -> MessageJournal:
+        journal = _journal(FakeBot(), processed)
+        game = _game("a")
+        events = [GameEvents.GAME_JOIN, GameEvents.GAME_LEAVE] * 3
+        await _process(
+            journal, [Event(game, game.owner, e, "") for e in events]
+        )
+        return journal
+
+    journal = asyncio.run(main())
+    assert processed == [("a", GameEvents.GAME_LEAVE)]
+    assert journal.merged == 5  # noqa: PLR2004
+
+
+def test_drop_when_full() -> None:
+    """Из переполненной очереди отбрасываются все события, кроме важных."""
+    processed: list[tuple[str, GameEvents]] = []
+
+    async def main() -> MessageJournal:
+        journal = _journal(FakeBot(), processed)
+        game = _game("a")
+        events = [GameEvents.GAME_TURN] * (journal.max_queue + 10)
+        events.append(GameEvents.GAME_END)
+        await _process(
+            journal, [Event(game, game.owner, e, "") for e in events]
+        )
+        return journal
+
+    journal = asyncio.run(main())
+    assert journal.dropped == 10  # noqa: PLR2004
+    assert [e for _, e in processed] == [
+        *[GameEvents.GAME_TURN] * journal.max_queue,
+        GameEvents.GAME_END,
+    ]
@@ -0,0 +1,173 @@
+"""Планировщик исходящих запросов к Telegram."""
+
+import asyncio
+from functools import partial
+from time import monotonic
+from typing import Any
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+
+from maubot.limiter import LimitedRequests, Priority, RateLimiter
+
+
+def _limiter() -> RateLimiter:
+    return RateLimiter(global_rate=1000, chat_rate=1000, chat_burst=1000)
+
+
+class Recorder:
+    """Запоминает выполненные запросы."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, str]] = []
+        self.running: dict[str, int] = {}
+        self.max_running = 0
+
+    async def request(self, chat_id: str, name: str) -> str:
+        """Запрос, который выполняется один цикл событий."""
+        self.running[chat_id] = self.running.get(chat_id, 0) + 1
+        self.max_running = max(self.max_running, self.running[chat_id])
+        await asyncio.sleep(0.01)
+        self.running[chat_id] -= 1
+        self.calls.append((chat_id, name))
+        return name
+
+
+def test_priority_order() -> None:
+    """Запросы одного чата выполняются по одному и по приоритету."""
+    recorder = Recorder()
+
+    async def main() -> list[str]:
+        limiter = _limiter()
+
+        def call(name: str, priority: Priority) -> asyncio.Task[str]:
+            return asyncio.create_task(
+                limiter.call(
+                    "chat", priority, lambda: recorder.request("chat", name)
+                )
+            )
+
+        first = call("first", Priority.CARD)
+        await asyncio.sleep(0)
+        tasks = [
+            call("card", Priority.CARD),
+            call("lobby", Priority.LOBBY),
+            call("turn", Priority.TURN),
+        ]
+        results = await asyncio.gather(first, *tasks)
+        await limiter.close()
+        return results
+
+    assert asyncio.run(main()) == ["first", "card", "lobby", "turn"]
+    assert [name for _, name in recorder.calls] == [
+        "first",
+        "turn",
+        "lobby",
+        "card",
+    ]
+    assert recorder.max_running == 1
+
+
+def test_chats_in_parallel() -> None:
+    """Разные чаты не ждут друг друга."""
+    recorder = Recorder()
+
+    async def main() -> None:
+        limiter = _limiter()
+        await asyncio.gather(
+            *(
+                limiter.call(
+                    str(i),
+                    Priority.TURN,
+                    partial(recorder.request, "all", str(i)),
+                )
+                for i in range(10)
+            )
+        )
+        await limiter.close()
+
+    asyncio.run(main())
+    assert recorder.max_running == 10  # noqa: PLR2004
+
+
+def test_chat_rate() -> None:
+    """Запросы сверх ведра токенов чата ждут новых токенов."""
+
+    async def main() -> float:
+        limiter = RateLimiter(global_rate=1000, chat_rate=10, chat_burst=2)
+        start = monotonic()
+        await asyncio.gather(
+            *(
+                limiter.call("chat", Priority.TURN, lambda: asyncio.sleep(0))
+                for _ in range(4)
+            )
+        )
+        await limiter.close()
+        return monotonic() - start
+
+    # Два запроса сразу, ещё два через 0.1 и 0.2 секунды
+    assert 0.15 < asyncio.run(main()) < 0.5  # noqa: PLR2004
+
+
+def test_retry_after() -> None:
+    """После retry_after чат ждёт, а запрос повторяется."""
+    log: list[tuple[str, float]] = []
+
+    async def turn() -> str:
+        log.append(("turn", monotonic()))
+        if len(log) == 1:
+            raise TelegramRetryAfter(
+                SendMessage(chat_id=1, text="hi"), "Too Many Requests", 1
+            )
+        return "turn"
+
+    async def card() -> str:
+        log.append(("card", monotonic()))
+        return "card"
+
+    async def main() -> list[str]:
+        limiter = _limiter()
+        first = asyncio.create_task(limiter.call("chat", Priority.TURN, turn))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            first, limiter.call("chat", Priority.CARD, card)
+        )
+        await limiter.close()
+        return list(results)
+
+    assert asyncio.run(main()) == ["turn", "card"]
+    # Пока чат на паузе, другие его запросы тоже ждут
+    assert [name for name, _ in log] == ["turn", "turn", "card"]
+    assert log[1][1] - log[0][1] >= 1
+
+
+def test_limited_requests() -> None:
+    """Сообщения обработчиков идут через планировщик, но только раз."""
+    requests: list[str] = []
+
+    async def make_request(bot: Any, method: Any) -> str:  # noqa: ANN401
+        requests.append(method.__api_method__)
+        return "ok"
+
+    async def main() -> list[Any]:
+        limiter = _limiter()
+        middleware = LimitedRequests(limiter)
+        send = SendMessage(chat_id=1, text="hi")
+        answer = AnswerCallbackQuery(callback_query_id="1")
+        results = [
+            await middleware(make_request, None, send),  # type: ignore[arg-type]
+            await middleware(make_request, None, answer),  # type: ignore[arg-type]
+            # Запрос журнала уже идёт через планировщик
+            await limiter.call(
+                "1",
+                Priority.TURN,
+                lambda: middleware(make_request, None, send),  # type: ignore[arg-type]
+            ),
+        ]
+        # Ответ на callback не относится к чату
+        assert limiter.stats.calls == 2  # noqa: PLR2004
+        await limiter.close()
+        return results
+
+    assert asyncio.run(main()) == ["ok", "ok", "ok"]
+    assert requests == ["sendMessage", "answerCallbackQuery", "sendMessage"]
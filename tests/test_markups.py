@@ -0,0 +1,92 @@
+"""Клавиатуры бота."""
+
+from datetime import timedelta
+
+import pytest
+from aiogram.types import InlineQueryResultUnion
+
+from mau.deck.card import MauCard
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler
+from maubot import markups
+from maubot.markups import HandQueryCache, hand_query
+
+
+def _game(players: int = 2) -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    game = sm.create("room", BaseUser("0", "Player 0", "@player_0"))
+    for i in range(1, players):
+        game.join_player(BaseUser(str(i), f"Player {i}", f"@player_{i}"))
+    game.start()
+    return game
+
+
+def _status(results: list[InlineQueryResultUnion]) -> set[str]:
+    return {
+        result.input_message_content.message_text  # type: ignore[union-attr]
+        for result in results
+        if result.id.startswith("status")
+    }
+
+
+def _count_builds(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    builds: list[int] = []
+    build = markups._cover_results
+
+    def counted(cover: list[MauCard]) -> list[InlineQueryResultUnion]:
+        builds.append(len(cover))
+        return build(cover)
+
+    monkeypatch.setattr(markups, "_cover_results", counted)
+    return builds
+
+
+def test_cache_by_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Результаты собираются заново только после изменения игры."""
+    builds = _count_builds(monkeypatch)
+    game = _game()
+    player = game.pm.get("1")
+    cache = HandQueryCache()
+
+    results = cache.get(player)
+    assert [r.id for r in results] == [r.id for r in hand_query(player)]
+    builds.clear()
+    cache.get(player)
+    assert builds == []
+
+    game.rules.toggle(0)
+    game.touch()
+    cache.get(player)
+    assert len(builds) == 1
+
+
+def test_fresh_status() -> None:
+    """Состояние игры для неактивных карт не берётся из кеша."""
+    game = _game()
+    player = game.pm.get("1")
+    cache = HandQueryCache()
+
+    before = _status(cache.get(player))
+    game.game_start -= timedelta(minutes=5)
+    after = _status(cache.get(player))
+    assert before
+    assert after
+    assert before != after
+
+
+def test_cache_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Кеш хранит результаты не больше чем для size игроков."""
+    builds = _count_builds(monkeypatch)
+    game = _game(3)
+    cache = HandQueryCache(size=2)
+    players = [game.pm.get(str(i)) for i in range(3)]
+    for player in players:
+        cache.get(player)
+
+    builds.clear()
+    cache.get(players[2])
+    assert builds == []
+    cache.get(players[0])
+    assert len(builds) == 1
@@ -0,0 +1,95 @@
+"""Метрики бота в формате Prometheus."""
+
+import asyncio
+from typing import Any
+
+import pytest
+from aiogram import Bot
+from aiogram.methods import Response, SendMessage, TelegramMethod
+
+from maubot import metrics
+
+
+def test_counter() -> None:
+    """Счётчик растёт отдельно для каждого набора меток."""
+    counter = metrics.Counter("test_total", "Test counter.", ("method",))
+    counter.inc("send")
+    counter.inc("send", value=2)
+    counter.inc('say "hi"\n')
+    assert counter.get("send") == 3  # noqa: PLR2004
+    assert counter.get("edit") == 0
+    assert counter.render() == (
+        "# HELP test_total Test counter.\n"
+        "# TYPE test_total counter\n"
+        'test_total{method="send"} 3\n'
+        'test_total{method="say \\"hi\\"\\n"} 1'
+    )
+
+
+def test_histogram() -> None:
+    """Корзины гистограммы накапливают значения."""
+    histogram = metrics.Histogram(
+        "test_seconds", "Test histogram.", ("type",), buckets=(1, 0.1)
+    )
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, "message")
+    assert histogram.count("message") == 4  # noqa: PLR2004
+    assert histogram.count("inline") == 0
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{type="message",le="0.1"} 2',
+        'test_seconds_bucket{type="message",le="1"} 3',
+        'test_seconds_bucket{type="message",le="+Inf"} 4',
+        'test_seconds_sum{type="message"} 2.65',
+        'test_seconds_count{type="message"} 4',
+    ]
+
+
+def test_registry() -> None:
+    """Реестр собирает значения при запросе метрик."""
+    registry = metrics.Registry()
+    depth = 0
+    registry.gauge("test_depth", "Queue depth.", lambda: depth)
+    registry.counter(
+        "test_locks_total",
+        "Room locks.",
+        lambda: {("acquired",): 5, ("contended",): 1},
+        ("state",),
+    )
+
+    def broken() -> float:
+        raise ValueError
+
+    registry.gauge("test_broken", "Broken gauge.", broken)
+
+    depth = 7
+    assert registry.render() == (
+        "# HELP test_depth Queue depth.\n"
+        "# TYPE test_depth gauge\n"
+        "test_depth 7\n"
+        "# HELP test_locks_total Room locks.\n"
+        "# TYPE test_locks_total counter\n"
+        'test_locks_total{state="acquired"} 5\n'
+        'test_locks_total{state="contended"} 1\n'
+    )
+
+
+def test_request_metrics() -> None:
+    """Запросы к Bot API замеряются вместе с ошибками."""
+    bot = Bot("42:TEST")
+    method = SendMessage(chat_id=1, text="hi")
+    requests = metrics.API_SECONDS.count("sendMessage")
+    errors = metrics.API_ERRORS.get("sendMessage")
+
+    async def ok(bot: Bot, method: TelegramMethod[Any]) -> Response[Any]:
+        return Response[Any](ok=True, result=True)
+
+    async def fail(bot: Bot, method: TelegramMethod[Any]) -> Response[Any]:
+        raise RuntimeError
+
+    middleware = metrics.RequestMetrics()
+    asyncio.run(middleware(ok, bot, method))
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware(fail, bot, method))
+
+    assert metrics.API_SECONDS.count("sendMessage") == requests + 2
+    assert metrics.API_ERRORS.get("sendMessage") == errors + 1
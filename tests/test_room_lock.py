@@ -0,0 +1,66 @@
+"""Последовательная обработка событий одной комнаты."""
+
+import asyncio
+
+from maubot.room_lock import RoomLocks
+
+
+async def _handle(
+    locks: RoomLocks, room_id: str, name: str, log: list[str]
+) -> None:
+    async with locks.hold(room_id):
+        log.append(f"{name}.start")
+        await asyncio.sleep(0.01)
+        log.append(f"{name}.end")
+
+
+def test_same_room() -> None:
+    """События одной комнаты обрабатываются по очереди."""
+    locks = RoomLocks()
+    log: list[str] = []
+
+    async def main() -> None:
+        await asyncio.gather(
+            *(_handle(locks, "room", str(i), log) for i in range(3))
+        )
+
+    asyncio.run(main())
+    assert log == ["0.start", "0.end", "1.start", "1.end", "2.start", "2.end"]
+    assert (locks.acquired, locks.contended) == (3, 2)
+    assert len(locks) == 0
+
+
+def test_other_rooms() -> None:
+    """События разных комнат обрабатываются одновременно."""
+    locks = RoomLocks()
+    log: list[str] = []
+
+    async def main() -> None:
+        await asyncio.gather(
+            _handle(locks, "a", "a", log), _handle(locks, "b", "b", log)
+        )
+
+    asyncio.run(main())
+    assert log == ["a.start", "b.start", "a.end", "b.end"]
+    assert (locks.acquired, locks.contended) == (2, 0)
+
+
+def test_release_on_error() -> None:
+    """Блокировка освобождается и удаляется при ошибке обработчика."""
+    locks = RoomLocks()
+
+    async def main() -> None:
+        try:
+            async with locks.hold("room"):
+                assert len(locks) == 1
+                raise ValueError
+        except ValueError:
+            pass
+        assert len(locks) == 0
+
+        # Комнату можно снова заблокировать
+        async with asyncio.timeout(1), locks.hold("room"):
+            pass
+
+    asyncio.run(main())
+    assert len(locks) == 0
@@ -0,0 +1,112 @@
+"""Снимки игры."""
+
+import random
+
+import pytest
+
+from mau.exceptions import SnapshotError
+from mau.game.game import MauGame
+from mau.game.player import BaseUser, Player
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler, RandomPolicy, play_turn
+from mau.snapshot import SnapshotReader, SnapshotWriter
+
+
+def _started_game() -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    game = sm.create("room", BaseUser("0", "Player 0", "@player_0"))
+    for i in range(1, 4):
+        game.join_player(BaseUser(str(i), f"Player {i}", f"@player_{i}"))
+    game.start()
+    policy = RandomPolicy(random.Random(0))
+    for _ in range(10):
+        play_turn(game, policy)
+    return game
+
+
+def _restore(data: bytes) -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    return sm.restore_game("room", data)
+
+
+def test_writer_reader_round_trip() -> None:
+    """Значения читаются в том же порядке, в котором записаны."""
+    numbers = (255, 65535, 2**32 - 1, 1.5)
+    w = SnapshotWriter()
+    w.u8(numbers[0])
+    w.u16(numbers[1])
+    w.u32(numbers[2])
+    w.f64(numbers[3])
+    w.text("привет")
+    w.texts(["a", "", "б"])
+
+    r = SnapshotReader(w.getvalue())
+    assert (r.u8(), r.u16(), r.u32(), r.f64()) == numbers
+    assert r.text() == "привет"
+    assert r.texts() == ["a", "", "б"]
+    r.end()
+
+
+def test_game_round_trip() -> None:
+    """Восстановленная игра даёт тот же снимок и те же руки."""
+    game = _started_game()
+    data = game.snapshot()
+    restored = _restore(data)
+
+    assert restored.snapshot() == data
+    assert restored.started
+    assert restored.player.user_id == game.player.user_id
+    assert restored.deck.top == game.deck.top
+    for player in game.pm.iter():
+        assert list(restored.pm.get(player.user_id).hand) == list(player.hand)
+
+
+@pytest.mark.parametrize("cut", [0, 1, 5, 10, 50, -10, -1])
+def test_truncated_snapshot(cut: int) -> None:
+    """Обрезанный снимок вызывает SnapshotError."""
+    data = _started_game().snapshot()
+    with pytest.raises(SnapshotError):
+        _restore(data[:cut])
+
+
+def test_broken_snapshot() -> None:
+    """Чужие данные и лишние байты в конце вызывают SnapshotError."""
+    data = _started_game().snapshot()
+    with pytest.raises(SnapshotError):
+        _restore(b"XXXX" + data[4:])
+    with pytest.raises(SnapshotError):
+        _restore(data + b"\0")
+
+
+def test_ids_little_endian() -> None:
+    """ID карт записываются в little-endian на любой машине."""
+    w = SnapshotWriter()
+    w.ids([0x0102, 0x0304])
+    data = w.getvalue()
+    assert data.endswith(b"\x02\x00\x02\x01\x04\x03")
+    assert list(SnapshotReader(data).ids()) == [0x0102, 0x0304]
+
+
+def test_corrupted_fields() -> None:
+    """Неверные значения полей тоже вызывают SnapshotError."""
+    game = _started_game()
+    game.state = 200  # type: ignore[assignment]
+    with pytest.raises(SnapshotError):
+        _restore(game.snapshot())
+
+    game = _started_game()
+    game.bluff_player = (Player(game, "ghost", "Ghost", "@ghost"), True)
+    with pytest.raises(SnapshotError):
+        _restore(game.snapshot())
+
+
+def test_corrupted_bytes() -> None:
+    """Любой испорченный байт либо читается, либо вызывает SnapshotError."""
+    data = _started_game().snapshot()
+    for i in range(len(data)):
+        broken = bytearray(data)
+        broken[i] ^= 0xFF
+        try:
+            _restore(bytes(broken))
+        except SnapshotError:
+            pass
@@ -0,0 +1,87 @@
+"""Сохранение игр в SQLite между перезапусками."""
+
+import random
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler, RandomPolicy, play_turn
+from mau.storage import SqliteStorage
+
+
+def _session(path: Path) -> tuple[SessionManager, SqliteStorage[MauGame]]:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    storage: SqliteStorage[MauGame] = SqliteStorage(
+        path, MauGame.snapshot, sm.restore_game, "games", flush_interval=0
+    )
+    storage.load()
+    sm.set_game_storage(storage)
+    return sm, storage
+
+
+def test_restore_started_game(tmp_path: Path) -> None:
+    """Игра, изменённая мимо хранилища, восстанавливается целиком."""
+    path = tmp_path / "games.sqlite"
+    sm, storage = _session(path)
+    game = sm.create("room", BaseUser("0", "Player 0", "@player_0"))
+    for i in range(1, 3):
+        game.join_player(BaseUser(str(i), f"Player {i}", f"@player_{i}"))
+    storage.flush()
+
+    # Как и в боте, игра берётся через игрока, а не из хранилища
+    player = sm.player("0")
+    assert player is not None
+    game = player.game
+    game.start()
+    policy = RandomPolicy(random.Random(0))
+    for _ in range(5):
+        play_turn(game, policy)
+    hands = {pl.user_id: len(pl.hand) for pl in game.pm.iter()}
+    storage.close()
+
+    sm, storage = _session(path)
+    restored = sm.room("room")
+    assert restored is not None
+    assert restored.started
+    assert {pl.user_id: len(pl.hand) for pl in restored.pm.iter()} == hands
+    assert sm.player("1") is restored.pm.get("1")
+    storage.close()
+
+
+def test_skip_broken_game(tmp_path: Path) -> None:
+    """Повреждённая игра пропускается и не мешает загрузить остальные."""
+    path = tmp_path / "games.sqlite"
+    sm, storage = _session(path)
+    sm.create("good", BaseUser("0", "Player 0", "@player_0"))
+    sm.create("bad", BaseUser("1", "Player 1", "@player_1"))
+    storage.close()
+
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute(
+            "UPDATE games SET value = substr(value, 1, 20) WHERE key = 'bad'"
+        )
+
+    sm, storage = _session(path)
+    assert sm.room("good") is not None
+    assert sm.room("bad") is None
+    assert sm.player("1") is None
+    storage.close()
+
+
+def test_skip_corrupted_game(tmp_path: Path) -> None:
+    """Снимок с неверными полями тоже пропускается при загрузке."""
+    path = tmp_path / "games.sqlite"
+    sm, storage = _session(path)
+    sm.create("good", BaseUser("0", "Player 0", "@player_0"))
+    bad = sm.create("bad", BaseUser("1", "Player 1", "@player_1"))
+    bad.state = 200  # type: ignore[assignment]
+    storage.close()
+
+    sm, storage = _session(path)
+    assert sm.room("good") is not None
+    assert sm.room("bad") is None
+    assert sm.player("1") is None
+    storage.close()
@@ -0,0 +1,74 @@
+"""Колесо таймеров."""
+
+import random
+from functools import partial
+
+from mau.timers import TimerWheel
+
+
+def test_fire_in_order() -> None:
+    """Таймеры срабатывают по порядку и не раньше своего времени."""
+    rng = random.Random(0)
+    wheel = TimerWheel(slots=8, levels=3, now=0)
+    deadlines = {i: rng.randrange(1, 2000) for i in range(300)}
+    fired: list[tuple[int, int]] = []
+    now = 0
+
+    def fire(key: int) -> None:
+        fired.append((key, now))
+
+    for key, when in deadlines.items():
+        wheel.schedule(key, when, partial(fire, key))
+
+    while len(wheel):
+        now += rng.randrange(1, 10)
+        wheel.advance(now)
+
+    assert len(fired) == len(deadlines)
+    times = [deadlines[key] for key, _ in fired]
+    assert times == sorted(times)
+    for key, at in fired:
+        assert deadlines[key] <= at < deadlines[key] + 10  # noqa: PLR2004
+
+
+def test_far_timer() -> None:
+    """Таймер дальше всех уровней колеса всё равно срабатывает вовремя."""
+    wheel = TimerWheel(slots=4, levels=2, now=0)
+    fired: list[int] = []
+    wheel.schedule("far", 100, lambda: fired.append(1))
+
+    assert wheel.advance(99) == 0
+    assert wheel.advance(100) == 1
+    assert fired == [1]
+
+
+def test_cancel_and_replace() -> None:
+    """Отменённый таймер не срабатывает, а новый заменяет старый."""
+    wheel = TimerWheel(now=0)
+    fired: list[str] = []
+    wheel.schedule("a", 5, lambda: fired.append("a"))
+    wheel.schedule("b", 5, lambda: fired.append("b"))
+    wheel.schedule("b", 10, lambda: fired.append("b2"))
+
+    assert wheel.deadline("b") == 10  # noqa: PLR2004
+    assert wheel.cancel("a")
+    assert not wheel.cancel("a")
+    assert "a" not in wheel
+    assert wheel.advance(9) == 0
+    assert wheel.advance(10) == 1
+    assert fired == ["b2"]
+    assert len(wheel) == 0
+
+
+def test_callback_error() -> None:
+    """Ошибка в одном таймере не мешает сработать остальным."""
+    wheel = TimerWheel(now=0)
+    fired: list[int] = []
+
+    def fail() -> None:
+        raise RuntimeError
+
+    wheel.schedule("fail", 1, fail)
+    wheel.schedule("ok", 1, lambda: fired.append(1))
+    assert wheel.advance(1) == 2  # noqa: PLR2004
+    assert fired == [1]
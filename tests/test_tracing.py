@@ -0,0 +1,84 @@
+"""Трассировка обработки событий."""
+
+import asyncio
+from typing import Any
+
+from aiogram import Bot
+
+from mau.enums import GameEvents
+from mau.events import Event
+from mau.game.game import MauGame
+from mau.game.player import BaseUser
+from mau.session import SessionManager
+from mau.sim import CounterEventHandler
+from maubot import tracing
+from maubot.events.journal import EventRouter, MessageChannel, MessageJournal
+
+
+class ListSink:
+    """Запоминает завершённые трассы."""
+
+    def __init__(self) -> None:
+        self.traces: list[dict[str, Any]] = []
+
+    def write(self, trace: tracing.Trace) -> None:
+        """Запоминает трассу."""
+        self.traces.append(trace.dump())
+
+
+def _game() -> MauGame:
+    sm = SessionManager(event_handler=CounterEventHandler())
+    return sm.create("room", BaseUser("0", "Player 0", "@player_0"))
+
+
+def _journal() -> MessageJournal:
+    router = EventRouter()
+
+    @router.event(GameEvents.GAME_TURN)
+    async def turn(event: Event, channel: MessageChannel) -> None:
+        await asyncio.sleep(0)
+
+    return MessageJournal(Bot("42:TEST"), router)
+
+
+async def _push_updates(tracer: tracing.Tracer, rates: list[float]) -> None:
+    journal = _journal()
+    game = _game()
+    for i, rate in enumerate(rates):
+        tracer.sample_rate = rate
+        with tracer.trace(f"update.{i}"):
+            journal.push(Event(game, game.owner, GameEvents.GAME_TURN, ""))
+    # Дожидается обработчика очереди комнаты
+    await asyncio.wait(asyncio.all_tasks() - {asyncio.current_task()})
+    assert journal.pending == 0
+
+
+def _names(trace: dict[str, Any]) -> list[str]:
+    return [span[0] for span in trace["s"]]
+
+
+def test_updates_in_one_room() -> None:
+    """Два события одной комнаты дают две отдельные трассы."""
+    sink = ListSink()
+    asyncio.run(_push_updates(tracing.Tracer(sink, 1), [1, 1]))
+
+    assert [trace["id"] for trace in sink.traces] == [1, 2]
+    for i, trace in enumerate(sink.traces):
+        assert _names(trace) == [
+            f"update.{i}",
+            "journal.queue",
+            "event.game_turn",
+        ]
+
+
+def test_unsampled_update() -> None:
+    """Событие без трассы не попадает в уже завершённую трассу."""
+    sink = ListSink()
+    asyncio.run(_push_updates(tracing.Tracer(sink, 1), [1, 0]))
+
+    assert len(sink.traces) == 1
+    assert _names(sink.traces[0]) == [
+        "update.0",
+        "journal.queue",
+        "event.game_turn",
+    ]
@@ -0,0 +1,158 @@
+"""Обработка событий webhook."""
+
+import asyncio
+from typing import Any, cast
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    SendMessage,
+    SendPhoto,
+    TelegramMethod,
+)
+from aiogram.types import (
+    BufferedInputFile,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+)
+
+from maubot.webhook import OverflowPolicy, UpdateQueue, webhook_reply
+
+
+def _bot() -> Bot:
+    return Bot(
+        "42:TEST", default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+
+
+def test_reply_method() -> None:
+    """Метод собирается в ответ на webhook вместе с настройками бота."""
+    markup = InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="a", callback_data="b")]]
+    )
+    reply = webhook_reply(
+        _bot(), SendMessage(chat_id=1, text="hi", reply_markup=markup)
+    )
+    assert reply is not None
+    assert reply["method"] == "sendMessage"
+    assert reply["chat_id"] == 1
+    assert reply["text"] == "hi"
+    assert reply["parse_mode"] == "HTML"
+    assert reply["reply_markup"] == {
+        "inline_keyboard": [[{"text": "a", "callback_data": "b"}]]
+    }
+
+
+def test_reply_skip_none() -> None:
+    """Незаданные поля не попадают в ответ."""
+    reply = webhook_reply(
+        _bot(), AnswerCallbackQuery(callback_query_id="1", text="ok")
+    )
+    assert reply == {
+        "method": "answerCallbackQuery",
+        "callback_query_id": "1",
+        "text": "ok",
+    }
+
+
+def test_reply_with_files() -> None:
+    """Методы с загрузкой файлов отправляются отдельным запросом."""
+    photo = BufferedInputFile(b"image", filename="card.png")
+    assert webhook_reply(_bot(), SendPhoto(chat_id=1, photo=photo)) is None
+
+
+class FakeDispatcher:
+    """Запоминает события вместо обработки."""
+
+    def __init__(self, delay: float = 0) -> None:
+        self.delay = delay
+        self.updates: list[int] = []
+        self.replies: list[TelegramMethod[Any]] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def feed_raw_update(
+        self, bot: Bot, update: dict[str, Any]
+    ) -> TelegramMethod[Any] | None:
+        """Обрабатывает событие."""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        if update["update_id"] < 0:
+            raise ValueError("Broken update")
+        self.updates.append(update["update_id"])
+        return AnswerCallbackQuery(callback_query_id=str(update["update_id"]))
+
+    async def silent_call_request(
+        self, bot: Bot, result: TelegramMethod[Any]
+    ) -> None:
+        """Отправляет метод, который вернул обработчик."""
+        self.replies.append(result)
+
+
+def _queue(dp: FakeDispatcher, **kwargs: Any) -> UpdateQueue:  # noqa: ANN401
+    return UpdateQueue(cast("Dispatcher", dp), _bot(), **kwargs)
+
+
+def test_queue_workers() -> None:
+    """События обрабатываются ограниченным числом обработчиков."""
+    dp = FakeDispatcher(0.01)
+
+    async def main() -> UpdateQueue:
+        queue = _queue(dp, workers=3)
+        queue.start()
+        for update_id in range(10):
+            assert queue.put({"update_id": update_id})
+        queue.put({"update_id": -1})
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(main())
+    assert sorted(dp.updates) == list(range(10))
+    assert len(dp.replies) == 10  # noqa: PLR2004
+    assert dp.max_running == 3  # noqa: PLR2004
+    assert queue.stats.received == 11  # noqa: PLR2004
+    assert queue.stats.processed == 11  # noqa: PLR2004
+    assert queue.stats.failed == 1
+    assert queue.depth == 0
+
+
+@pytest.mark.parametrize(
+    ("overflow", "updates", "accepted"),
+    [
+        (OverflowPolicy.DROP_OLD, [2, 3, 4], True),
+        (OverflowPolicy.DROP_NEW, [0, 1, 2], True),
+        (OverflowPolicy.REJECT, [0, 1, 2], False),
+    ],
+)
+def test_queue_overflow(
+    overflow: OverflowPolicy, updates: list[int], accepted: bool
+) -> None:
+    """Переполненная очередь поступает согласно политике."""
+    dp = FakeDispatcher()
+
+    async def main() -> UpdateQueue:
+        queue = _queue(dp, workers=1, max_size=3, overflow=overflow)
+        for update_id in range(3):
+            assert queue.put({"update_id": update_id})
+        assert queue.put({"update_id": 3}) is accepted
+        assert queue.put({"update_id": 4}) is accepted
+        assert queue.depth == 3  # noqa: PLR2004
+
+        queue.start()
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(main())
+    assert dp.updates == updates
+    assert queue.stats.max_depth == 3  # noqa: PLR2004
+    if accepted:
+        assert (queue.stats.dropped, queue.stats.rejected) == (2, 0)
+    else:
+        assert (queue.stats.dropped, queue.stats.rejected) == (0, 2)